@@ -14,9 +14,12 @@ The harness patches `extract_inline_tool_calls` in this module to count how many
 `<tool_call>` blocks the model emitted vs how many parsed.
 """
 
+import contextvars
 import json
 import logging
 import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from lib.framework.agent import AgentRunResult, AgentSpec
@@ -90,6 +93,9 @@ _FORCED_FINALIZATION_PROMPT = (
 )
 
 _DETERMINISTIC_PARTIAL_LIMIT = 5
+# At most this many read-only calls of one loop run ahead of the reply at
+# once; the rest queue behind them.
+_PREFETCH_WORKERS = 4
 _CLOSING_UNAVAILABLE_REASONS = {
     "budget_hard_limit_reached",
     "budget_reservation_consumed",
@@ -173,6 +179,69 @@ def _normalize_message(msg: Dict[str, Any]) -> ModelOutcome:
     return ModelOutcome.from_chat_message(content, tool_calls)
 
 
+class _ReadOnlyPrefetch:
+    """Starts read-only leaf tools while the model is still streaming its reply.
+
+    A tool round used to wait for the whole reply before running anything,
+    although the first call's arguments are often complete long before the
+    model has finished writing the others. `on_tool_call` is handed each call
+    as `chat_with_tools_stream` completes it; a call to a tool marked
+    `read_only` and offered to this agent is started there and then, on the
+    loop's bounded prefetch executor.
+
+    Only read-only tools, because nothing has ruled on the call yet: the loop
+    still reserves its budget and applies the repeat guards once the reply is
+    complete, in order, exactly as before, and only a call that passes them
+    picks up its prefetched result (`take`). The result of a call that is
+    denied or blocked is dropped, which costs a read and changes nothing.
+
+    Nothing is started after a call to any other tool in the same reply: that
+    call runs first, and a read written after it expects to see what it did.
+    For the same reason `take` drops every result still held once the loop
+    reaches such a call, so a later identical read is dispatched again.
+    Whatever the round didn't take is cancelled when it ends (`discard`).
+    """
+
+    def __init__(self, dispatch: DispatchFn, ctx, tools: List[Dict[str, Any]],
+                 executor: ThreadPoolExecutor):
+        self._dispatch = dispatch
+        self._ctx = ctx
+        self._executor = executor
+        self._offered = {
+            (tool.get("function") or {}).get("name") for tool in tools
+        }
+        self._futures: Dict[Tuple[str, str], Future] = {}
+        self._after_write = False
+
+    def on_tool_call(self, _index: int, call: Dict[str, Any]) -> None:
+        function = call.get("function") or {}
+        name = function.get("name") or ""
+        args_json = function.get("arguments") or "{}"
+        tool = REGISTRY.get(name)
+        key = (name, args_json)
+        if tool is None or not tool.read_only:
+            self._after_write = True
+        if self._after_write or name not in self._offered or key in self._futures:
+            return
+        self._futures[key] = self._executor.submit(
+            contextvars.copy_context().run, self._dispatch, name, args_json, self._ctx,
+        )
+
+    def take(self, name: str, args_json: str) -> Optional[Future]:
+        tool = REGISTRY.get(name)
+        if tool is None or not tool.read_only:
+            self._futures.clear()
+            return None
+        return self._futures.pop((name, args_json or "{}"), None)
+
+    def discard(self) -> None:
+        """Cancel the prefetches nobody took; one already running finishes
+        and its result is dropped."""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+
+
 def _tool_label(name: str) -> str:
     labels = {
         "search_workspace": "Workspace search",
@@ -321,6 +390,25 @@ def run_agent_loop(
     """Run tool-call rounds until the model replies without calling a tool or the
     round budget runs out. Mutates `messages` in place (appends assistant/tool
     turns). Returns the final outcome produced by the loop."""
+    # Threads are only started once a read-only call is prefetched.
+    prefetch_executor = ThreadPoolExecutor(
+        max_workers=_PREFETCH_WORKERS, thread_name_prefix="tool-prefetch",
+    )
+    try:
+        return _run_agent_loop(spec, messages, ctx, tools, dispatch, loop_kind, prefetch_executor)
+    finally:
+        prefetch_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_agent_loop(
+    spec: AgentSpec,
+    messages: List[Dict[str, Any]],
+    ctx,
+    tools: List[Dict[str, Any]],
+    dispatch: DispatchFn,
+    loop_kind: str,
+    prefetch_executor: ThreadPoolExecutor,
+) -> AgentRunResult:
     cfg = get_task_config(spec.config_key)
     params = get_llm_params(spec.config_key)
     llm = get_llm_service(**params)
@@ -346,6 +434,35 @@ def run_agent_loop(
         and isinstance(ctx.execution_id, str)
     )
     execution = getattr(ctx, "execution", None)
+    stream_tool_calls = (
+        bool(cfg.get("stream_tool_calls", True))
+        and hasattr(llm, "chat_with_tools_stream")
+    )
+    prefetch: Optional[_ReadOnlyPrefetch] = None
+
+    def chat_round(round_messages, inference_name, trace_metadata):
+        nonlocal prefetch
+        if prefetch is not None:
+            prefetch.discard()
+        if not stream_tool_calls:
+            prefetch = None
+            return llm.chat_with_tools(
+                round_messages,
+                tools,
+                max_tokens=round_max_tokens,
+                inference_name=inference_name,
+                trace_metadata=trace_metadata,
+            )
+        prefetch = _ReadOnlyPrefetch(dispatch, ctx, tools, prefetch_executor)
+        return llm.chat_with_tools_stream(
+            round_messages,
+            tools,
+            max_tokens=round_max_tokens,
+            inference_name=inference_name,
+            trace_metadata=trace_metadata,
+            on_tool_call=prefetch.on_tool_call,
+        )
+
     output_repair_used = False
     progress = ProgressLoopContext.start(
         execution,
@@ -385,12 +502,10 @@ def run_agent_loop(
             phase="agent_loop",
         )
         try:
-            msg = llm.chat_with_tools(
+            msg = chat_round(
                 progress.messages_for_inference(messages),
-                tools,
-                max_tokens=round_max_tokens,
-                inference_name="chat_with_tools",
-                trace_metadata=round_trace,
+                "chat_with_tools",
+                round_trace,
             )
         except InferenceBudgetDenied as error:
             return AgentRunResult.invalid(error.reason)
@@ -417,12 +532,10 @@ def run_agent_loop(
                 "content": _OUTPUT_REPAIR_PROMPT,
             })
             try:
-                msg = llm.chat_with_tools(
+                msg = chat_round(
                     repair_messages,
-                    tools,
-                    max_tokens=round_max_tokens,
-                    inference_name="output_repair",
-                    trace_metadata=progress.trace(
+                    "output_repair",
+                    progress.trace(
                         round=round_idx + 1,
                         phase="output_repair",
                         extra={
@@ -539,8 +652,16 @@ def run_agent_loop(
                     ctx.owner_segment, ctx.owner_id, ctx.execution_id, name, args_label,
                     status="running",
                 )
+            prefetched = prefetch.take(name, args_json) if prefetch else None
             try:
-                result = dispatch(name, args_json, ctx)
+                if prefetched is not None:
+                    timeout_s = REGISTRY[name].timeout_s
+                    try:
+                        result = prefetched.result(timeout=timeout_s)
+                    except FutureTimeout:
+                        result = {"error": f"{name} did not answer within {timeout_s:g}s"}
+                else:
+                    result = dispatch(name, args_json, ctx)
             except Exception as error:
                 if execution and tool_trace:
                     execution.finish_tool(
@@ -617,6 +738,8 @@ def run_agent_loop(
                         "card has been shown to the user."
                     ),
                 })
+        if prefetch is not None:
+            prefetch.discard()
         if tool_budget_exhausted:
             break
 
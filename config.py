@@ -17,6 +17,9 @@ POSTGRES_DB = _db.get("name", "documents")
 POSTGRES_USER = _db.get("user", "postgres")
 POSTGRES_PASSWORD = _db.get("password", "example")
 EXECUTIONS_TABLE = _db.get("executions_table", "executions")
+# Max connections per component pool (see database/connection.py), e.g.
+# {"execution": 4, "rag": 4, "graph": 2, "memory": 2}.
+POSTGRES_POOLS = _db.get("pools", {})
 
 # Vector store (pgvector) — embeddings live in PostgreSQL tables created by the
 # backend migrations. One table per scope (physically isolated, as before).
@@ -0,0 +1,136 @@
+"""Process-wide PostgreSQL connection pools.
+
+Every component used to connect on its own: `Execution` opened a fresh
+connection for each claim, status change and child enqueue, and each `Rag`
+table, the graph and the memory reads held or opened their own. Connection
+setup (TCP, TLS, auth) costs more than the tiny queue statements it wraps, and a
+worker running several executions multiplied the server-side connection count.
+
+Now each component borrows from its own pool here, one per process:
+
+  - bounded per component (`database.pools` in config.json), so the connections
+    a worker can open are known: the sum of the pool sizes, plus the dedicated
+    queue listener (`Execution.wait_for_queued`).
+  - health-checked on checkout, so a connection the server dropped is replaced
+    instead of failing the next query.
+  - session setup (pgvector types, the AGE search_path) runs once per physical
+    connection through `configure`, not once per borrow.
+
+Pooled connections are autocommit; code that needs a transaction opens one
+explicitly with `conn.transaction()`.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+
+from config import (
+    POSTGRES_DB,
+    POSTGRES_HOST,
+    POSTGRES_PASSWORD,
+    POSTGRES_POOLS,
+    POSTGRES_PORT,
+    POSTGRES_USER,
+)
+
+# Default upper bound per component, borrowed briefly per query. The execution
+# pool is sized from the worker's slots instead (`_default_size`).
+DEFAULT_POOL_SIZES = {
+    "rag": 4,
+    "graph": 2,
+    "memory": 2,
+    "llm_cache": 2,
+    "embedding_cache": 2,
+}
+
+_lock = threading.Lock()
+_pools: Dict[str, ConnectionPool] = {}
+
+
+def connection_args() -> Dict[str, Any]:
+    """Connection parameters shared by every component."""
+    return {
+        "host": POSTGRES_HOST,
+        "port": POSTGRES_PORT,
+        "dbname": POSTGRES_DB,
+        "user": POSTGRES_USER,
+        "password": POSTGRES_PASSWORD,
+    }
+
+
+def _default_size(component: str) -> int:
+    if component == "execution":
+        from worker.capabilities import get_slot_limits
+
+        # Every slot may hold one at once, and the heartbeat and the claim
+        # loop must still get theirs: a fixed size would let a raised slot
+        # count starve them into PoolTimeout.
+        return sum(get_slot_limits().values()) + 2
+    return DEFAULT_POOL_SIZES.get(component, 2)
+
+
+def pool_size(component: str) -> int:
+    """Max connections of a component's pool: config first, then the default."""
+    default = _default_size(component)
+    try:
+        return max(1, int(POSTGRES_POOLS.get(component, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def open_pool(
+    component: str,
+    args: Dict[str, Any],
+    *,
+    row_factory=dict_row,
+    configure: Optional[Callable[[psycopg.Connection], None]] = None,
+    max_size: Optional[int] = None,
+) -> ConnectionPool:
+    """Open a pool of autocommit connections built from `args`.
+
+    Exposed for callers that connect elsewhere than the configured database
+    (tests on a scratch schema); everything else goes through `get_pool`.
+    """
+    return ConnectionPool(
+        kwargs={"row_factory": row_factory, **args, "autocommit": True},
+        min_size=1,
+        max_size=max_size or pool_size(component),
+        name=f"documents-models-{component}",
+        configure=configure,
+        check=ConnectionPool.check_connection,
+        open=True,
+    )
+
+
+def get_pool(
+    component: str,
+    *,
+    row_factory=dict_row,
+    configure: Optional[Callable[[psycopg.Connection], None]] = None,
+) -> ConnectionPool:
+    """The process-wide pool of `component`, opened on first use.
+
+    `row_factory` and `configure` only apply when the pool is created, so every
+    caller of one component must agree on them (each component has one owner
+    module, which is what keeps that true).
+    """
+    with _lock:
+        pool = _pools.get(component)
+        if pool is None or pool.closed:
+            pool = open_pool(
+                component, connection_args(), row_factory=row_factory, configure=configure,
+            )
+            _pools[component] = pool
+        return pool
+
+
+def close_pools() -> None:
+    """Close every pool of this process (shutdown, tests)."""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
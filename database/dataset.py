@@ -12,13 +12,11 @@ from database.execution import get_execution_database
 def get_dataset_records(dataset_id: int):
     """Fetch dataset schema and records directly from PostgreSQL."""
     db = get_execution_database()
-    conn = db.get_connection()
 
-    with conn.cursor() as cur:
+    with db.connection() as conn, conn.cursor() as cur:
         cur.execute("SELECT schema FROM datasets WHERE id = %s", (dataset_id,))
         row = cur.fetchone()
         if not row:
-            conn.close()
             return None, []
 
         raw_schema = row["schema"]
@@ -30,8 +28,6 @@ def get_dataset_records(dataset_id: int):
         )
         rows = cur.fetchall()
 
-    conn.close()
-
     records = [(r["id"], r["data"]) for r in rows]
     return schema, records
 
@@ -62,7 +58,6 @@ def resolve_fk_labels(schema, field_key, raw_values):
         return {}
 
     db = get_execution_database()
-    conn = db.get_connection()
     result_map = {}
 
     def _extract_display(data):
@@ -73,43 +68,40 @@ def resolve_fk_labels(schema, field_key, raw_values):
         )
         return first_str
 
-    try:
-        with conn.cursor() as cur:
-            if linked_lookup_field:
-                placeholders = ",".join(["%s"] * len(norm_values))
-                cur.execute(
-                    f"SELECT data FROM dataset_records WHERE dataset_id = %s "
-                    f"AND data ->> %s IN ({placeholders})",
-                    [linked_dataset_id, linked_lookup_field] + norm_values,
-                )
-                for row in cur.fetchall():
-                    data = row["data"] if isinstance(row["data"], dict) else json.loads(row["data"])
-                    key = normalize_fk_value(data.get(linked_lookup_field))
-                    display = _extract_display(data)
-                    if key and display:
-                        result_map[key] = display
-            else:
-                int_ids = []
-                for v in norm_values:
-                    try:
-                        int_ids.append(int(v))
-                    except (ValueError, TypeError):
-                        pass
-                if not int_ids:
-                    return {}
-                placeholders = ",".join(["%s"] * len(int_ids))
-                cur.execute(
-                    f"SELECT id, data FROM dataset_records WHERE dataset_id = %s "
-                    f"AND id IN ({placeholders})",
-                    [linked_dataset_id] + int_ids,
-                )
-                for row in cur.fetchall():
-                    data = row["data"] if isinstance(row["data"], dict) else json.loads(row["data"])
-                    key = str(row["id"])
-                    display = _extract_display(data)
-                    if display:
-                        result_map[key] = display
-    finally:
-        conn.close()
+    with db.connection() as conn, conn.cursor() as cur:
+        if linked_lookup_field:
+            placeholders = ",".join(["%s"] * len(norm_values))
+            cur.execute(
+                f"SELECT data FROM dataset_records WHERE dataset_id = %s "
+                f"AND data ->> %s IN ({placeholders})",
+                [linked_dataset_id, linked_lookup_field] + norm_values,
+            )
+            for row in cur.fetchall():
+                data = row["data"] if isinstance(row["data"], dict) else json.loads(row["data"])
+                key = normalize_fk_value(data.get(linked_lookup_field))
+                display = _extract_display(data)
+                if key and display:
+                    result_map[key] = display
+        else:
+            int_ids = []
+            for v in norm_values:
+                try:
+                    int_ids.append(int(v))
+                except (ValueError, TypeError):
+                    pass
+            if not int_ids:
+                return {}
+            placeholders = ",".join(["%s"] * len(int_ids))
+            cur.execute(
+                f"SELECT id, data FROM dataset_records WHERE dataset_id = %s "
+                f"AND id IN ({placeholders})",
+                [linked_dataset_id] + int_ids,
+            )
+            for row in cur.fetchall():
+                data = row["data"] if isinstance(row["data"], dict) else json.loads(row["data"])
+                key = str(row["id"])
+                display = _extract_display(data)
+                if display:
+                    result_map[key] = display
 
     return result_map
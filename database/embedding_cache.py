@@ -0,0 +1,179 @@
+"""Stored embeddings of texts already encoded (``embedding_cache``).
+
+Re-ingesting an edited document splits it into mostly the same chunks it had
+before, and every one of them used to go through the model again; a search
+typed twice was encoded twice. The model is deterministic, so the vector of a
+text never changes while the model doesn't: `services.embedding_service`
+looks texts up here first and encodes only the ones it has not seen.
+
+A row is keyed by a hash of what decides the vector: the model name, the E5
+prefix (``passage`` or ``query``), whether it is normalized, and the text. The
+vector is stored as raw float32 bytes. Lookups only read: a row's `last_used_at`
+is refreshed by the lookup that finds it more than an hour old, so a repeated
+search does not write on every query. The table is kept to `max_entries` rows
+by dropping the least recently used, a batch at a time. Shared by every worker
+on the database.
+
+Failures here never fail an embedding: an unavailable table is reported once
+and every text then goes to the model.
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import psycopg
+
+from database.connection import get_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 100000
+# Trimming scans the recency index down to `max_entries`, so it runs every
+# this many stored batches rather than on each one.
+_PRUNE_EVERY = 50
+# How stale `last_used_at` may get before a lookup rewrites it; recency only
+# decides what pruning drops, so to the hour is close enough.
+_TOUCH_AFTER_S = 3600
+
+_lock = threading.Lock()
+_ready: Optional[bool] = None
+_counters = {"hits": 0, "misses": 0, "stores": 0}
+
+
+def _connection():
+    # Its own pool: query embeddings sit on the search path and must not wait
+    # behind ingestion writes on the rag pool.
+    return get_pool("embedding_cache").connection()
+
+
+def cache_key(model: str, prefix: str, text: str, normalized: bool) -> str:
+    """`sha256:<hex>` of what decides the vector of `text`."""
+    digest = hashlib.sha256()
+    for part in (model, prefix, "1" if normalized else "0", text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return "sha256:" + digest.hexdigest()
+
+
+def _ensure_table() -> bool:
+    """Create the table, once per process."""
+    global _ready
+    if _ready is not None:
+        return _ready
+    with _lock:
+        if _ready is not None:
+            return _ready
+        try:
+            with _connection() as conn, conn.transaction(), conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", ("embedding_cache",))
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS embedding_cache (
+                      key varchar(71) PRIMARY KEY,
+                      vector bytea NOT NULL,
+                      created_at timestamptz NOT NULL DEFAULT now(),
+                      last_used_at timestamptz NOT NULL DEFAULT now()
+                    )
+                    """
+                )
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS embedding_cache_last_used_idx "
+                    "ON embedding_cache (last_used_at)"
+                )
+            _ready = True
+        except psycopg.Error as e:
+            logger.warning("Embedding cache unavailable (%s); encoding every text", e)
+            _ready = False
+        return _ready
+
+
+def _count(name: str, amount: int = 1) -> int:
+    with _lock:
+        _counters[name] += amount
+        return _counters[name]
+
+
+def lookup_many(keys: List[str]) -> Dict[str, bytes]:
+    """The stored vectors of those `keys` that have one."""
+    if not keys or not _ensure_table():
+        return {}
+    try:
+        with _connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT key, vector, last_used_at < now() - make_interval(secs => %s) AS stale "
+                "FROM embedding_cache WHERE key = ANY(%s)",
+                (_TOUCH_AFTER_S, sorted(set(keys))),
+            )
+            rows = cur.fetchall()
+            found = {row["key"]: bytes(row["vector"]) for row in rows}
+            stale = sorted(row["key"] for row in rows if row["stale"])
+            if stale:
+                cur.execute(
+                    "UPDATE embedding_cache SET last_used_at = now() WHERE key = ANY(%s) "
+                    "AND last_used_at < now() - make_interval(secs => %s)",
+                    (stale, _TOUCH_AFTER_S),
+                )
+    except psycopg.Error:
+        logger.exception("Error reading the embedding cache")
+        return {}
+    hits = sum(1 for key in keys if key in found)
+    _count("hits", hits)
+    _count("misses", len(keys) - hits)
+    return found
+
+
+def store_many(vectors: Dict[str, bytes], max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+    """Remember freshly encoded vectors, trimming the table when due.
+
+    Rows are written in key order, so two ingests storing overlapping chunks
+    lock them in the same order and cannot deadlock."""
+    if not vectors or not _ensure_table():
+        return
+    stores = _count("stores")
+    try:
+        with _connection() as conn, conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO embedding_cache (key, vector) VALUES (%s, %s) "
+                "ON CONFLICT (key) DO UPDATE SET last_used_at = now()",
+                sorted(vectors.items()),
+            )
+            if stores % _PRUNE_EVERY == 1:
+                cur.execute(
+                    """
+                    DELETE FROM embedding_cache WHERE key IN (
+                      SELECT key FROM embedding_cache
+                      ORDER BY last_used_at DESC OFFSET %s LIMIT 5000
+                    )
+                    """,
+                    (max(0, int(max_entries)),),
+                )
+    except psycopg.Error:
+        logger.exception("Error writing the embedding cache")
+
+
+def stats() -> Dict[str, Any]:
+    """This process's hit/miss counters and hit rate, plus the table's size."""
+    with _lock:
+        result: Dict[str, Any] = dict(_counters)
+    looked_up = result["hits"] + result["misses"]
+    result["hit_rate"] = round(result["hits"] / looked_up, 4) if looked_up else None
+    if _ensure_table():
+        try:
+            with _connection() as conn, conn.cursor() as cur:
+                cur.execute("SELECT count(*) AS entries FROM embedding_cache")
+                row = cur.fetchone()
+            result["entries"] = row["entries"]
+        except psycopg.Error:
+            logger.exception("Error reading embedding cache stats")
+    return result
+
+
+def reset() -> None:
+    """Forget the table state and counters (tests, a new database)."""
+    global _ready
+    with _lock:
+        _ready = None
+        for name in _counters:
+            _counters[name] = 0
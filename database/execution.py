@@ -2,34 +2,110 @@ import json
 import hashlib
 import logging
 import os
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
 import psycopg
 from psycopg.rows import dict_row
 
-from config import EXECUTIONS_TABLE, POSTGRES_DB, POSTGRES_HOST, POSTGRES_PASSWORD, POSTGRES_PORT, POSTGRES_USER
+from config import EXECUTIONS_TABLE
+from database.connection import connection_args, get_pool
 
 logger = logging.getLogger(__name__)
 
+# Channel the enqueue paths NOTIFY on (payload: the task type) and idle workers
+# LISTEN on, so a queued execution is picked up as soon as it is committed
+# instead of on the next poll. Anything else that queues executions (the
+# backend) can wake the workers the same way: `SELECT pg_notify('executions_queued', '<task_type>')`.
+QUEUED_CHANNEL = "executions_queued"
+# How often `wait_for_queued` looks at its `wake` event between notifications.
+_WAKE_CHECK_INTERVAL_S = 0.2
+
 
 class Execution:
     def __init__(self):
         self.table = EXECUTIONS_TABLE
-        self.connection_args = {
-            "host": POSTGRES_HOST,
-            "port": POSTGRES_PORT,
-            "dbname": POSTGRES_DB,
-            "user": POSTGRES_USER,
-            "password": POSTGRES_PASSWORD,
-            "row_factory": dict_row,
-        }
-        self.conn = psycopg.connect(**self.connection_args, autocommit=True)
+        # Kept for the connections that can't be pooled: the queue listener
+        # (LISTEN is session state) and `get_connection` callers.
+        self.connection_args = {**connection_args(), "row_factory": dict_row}
+        self.pool = get_pool("execution")
 
     def get_connection(self):
+        """A new, unpooled connection the caller owns and closes."""
         return psycopg.connect(**self.connection_args, autocommit=True)
 
+    def connection(self):
+        """A pooled autocommit connection, as a context manager that hands it
+        back to the pool on exit."""
+        return self.pool.connection()
+
+    @contextmanager
+    def _transaction(self):
+        """A pooled connection inside one transaction: committed when the block
+        exits normally, rolled back when it raises."""
+        with self.pool.connection() as conn, conn.transaction():
+            yield conn
+
+    @staticmethod
+    def _notify_queued(cur, task_type: Optional[str]) -> None:
+        """Wake idle workers once the surrounding transaction commits.
+
+        NOTIFY is transactional: a rolled-back enqueue wakes nobody, and a
+        committed one is never seen by a worker before the row is claimable.
+        """
+        cur.execute("SELECT pg_notify(%s, %s)", (QUEUED_CHANNEL, task_type or ""))
+
+    def wait_for_queued(
+        self,
+        timeout: float,
+        task_types: Optional[List[str]] = None,
+        wake: Optional[threading.Event] = None,
+    ) -> bool:
+        """Block until an execution is queued or `timeout` seconds go by.
+
+        Returns True when a notification arrived for one of `task_types` (any
+        type when None) or `wake` was set, False on timeout. `wake` lets a
+        worker with executions in flight stop waiting as soon as one of them
+        frees its slot. The listening connection is opened on first use and
+        kept; if it breaks, this degrades to a plain sleep and reconnects on
+        the next call, so the caller's poll still runs.
+        """
+        conn = getattr(self, "_listen_conn", None)
+        deadline = time.monotonic() + timeout
+        try:
+            if conn is None or conn.closed:
+                conn = psycopg.connect(**self.connection_args, autocommit=True)
+                conn.execute(f"LISTEN {QUEUED_CHANNEL}")
+                self._listen_conn = conn
+            while True:
+                if wake is not None and wake.is_set():
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                if wake is not None:
+                    remaining = min(remaining, _WAKE_CHECK_INTERVAL_S)
+                for notify in conn.notifies(timeout=remaining, stop_after=1):
+                    if task_types is None or not notify.payload or notify.payload in task_types:
+                        return True
+        except psycopg.Error as e:
+            logger.warning("Queue listener unavailable (%s); falling back to polling", e)
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._listen_conn = None
+            remaining = max(0.0, deadline - time.monotonic())
+            if wake is not None:
+                return wake.wait(remaining)
+            time.sleep(remaining)
+            return False
+
     @staticmethod
     def _canonical_json(value: Dict[str, Any]) -> str:
         return json.dumps(
@@ -51,7 +127,37 @@ class Execution:
         actor: Dict[str, Any],
         attempt_id: Optional[str] = None,
     ) -> str:
-        root_execution_id = str(execution["root_execution_id"])
+        return self._append_events(cur, str(execution["root_execution_id"]), [{
+            "execution": execution,
+            "event_type": event_type,
+            "payload_schema": payload_schema,
+            "payload": payload,
+            "producer_instance_id": producer_instance_id,
+            "actor": actor,
+            "attempt_id": attempt_id,
+        }])[0]
+
+    def append_events(self, root_execution_id: str, events: List[Dict[str, Any]]) -> List[str]:
+        """Append several events to one root's log in a single transaction.
+
+        Each event is a dict with the keyword arguments of `_append_event`
+        plus `execution` (the row it is about; it must belong to the root).
+        Returns the event ids, in order. Raises if the root doesn't exist.
+        """
+        if not events:
+            return []
+        with self._transaction() as conn, conn.cursor() as cur:
+            return self._append_events(cur, root_execution_id, events)
+
+    def _append_events(self, cur, root_execution_id: str, events: List[Dict[str, Any]]) -> List[str]:
+        """Sequence, chain and insert `events` under the root's row lock.
+
+        The root row is the log's sequencer: `last_sequence` and
+        `last_event_id` are read under `FOR UPDATE` and advanced once for the
+        whole batch, and each producer's sequences are reserved once per batch
+        (`_allocate_producer_sequences`).
+        The batch is written with one INSERT, whatever its size.
+        """
         cur.execute(
             f"SELECT last_sequence, last_event_id FROM {self.table} WHERE execution_id = %s FOR UPDATE",
             (root_execution_id,),
@@ -60,101 +166,166 @@ class Execution:
         if not root:
             raise RuntimeError(f"Root execution {root_execution_id} not found")
 
-        cur.execute(
-            """
-            SELECT COALESCE(MAX(producer_sequence), 0) + 1 AS next_sequence
-            FROM execution_events
-            WHERE root_execution_id = %s
-              AND producer_component = 'documents-models'
-              AND producer_instance_id = %s
-            """,
-            (root_execution_id, producer_instance_id),
-        )
-        producer_sequence = int(cur.fetchone()["next_sequence"])
-        sequence = int(root["last_sequence"] or 0) + 1
-        event_id = str(uuid.uuid4())
-        now = datetime.now(timezone.utc)
-        timestamp = now.isoformat().replace("+00:00", "Z")
-        envelope = {
-            "schemaVersion": "execution-event/1",
-            "eventId": event_id,
-            "rootExecutionId": root_execution_id,
-            "executionId": str(execution["execution_id"]),
-            "sequence": sequence,
-            "producerSequence": producer_sequence,
-            "eventType": event_type,
-            "producer": {
-                "component": "documents-models",
-                "instanceId": producer_instance_id,
-                "version": os.environ.get("MODELS_REVISION", "development"),
-            },
-            "actor": actor,
-            "occurredAt": timestamp,
-            "ingestedAt": timestamp,
-            "payloadSchema": payload_schema,
-            "payload": payload,
-            "artifactRefs": [],
-            "security": {
-                "dataClassification": "workspace",
-                "purpose": "evaluation",
-                "allowedDestinations": ["documents", "ai-train"],
-                "redactionApplied": False,
-            },
+        counts: Dict[str, int] = {}
+        for event in events:
+            counts[event["producer_instance_id"]] = counts.get(event["producer_instance_id"], 0) + 1
+        next_producer_sequence = {
+            producer: self._allocate_producer_sequences(cur, root_execution_id, producer, count)
+            for producer, count in counts.items()
         }
-        if execution.get("parent_execution_id"):
-            envelope["parentExecutionId"] = str(execution["parent_execution_id"])
-        if execution.get("turn_id"):
-            envelope["turnId"] = str(execution["turn_id"])
-        if attempt_id:
-            envelope["attemptId"] = str(attempt_id)
-        if root.get("last_event_id"):
-            envelope["causedByEventId"] = str(root["last_event_id"])
-        content_hash = "sha256:" + hashlib.sha256(
-            self._canonical_json(envelope).encode("utf-8")
-        ).hexdigest()
-        envelope["contentHash"] = content_hash
 
-        cur.execute(
-            """
-            INSERT INTO execution_events (
-              event_id, root_execution_id, sequence, producer_component,
-              producer_instance_id, producer_sequence, event_type, execution_id,
-              operation_id, attempt_id, caused_by_event_id, occurred_at,
-              ingested_at, content_hash, envelope
-            ) VALUES (%s, %s, %s, 'documents-models', %s, %s, %s, %s,
-                      NULL, %s, %s, %s, %s, %s, %s)
-            """,
-            (
+        sequence = int(root["last_sequence"] or 0)
+        caused_by = root.get("last_event_id")
+        version = os.environ.get("MODELS_REVISION", "development")
+        now = datetime.now(timezone.utc)
+        timestamp = now.isoformat().replace("+00:00", "Z")
+        rows = []
+        for event in events:
+            execution = event["execution"]
+            producer_instance_id = event["producer_instance_id"]
+            attempt_id = event.get("attempt_id")
+            producer_sequence = next_producer_sequence[producer_instance_id]
+            next_producer_sequence[producer_instance_id] += 1
+            sequence += 1
+            event_id = str(uuid.uuid4())
+            envelope = {
+                "schemaVersion": "execution-event/1",
+                "eventId": event_id,
+                "rootExecutionId": root_execution_id,
+                "executionId": str(execution["execution_id"]),
+                "sequence": sequence,
+                "producerSequence": producer_sequence,
+                "eventType": event["event_type"],
+                "producer": {
+                    "component": "documents-models",
+                    "instanceId": producer_instance_id,
+                    "version": version,
+                },
+                "actor": event["actor"],
+                "occurredAt": timestamp,
+                "ingestedAt": timestamp,
+                "payloadSchema": event["payload_schema"],
+                "payload": event["payload"],
+                "artifactRefs": [],
+                "security": {
+                    "dataClassification": "workspace",
+                    "purpose": "evaluation",
+                    "allowedDestinations": ["documents", "ai-train"],
+                    "redactionApplied": False,
+                },
+            }
+            if execution.get("parent_execution_id"):
+                envelope["parentExecutionId"] = str(execution["parent_execution_id"])
+            if execution.get("turn_id"):
+                envelope["turnId"] = str(execution["turn_id"])
+            if attempt_id:
+                envelope["attemptId"] = str(attempt_id)
+            if caused_by:
+                envelope["causedByEventId"] = str(caused_by)
+            content_hash = "sha256:" + hashlib.sha256(
+                self._canonical_json(envelope).encode("utf-8")
+            ).hexdigest()
+            envelope["contentHash"] = content_hash
+            rows.append((
                 event_id,
-                root_execution_id,
                 sequence,
                 producer_instance_id,
                 producer_sequence,
-                event_type,
-                execution["execution_id"],
-                attempt_id,
-                root.get("last_event_id"),
-                now,
-                now,
+                event["event_type"],
+                str(execution["execution_id"]),
+                str(attempt_id) if attempt_id else None,
+                str(caused_by) if caused_by else None,
                 content_hash,
                 json.dumps(envelope),
-            ),
+            ))
+            caused_by = event_id
+
+        columns = list(zip(*rows))
+        cur.execute(
+            f"""
+            WITH inserted AS (
+              INSERT INTO execution_events (
+                event_id, root_execution_id, sequence, producer_component,
+                producer_instance_id, producer_sequence, event_type, execution_id,
+                operation_id, attempt_id, caused_by_event_id, occurred_at,
+                ingested_at, content_hash, envelope
+              )
+              SELECT e.event_id, %(root)s, e.sequence, 'documents-models',
+                     e.producer_instance_id, e.producer_sequence, e.event_type, e.execution_id,
+                     NULL, e.attempt_id, e.caused_by_event_id, %(now)s,
+                     %(now)s, e.content_hash, e.envelope
+              FROM unnest(
+                %(event_ids)s::uuid[], %(sequences)s::bigint[], %(producers)s::text[],
+                %(producer_sequences)s::bigint[], %(event_types)s::text[], %(execution_ids)s::uuid[],
+                %(attempt_ids)s::uuid[], %(caused_by)s::uuid[], %(content_hashes)s::text[],
+                %(envelopes)s::jsonb[]
+              ) AS e(event_id, sequence, producer_instance_id, producer_sequence, event_type,
+                     execution_id, attempt_id, caused_by_event_id, content_hash, envelope)
+            )
+            UPDATE {self.table} SET last_sequence = %(sequence)s, last_event_id = %(last_event)s, updated_at = now()
+            WHERE execution_id = %(root)s
+            """,
+            {
+                "root": root_execution_id,
+                "now": now,
+                "event_ids": list(columns[0]),
+                "sequences": list(columns[1]),
+                "producers": list(columns[2]),
+                "producer_sequences": list(columns[3]),
+                "event_types": list(columns[4]),
+                "execution_ids": list(columns[5]),
+                "attempt_ids": list(columns[6]),
+                "caused_by": list(columns[7]),
+                "content_hashes": list(columns[8]),
+                "envelopes": list(columns[9]),
+                "sequence": sequence,
+                "last_event": caused_by,
+            },
         )
+        return list(columns[0])
+
+    def _allocate_producer_sequences(self, cur, root_execution_id: str, producer_instance_id: str, count: int) -> int:
+        """Reserve `count` consecutive producer sequences; returns the first.
+
+        The MAX is read from the UNIQUE (root, component, producer, sequence)
+        index of `execution_events`: one descent to the end of the producer's
+        range, not a scan of the root's log. Callers hold the root row lock,
+        which is what serializes allocations per root.
+        """
         cur.execute(
-            f"UPDATE {self.table} SET last_sequence = %s, last_event_id = %s, updated_at = now() WHERE execution_id = %s",
-            (sequence, event_id, root_execution_id),
+            """
+            SELECT COALESCE(MAX(producer_sequence), 0) + 1 AS next_sequence
+            FROM execution_events
+            WHERE root_execution_id = %s
+              AND producer_component = 'documents-models'
+              AND producer_instance_id = %s
+            """,
+            (root_execution_id, producer_instance_id),
         )
-        return event_id
+        return int(cur.fetchone()["next_sequence"])
 
-    def claim_pending_execution(self, worker_id: str, capabilities: List[str]) -> Optional[Dict[str, Any]]:
+    def claim_pending_execution(
+        self,
+        worker_id: str,
+        capabilities: List[str],
+        task_types: Optional[List[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Claim the next eligible queued execution, or None.
+
+        `task_types` narrows the claim to types the caller has a free slot
+        for; it must already be a subset of what `capabilities` supports.
+        """
         from worker.capabilities import get_supported_task_types
 
-        supported_types = get_supported_task_types(capabilities)
+        if task_types is not None:
+            supported_types = list(task_types)
+        else:
+            supported_types = get_supported_task_types(capabilities)
         if not supported_types:
             return None
-        conn = psycopg.connect(**self.connection_args, autocommit=False)
+        self._ensure_queued_index()
         try:
-            with conn.cursor() as cur:
+            with self._transaction() as conn, conn.cursor() as cur:
                 priorities = ["high", "normal"]
                 if self._is_background_eligible(cur):
                     priorities.append("background")
@@ -174,7 +345,6 @@ class Execution:
                 )
                 execution = cur.fetchone()
                 if not execution:
-                    conn.rollback()
                     return None
                 attempt_id = str(uuid.uuid4())
                 cur.execute(
@@ -206,15 +376,11 @@ class Execution:
                     actor={"type": "worker", "id": worker_id},
                     attempt_id=attempt_id,
                 )
-                conn.commit()
-                self._decode(execution)
-                return execution
+            self._decode(execution)
+            return execution
         except Exception:
-            conn.rollback()
             logger.exception("Error claiming execution")
             return None
-        finally:
-            conn.close()
 
     def _is_background_eligible(self, cur) -> bool:
         from lib.llm.config import get_worker_config
@@ -223,8 +389,82 @@ class Execution:
         hour = datetime.now().hour
         if int(worker.get("background_hours_start", 2)) <= hour < int(worker.get("background_hours_end", 6)):
             return True
-        cur.execute(f"SELECT COUNT(*) AS count FROM {self.table} WHERE status = 'queued' AND priority IN ('high', 'normal')")
-        return cur.fetchone()["count"] == 0
+        # Stops at the first queued high/normal row of the partial index, so
+        # it costs the same however long the queue is.
+        cur.execute(
+            f"SELECT EXISTS(SELECT 1 FROM {self.table} "
+            "WHERE status = 'queued' AND priority IN ('high', 'normal')) AS busy"
+        )
+        return not cur.fetchone()["busy"]
+
+    def _ensure_queued_index(self) -> bool:
+        """Index the queued executions by priority, once per process.
+
+        `{table}_queued_priority_idx` is a partial index over the rows with
+        `status = 'queued'`, so it stays as small as the queue. The background
+        eligibility check and `queue_stats` read only this index. It is built
+        `CONCURRENTLY` so writes keep going while it is built.
+
+        One worker builds it: the others don't wait on the advisory lock (a
+        waiting statement holds a snapshot the build would wait for in turn),
+        they go on without the index and look again on their next claim. A
+        build that was interrupted leaves an invalid index behind, which is
+        dropped and built again.
+
+        Non-fatal: without the privileges to build it, the same queries scan
+        the queue.
+        """
+        ready = getattr(self, "_queued_index_ready", None)
+        if ready is not None:
+            return ready
+        index = f"{self.table}_queued_priority_idx"
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(hashtext(%s)) AS locked", (index,))
+                if not cur.fetchone()["locked"]:
+                    return False
+                try:
+                    cur.execute(
+                        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)",
+                        (index,),
+                    )
+                    row = cur.fetchone()
+                    if row is not None and not row["indisvalid"]:
+                        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+                        row = None
+                    if row is None:
+                        cur.execute(
+                            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} "
+                            f"ON {self.table} (priority) WHERE status = 'queued'"
+                        )
+                finally:
+                    cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (index,))
+            self._queued_index_ready = True
+        except psycopg.Error as e:
+            logger.warning("Queued-priority index unavailable (%s); scanning the queue instead", e)
+            self._queued_index_ready = False
+        return self._queued_index_ready
+
+    def queue_stats(self) -> Dict[str, int]:
+        """Queued executions per priority, e.g. `{"high": 0, "normal": 12, "background": 3}`.
+
+        Counted from the partial index over queued rows, so it is cheap enough
+        to poll; every known priority is present even when nothing of it is
+        queued.
+        """
+        stats = {"high": 0, "normal": 0, "background": 0}
+        self._ensure_queued_index()
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT priority, COUNT(*) AS queued FROM {self.table} "
+                    "WHERE status = 'queued' GROUP BY priority"
+                )
+                for row in cur.fetchall():
+                    stats[row["priority"]] = int(row["queued"])
+        except Exception:
+            logger.exception("Error reading queue stats")
+        return stats
 
     def update_execution_status(
         self,
@@ -236,9 +476,8 @@ class Execution:
     ) -> bool:
         terminal = status in {"completed", "failed", "cancelled"}
         released = status in {"queued", "waiting"} or phase == "backend_finalization" or terminal
-        conn = psycopg.connect(**self.connection_args, autocommit=False)
         try:
-            with conn.cursor() as cur:
+            with self._transaction() as conn, conn.cursor() as cur:
                 attempt_filter = " AND attempt_id = %s" if attempt_id else ""
                 select_params = [execution_id]
                 if attempt_id:
@@ -249,7 +488,6 @@ class Execution:
                 )
                 execution = cur.fetchone()
                 if not execution:
-                    conn.rollback()
                     return False
                 self._decode(execution)
                 previous_status = execution["status"]
@@ -315,18 +553,110 @@ class Execution:
                     actor={"type": "worker"},
                     attempt_id=attempt_id,
                 )
-                conn.commit()
-                return True
+                if status == "queued":
+                    self._notify_queued(cur, execution.get("task_type"))
+            return True
         except Exception:
-            conn.rollback()
             logger.exception("Error updating execution %s", execution_id)
             return False
-        finally:
-            conn.close()
+
+    def store_chunks(self, chunks: List[str]) -> Optional[List[str]]:
+        """Store chunk texts out of row and return their references.
+
+        A map-reduce fan-out used to carry every chunk inside the parent's
+        checkpoint and again inside each child's payload, so each checkpoint
+        read and write moved the whole document. The texts now go once into
+        `execution_chunks`, keyed by content (`sha256:<hex>`, the same format
+        as event content hashes), and rows hold only the references. Identical
+        chunks, such as a document summarized twice, are stored once.
+
+        Storing a chunk refreshes its `last_used_at`. Chunks unused for longer
+        than `worker.chunk_retention_hours` are pruned here, a batch at a
+        time. Returns None when the store is unavailable, in which case
+        callers keep the texts inline as before.
+        """
+        if not self._ensure_chunk_store():
+            return None
+        refs = [
+            "sha256:" + hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+            for chunk in chunks
+        ]
+        from lib.llm.config import get_worker_config
+
+        retention_hours = float(get_worker_config().get("chunk_retention_hours", 168))
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO execution_chunks (digest, content)
+                    SELECT DISTINCT ON (digest) digest, content
+                    FROM unnest(%s::text[], %s::text[]) AS chunk(digest, content)
+                    ON CONFLICT (digest) DO UPDATE SET last_used_at = now()
+                    """,
+                    (refs, chunks),
+                )
+                cur.execute(
+                    """
+                    DELETE FROM execution_chunks WHERE digest IN (
+                      SELECT digest FROM execution_chunks
+                      WHERE last_used_at < now() - make_interval(secs => %s)
+                      LIMIT 500
+                    )
+                    """,
+                    (retention_hours * 3600,),
+                )
+            return refs
+        except Exception:
+            logger.exception("Error storing %d chunks", len(chunks))
+            return None
+
+    def load_chunks(self, refs: List[str]) -> List[str]:
+        """The texts behind `store_chunks` references, in order. Raises
+        `KeyError` naming the first reference that is no longer stored."""
+        if not refs:
+            return []
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT digest, content FROM execution_chunks WHERE digest = ANY(%s)",
+                (list(refs),),
+            )
+            found = {row["digest"]: row["content"] for row in cur.fetchall()}
+        missing = next((ref for ref in refs if ref not in found), None)
+        if missing is not None:
+            raise KeyError(f"chunk {missing} is no longer stored")
+        return [found[ref] for ref in refs]
+
+    def _ensure_chunk_store(self) -> bool:
+        """Create `execution_chunks`, once per process. Non-fatal, like the
+        other worker-owned tables."""
+        ready = getattr(self, "_chunk_store_ready", None)
+        if ready is not None:
+            return ready
+        try:
+            with self.connection() as conn, conn.transaction(), conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", ("execution_chunks",))
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS execution_chunks (
+                      digest varchar(71) PRIMARY KEY,
+                      content text NOT NULL,
+                      last_used_at timestamptz NOT NULL DEFAULT now()
+                    )
+                    """
+                )
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS execution_chunks_last_used_idx "
+                    "ON execution_chunks (last_used_at)"
+                )
+            self._chunk_store_ready = True
+        except psycopg.Error as e:
+            logger.warning("Chunk store unavailable (%s); keeping chunks inline", e)
+            self._chunk_store_ready = False
+        return self._chunk_store_ready
 
     def update_execution_result(self, execution_id: str, result: Dict[str, Any], result_blob: Optional[bytes] = None, attempt_id: Optional[str] = None) -> bool:
         try:
-            with self.conn.cursor() as cur:
+            with self.connection() as conn, conn.cursor() as cur:
                 attempt_filter = " AND attempt_id = %s" if attempt_id else ""
                 params = [json.dumps(result), result_blob, execution_id]
                 if attempt_id:
@@ -342,7 +672,7 @@ class Execution:
 
     def update_agent_progress(self, execution_id: str, step: int, checkpoint: Dict[str, Any], attempt_id: Optional[str] = None) -> bool:
         try:
-            with self.conn.cursor() as cur:
+            with self.connection() as conn, conn.cursor() as cur:
                 attempt_filter = " AND attempt_id = %s" if attempt_id else ""
                 params = [step, json.dumps(checkpoint), execution_id]
                 if attempt_id:
@@ -361,7 +691,7 @@ class Execution:
 
     def update_agent_state(self, execution_id: str, checkpoint: Dict[str, Any], attempt_id: Optional[str] = None) -> bool:
         try:
-            with self.conn.cursor() as cur:
+            with self.connection() as conn, conn.cursor() as cur:
                 attempt_filter = " AND attempt_id = %s" if attempt_id else ""
                 params = [json.dumps(checkpoint), execution_id]
                 if attempt_id:
@@ -377,7 +707,7 @@ class Execution:
 
     def get_execution(self, execution_id: str) -> Optional[Dict[str, Any]]:
         try:
-            with self.conn.cursor() as cur:
+            with self.connection() as conn, conn.cursor() as cur:
                 cur.execute(f"SELECT * FROM {self.table} WHERE execution_id = %s", (execution_id,))
                 row = cur.fetchone()
                 self._decode(row)
@@ -387,68 +717,102 @@ class Execution:
             return None
 
     def enqueue_child_execution(self, parent_execution_id: str, task_type: str, payload: Dict[str, Any], priority: str = "normal", agent_max_steps: int = 1, agent_kind: Optional[str] = None) -> Optional[str]:
-        conn = psycopg.connect(**self.connection_args, autocommit=False)
+        children = self.enqueue_child_executions(
+            parent_execution_id, task_type, [payload],
+            priority=priority, agent_max_steps=agent_max_steps, agent_kind=agent_kind,
+        )
+        return children[0] if children else None
+
+    def enqueue_child_executions(self, parent_execution_id: str, task_type: str, payloads: List[Dict[str, Any]], priority: str = "normal", agent_max_steps: int = 1, agent_kind: Optional[str] = None) -> Optional[List[str]]:
+        """Queue one child per payload, all or nothing, in one transaction.
+
+        A fan-out of N chunks is one parent lock, one multi-row INSERT, one
+        batched `execution.created` append and one NOTIFY, instead of N of
+        each. Returns the child ids in payload order, or None if nothing was
+        queued (unknown parent, database error).
+        """
+        if not payloads:
+            return []
         try:
-            execution_id = str(uuid.uuid4())
-            child_payload = dict(payload or {})
-            if agent_kind:
-                child_payload["kind"] = agent_kind
-            with conn.cursor() as cur:
+            with self._transaction() as conn, conn.cursor() as cur:
                 cur.execute(
                     f"SELECT * FROM {self.table} WHERE execution_id = %s FOR UPDATE",
                     (parent_execution_id,),
                 )
                 parent = cur.fetchone()
                 if not parent:
-                    conn.rollback()
                     return None
-                self._decode(parent)
-                cur.execute(
-                    f"""
-                    INSERT INTO {self.table} (
-                      execution_id, root_execution_id, parent_execution_id, owner_principal,
-                      workspace_id, schema_version, task_type, origin, priority, payload, status, max_steps
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, 'child', %s, %s, 'queued', %s)
-                    """,
-                    (execution_id, parent["root_execution_id"], parent_execution_id,
-                     parent["owner_principal"], parent["workspace_id"], parent["schema_version"],
-                     task_type, priority, json.dumps(child_payload), agent_max_steps),
+                return self._insert_children(
+                    cur, parent, task_type, payloads,
+                    priority=priority, agent_max_steps=agent_max_steps, agent_kind=agent_kind,
                 )
-                child = {
+        except Exception:
+            logger.exception("Error enqueueing child executions")
+            return None
+
+    def _insert_children(self, cur, parent: Dict[str, Any], task_type: str, payloads: List[Dict[str, Any]], *, priority: str = "normal", agent_max_steps: int = 1, agent_kind: Optional[str] = None) -> List[str]:
+        """Insert, log and announce children of `parent` (a row the caller has
+        locked) inside the caller's transaction."""
+        parent_execution_id = str(parent["execution_id"])
+        execution_ids = [str(uuid.uuid4()) for _ in payloads]
+        child_payloads = []
+        for payload in payloads:
+            child_payload = dict(payload or {})
+            if agent_kind:
+                child_payload["kind"] = agent_kind
+            child_payloads.append(json.dumps(child_payload))
+        cur.execute(
+            f"""
+            INSERT INTO {self.table} (
+              execution_id, root_execution_id, parent_execution_id, owner_principal,
+              workspace_id, schema_version, task_type, origin, priority, payload, status, max_steps
+            )
+            SELECT child.execution_id, %s, %s, %s, %s, %s, %s, 'child', %s, child.payload, 'queued', %s
+            FROM unnest(%s::uuid[], %s::jsonb[]) AS child(execution_id, payload)
+            """,
+            (parent["root_execution_id"], parent_execution_id,
+             parent["owner_principal"], parent["workspace_id"], parent["schema_version"],
+             task_type, priority, agent_max_steps, execution_ids, child_payloads),
+        )
+        self._append_events(cur, str(parent["root_execution_id"]), [
+            {
+                "execution": {
                     "execution_id": execution_id,
                     "root_execution_id": parent["root_execution_id"],
                     "parent_execution_id": parent_execution_id,
                     "turn_id": None,
-                }
-                self._append_event(
-                    cur,
-                    child,
-                    event_type="execution.created",
-                    payload_schema="execution.created/1",
-                    payload={
-                        "executionKind": task_type,
-                        "initialStatus": "queued",
-                    },
-                    producer_instance_id=f"orchestrator:{parent_execution_id}",
-                    actor={"type": "worker"},
-                )
-                conn.commit()
-            return execution_id
-        except Exception:
-            conn.rollback()
-            logger.exception("Error enqueueing child execution")
-            return None
-        finally:
-            conn.close()
+                },
+                "event_type": "execution.created",
+                "payload_schema": "execution.created/1",
+                "payload": {
+                    "executionKind": task_type,
+                    "initialStatus": "queued",
+                },
+                "producer_instance_id": f"orchestrator:{parent_execution_id}",
+                "actor": {"type": "worker"},
+            }
+            for execution_id in execution_ids
+        ])
+        # Every listening worker receives each notification, so one wakes
+        # them all; the ones that find no room go back to waiting.
+        self._notify_queued(cur, task_type)
+        return execution_ids
 
     def wake_waiting_execution(self, execution_id: str) -> bool:
         return self.update_execution_status(execution_id, "queued")
 
     @staticmethod
     def _build_retry_payload(checkpoint: Dict[str, Any], index: int) -> Dict[str, Any]:
-        chunks = checkpoint.get("chunks") or []
         payload = dict(checkpoint.get("chunk_payload_template") or {})
-        payload[checkpoint.get("chunk_field", "content")] = chunks[index] if index < len(chunks) else ""
+        refs = checkpoint.get("chunk_refs")
+        if isinstance(refs, list):
+            if index < len(refs):
+                payload["_chunk_ref"] = refs[index]
+            else:
+                payload[checkpoint.get("chunk_field", "content")] = ""
+        else:
+            chunks = checkpoint.get("chunks") or []
+            payload[checkpoint.get("chunk_field", "content")] = chunks[index] if index < len(chunks) else ""
         payload["_chunk_idx"] = index
         offsets = checkpoint.get("chunk_offsets")
         if isinstance(offsets, list) and index < len(offsets):
@@ -456,41 +820,118 @@ class Execution:
         return payload
 
     def resume_parent_with_child(self, parent_id: str, child_id: str, *, success_result: Optional[Dict[str, Any]] = None, error: Optional[str] = None, max_retries: int = 0) -> Dict[str, Any]:
-        parent = self.get_execution(parent_id)
-        if not parent:
-            return {"action": "ignored", "reason": "parent_not_found"}
-        checkpoint = parent.get("checkpoint") or {}
-        waiting = checkpoint.get("waiting_for_children") or {}
+        """Integrate a finished fan-out child into its parent's checkpoint.
+
+        The child's slot in `waiting_for_children`/`pending` is cleared, its
+        result (None when it failed for good) recorded under its chunk index,
+        and `children_outstanding` decremented, all in one UPDATE conditioned
+        on the parent still waiting for this child. Siblings finishing at the
+        same time serialize on the row lock only for that statement, and a
+        duplicate completion matches nothing. The last child wakes the parent.
+
+        A failed child with retries left is replaced by a fresh one for the
+        same chunk instead (`_retry_child`).
+        """
         key = str(child_id)
-        if key not in waiting:
-            return {"action": "ignored", "reason": "not_waiting_on_child"}
-        index = int(waiting.pop(key))
-        pending = checkpoint.setdefault("pending", {})
-        pending.pop(key, None)
-        results = checkpoint.setdefault("results", {})
-        action = "result_recorded"
-        if error is None:
-            results[str(index)] = success_result or {}
-        else:
-            retries = checkpoint.setdefault("retries", {})
-            attempts = int(retries.get(str(index), 0))
-            child = None
-            if attempts < max_retries:
-                child = self.enqueue_child_execution(parent_id, parent["task_type"], self._build_retry_payload(checkpoint, index))
-            if child:
-                retries[str(index)] = attempts + 1
-                waiting[child] = index
-                pending[child] = index
-                action = "retry_enqueued"
-            else:
-                results[str(index)] = None
-                checkpoint.update(failed_idx=index, failed_error=error)
-                action = "failed_no_retries"
-        checkpoint["waiting_for_children"] = waiting
-        self.update_agent_state(parent_id, checkpoint)
-        if not waiting:
+        if error is not None and max_retries > 0:
+            retried = self._retry_child(parent_id, key, max_retries)
+            if retried is not None:
+                return retried
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    UPDATE {self.table}
+                    SET checkpoint = (checkpoint #- ARRAY['waiting_for_children', %(key)s] #- ARRAY['pending', %(key)s])
+                        || jsonb_build_object(
+                             'results', COALESCE(checkpoint->'results', '{{}}'::jsonb)
+                                        || jsonb_build_object(checkpoint->'waiting_for_children'->>%(key)s, %(result)s::jsonb),
+                             'children_outstanding', COALESCE(
+                               (checkpoint->>'children_outstanding')::int,
+                               (SELECT COUNT(*) FROM jsonb_object_keys(checkpoint->'waiting_for_children'))::int
+                             ) - 1
+                           )
+                        || CASE WHEN %(error)s::text IS NULL THEN '{{}}'::jsonb
+                                ELSE jsonb_build_object(
+                                  'failed_idx', (checkpoint->'waiting_for_children'->>%(key)s)::int,
+                                  'failed_error', %(error)s::text
+                                )
+                           END,
+                        updated_at = now()
+                    WHERE execution_id = %(parent)s
+                      AND checkpoint->'waiting_for_children' ? %(key)s
+                    RETURNING (checkpoint->>'children_outstanding')::int AS outstanding
+                    """,
+                    {
+                        "key": key,
+                        "parent": parent_id,
+                        "result": json.dumps(success_result or {}) if error is None else "null",
+                        "error": error,
+                    },
+                )
+                row = cur.fetchone()
+                if row is None:
+                    cur.execute(f"SELECT 1 FROM {self.table} WHERE execution_id = %s", (parent_id,))
+                    reason = "not_waiting_on_child" if cur.fetchone() else "parent_not_found"
+                    return {"action": "ignored", "reason": reason}
+        except Exception:
+            logger.exception("Error resuming parent %s with child %s", parent_id, child_id)
+            return {"action": "ignored", "reason": "database_error"}
+        all_done = row["outstanding"] <= 0
+        if all_done:
             self.wake_waiting_execution(parent_id)
-        return {"action": action, "all_done": not waiting}
+        return {
+            "action": "result_recorded" if error is None else "failed_no_retries",
+            "all_done": all_done,
+        }
+
+    def _retry_child(self, parent_id: str, key: str, max_retries: int) -> Optional[Dict[str, Any]]:
+        """Swap a failed child for a retry of its chunk, in one transaction.
+
+        Returns the outcome, or None when the chunk has no retries left (or
+        the retry could not be queued) and the failure should be recorded.
+        """
+        try:
+            with self._transaction() as conn, conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT * FROM {self.table} WHERE execution_id = %s FOR UPDATE",
+                    (parent_id,),
+                )
+                parent = cur.fetchone()
+                if not parent:
+                    return {"action": "ignored", "reason": "parent_not_found"}
+                self._decode(parent)
+                checkpoint = parent.get("checkpoint") or {}
+                waiting = checkpoint.get("waiting_for_children") or {}
+                if key not in waiting:
+                    return {"action": "ignored", "reason": "not_waiting_on_child"}
+                index = int(waiting[key])
+                attempts = int((checkpoint.get("retries") or {}).get(str(index), 0))
+                if attempts >= max_retries:
+                    return None
+                [child] = self._insert_children(
+                    cur, parent, parent["task_type"], [self._build_retry_payload(checkpoint, index)],
+                )
+                cur.execute(
+                    f"""
+                    UPDATE {self.table}
+                    SET checkpoint = checkpoint || jsonb_build_object(
+                          'waiting_for_children', ((checkpoint->'waiting_for_children') - %(key)s::text)
+                                                  || jsonb_build_object(%(child)s::text, %(index)s::int),
+                          'pending', (COALESCE(checkpoint->'pending', '{{}}'::jsonb) - %(key)s::text)
+                                     || jsonb_build_object(%(child)s::text, %(index)s::int),
+                          'retries', COALESCE(checkpoint->'retries', '{{}}'::jsonb)
+                                     || jsonb_build_object(%(index)s::text, %(attempts)s::int)
+                        ),
+                        updated_at = now()
+                    WHERE execution_id = %(parent)s
+                    """,
+                    {"key": key, "child": child, "index": index, "attempts": attempts + 1, "parent": parent_id},
+                )
+            return {"action": "retry_enqueued", "all_done": False}
+        except Exception:
+            logger.exception("Error retrying child %s of %s", key, parent_id)
+            return None
 
     @staticmethod
     def _decode(row: Optional[Dict[str, Any]]) -> None:
@@ -9,12 +9,9 @@ from config import (
     GRAPH_NAME,
     GRAPH_NEIGHBORHOOD_DEPTH,
     GRAPH_NEIGHBORHOOD_LIMIT,
-    POSTGRES_HOST,
-    POSTGRES_PORT,
     POSTGRES_DB,
-    POSTGRES_USER,
-    POSTGRES_PASSWORD,
 )
+from database.connection import get_pool
 
 logger = logging.getLogger(__name__)
 
@@ -45,32 +42,23 @@ class GraphDB:
 
     def __init__(self):
         logger.info("Connecting to graph (Apache AGE) graph=%s db=%s", GRAPH_NAME, POSTGRES_DB)
-        self.conn = self._connect()
+        self.pool = get_pool("graph", row_factory=tuple_row, configure=self._configure_session)
         self._ensure_graph()
         self._ensure_indexes()
 
-    def _connect(self):
-        conn = psycopg.connect(
-            host=POSTGRES_HOST,
-            port=POSTGRES_PORT,
-            dbname=POSTGRES_DB,
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD,
-            autocommit=True,
-            row_factory=tuple_row,
-        )
+    @staticmethod
+    def _configure_session(conn: psycopg.Connection) -> None:
         # AGE must be loaded and its catalog put on the search_path per session
-        # before any cypher() call.
+        # before any cypher() call; the pool runs this once per new connection.
         with conn.cursor() as cur:
             cur.execute("CREATE EXTENSION IF NOT EXISTS age")
             cur.execute("LOAD 'age'")
             cur.execute('SET search_path = ag_catalog, "$user", public')
-        return conn
 
     def _ensure_graph(self):
         """Create the graph if it doesn't exist yet (idempotent)."""
         try:
-            with self.conn.cursor() as cur:
+            with self.pool.connection() as conn, conn.cursor() as cur:
                 cur.execute(
                     "SELECT count(*) FROM ag_catalog.ag_graph WHERE name = %s",
                     (GRAPH_NAME,),
@@ -90,7 +78,7 @@ class GraphDB:
         (as before). A btree on the property column keeps lookups fast.
         """
         try:
-            with self.conn.cursor() as cur:
+            with self.pool.connection() as conn, conn.cursor() as cur:
                 cur.execute(
                     f'CREATE INDEX IF NOT EXISTS entity_entity_id_idx '
                     f'ON {GRAPH_NAME}."Entity" '
@@ -102,7 +90,8 @@ class GraphDB:
             logger.warning("Could not ensure AGE indexes: %s", e)
 
     def close(self):
-        self.conn.close()
+        """Nothing to close: the connections belong to the shared `graph` pool,
+        which `database.connection.close_pools` closes for the whole process."""
 
     # ── internal cypher execution ────────────────────────────────────────────
 
@@ -116,7 +105,7 @@ class GraphDB:
         e.g. "source agtype, predicate agtype".
         """
         sql = f"SELECT * FROM cypher('{GRAPH_NAME}', $$ {body} $$, %s) AS ({columns})"
-        with self.conn.cursor() as cur:
+        with self.pool.connection() as conn, conn.cursor() as cur:
             cur.execute(sql, (json.dumps(params or {}),))
             return cur.fetchall()
 
@@ -126,7 +115,7 @@ class GraphDB:
         AGE still requires a column definition list, so we RETURN a dummy value.
         """
         sql = f"SELECT * FROM cypher('{GRAPH_NAME}', $$ {body} RETURN 1 $$, %s) AS (ok agtype)"
-        with self.conn.cursor() as cur:
+        with self.pool.connection() as conn, conn.cursor() as cur:
             cur.execute(sql, (json.dumps(params or {}),))
 
     # ── writes ───────────────────────────────────────────────────────────────
@@ -0,0 +1,134 @@
+"""What each indexed folder file was last ingested from (``indexed_file_manifest``).
+
+A folder rescan sends `indexed-file-ingest` every file it finds, changed or
+not, with the checksum it already computed. The manifest remembers, per
+indexed file, the checksum of the content that was ingested, the version of
+the chunker that split it, the embedding model that encoded it, the filename
+and owner written into its chunks, and how many chunks it produced.
+`tasks.indexed_file` returns early when all of them match and the file's
+chunks are all still stored.
+
+The rows live next to ``indexed_file_chunks`` and go through the folder
+table's pool. A row can outlive its chunks: a file deleted from the backend
+takes its chunks with it (``ON DELETE CASCADE``) but not its manifest. This is
+why a file only counts as up to date while its stored chunks match the count
+recorded here.
+
+Failures here never fail an ingest: an unavailable table is reported once and
+every file is then ingested in full.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import psycopg
+
+from config import FOLDER_TABLE
+from database.rag import get_folder_rag
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_ready: Optional[bool] = None
+
+
+def _connection():
+    return get_folder_rag().pool.connection()
+
+
+def _ensure_table() -> bool:
+    """Create the table, once per process."""
+    global _ready
+    if _ready is not None:
+        return _ready
+    with _lock:
+        if _ready is not None:
+            return _ready
+        try:
+            with _connection() as conn, conn.transaction(), conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", ("indexed_file_manifest",))
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS indexed_file_manifest (
+                      indexed_file_id bigint PRIMARY KEY,
+                      checksum text NOT NULL,
+                      chunker_version text NOT NULL,
+                      model text NOT NULL,
+                      filename text NOT NULL,
+                      owner_tag text NOT NULL,
+                      chunks integer NOT NULL,
+                      ingested_at timestamptz NOT NULL DEFAULT now()
+                    )
+                    """
+                )
+            _ready = True
+        except psycopg.Error as e:
+            logger.warning("Ingest manifest unavailable (%s); ingesting every file", e)
+            _ready = False
+        return _ready
+
+
+def current_chunks(indexed_file_id: int, checksum: str, chunker_version: str,
+                   model: str, filename: str, owner_tag: str) -> Optional[int]:
+    """How many chunks the file has stored, if they were made from this
+    checksum by this chunker and model, under this filename and owner, and
+    are all still there; else None."""
+    if not checksum or not _ensure_table():
+        return None
+    try:
+        with _connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT m.checksum, m.chunker_version, m.model, m.filename, m.owner_tag, m.chunks,
+                       (SELECT count(*) FROM "{FOLDER_TABLE}" c
+                        WHERE c.indexed_file_id = m.indexed_file_id) AS stored
+                FROM indexed_file_manifest m WHERE m.indexed_file_id = %s
+                """,
+                (int(indexed_file_id),),
+            )
+            row = cur.fetchone()
+    except psycopg.Error:
+        logger.exception("Error reading the ingest manifest")
+        return None
+    if row and (
+        row["checksum"], row["chunker_version"], row["model"], row["filename"],
+        row["owner_tag"], int(row["chunks"]),
+    ) == (checksum, chunker_version, model, filename, owner_tag, int(row["stored"])):
+        return int(row["chunks"])
+    return None
+
+
+def record(indexed_file_id: int, checksum: str, chunker_version: str, model: str,
+           filename: str, owner_tag: str, chunks: int) -> None:
+    """Remember what the file was just ingested from."""
+    if not checksum or not _ensure_table():
+        return
+    try:
+        with _connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO indexed_file_manifest
+                  (indexed_file_id, checksum, chunker_version, model, filename, owner_tag, chunks)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (indexed_file_id) DO UPDATE SET
+                  checksum = EXCLUDED.checksum,
+                  chunker_version = EXCLUDED.chunker_version,
+                  model = EXCLUDED.model,
+                  filename = EXCLUDED.filename,
+                  owner_tag = EXCLUDED.owner_tag,
+                  chunks = EXCLUDED.chunks,
+                  ingested_at = now()
+                """,
+                (int(indexed_file_id), checksum, chunker_version, model, filename, owner_tag,
+                 int(chunks)),
+            )
+    except psycopg.Error:
+        logger.exception("Error writing the ingest manifest")
+
+
+def reset() -> None:
+    """Forget the table state (tests, a new database)."""
+    global _ready
+    with _lock:
+        _ready = None
@@ -0,0 +1,168 @@
+"""Stored answers of deterministic LLM calls (``llm_response_cache``).
+
+Re-running extraction, entities, relationships or dates on a document that
+did not change sends the engine the same prompts it already answered, and
+with temperature 0 (or a fixed seed) it answers them the same way again, at
+full inference cost. When `llm_defaults.response_cache.enabled` is set,
+`services.llm_service` looks such calls up here first.
+
+A row is keyed by a hash of everything that decides the answer: the model
+the engine actually serves, the endpoint, and the full request body (prompt
+or messages, grammar, response_format, sampling, the LoRA field,
+max_tokens). Lookups refresh `last_used_at` and count `hits`. The table is
+kept to `max_entries` rows by dropping the least recently used, a batch at a
+time. It is shared by every worker on the database, so a task re-run on
+another machine still hits.
+
+Failures here never fail inference: an unavailable table is reported once and
+every call then goes to the engine.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import psycopg
+from psycopg.types.json import Jsonb
+
+from database.connection import get_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 20000
+# Trimming scans the recency index down to `max_entries`, so it runs every
+# this many stores rather than on each one.
+_PRUNE_EVERY = 100
+
+_lock = threading.Lock()
+_ready: Optional[bool] = None
+_counters = {"hits": 0, "misses": 0, "stores": 0}
+
+
+def _connection():
+    # Its own pool: lookups sit on the inference path of every slot and must
+    # not wait behind queue operations.
+    return get_pool("llm_cache").connection()
+
+
+def cache_key(model: str, endpoint: str, request: Dict[str, Any]) -> str:
+    """`sha256:<hex>` of the canonical JSON of what decides the answer."""
+    canonical = json.dumps(
+        {"model": model, "endpoint": endpoint, "request": request},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return "sha256:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _ensure_table() -> bool:
+    """Create the table, once per process."""
+    global _ready
+    if _ready is not None:
+        return _ready
+    with _lock:
+        if _ready is not None:
+            return _ready
+        try:
+            with _connection() as conn, conn.transaction(), conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", ("llm_response_cache",))
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS llm_response_cache (
+                      key varchar(71) PRIMARY KEY,
+                      response jsonb NOT NULL,
+                      hits bigint NOT NULL DEFAULT 0,
+                      created_at timestamptz NOT NULL DEFAULT now(),
+                      last_used_at timestamptz NOT NULL DEFAULT now()
+                    )
+                    """
+                )
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS llm_response_cache_last_used_idx "
+                    "ON llm_response_cache (last_used_at)"
+                )
+            _ready = True
+        except psycopg.Error as e:
+            logger.warning("LLM response cache unavailable (%s); calling the engine", e)
+            _ready = False
+        return _ready
+
+
+def _count(name: str) -> int:
+    with _lock:
+        _counters[name] += 1
+        return _counters[name]
+
+
+def lookup(key: str) -> Optional[Dict[str, Any]]:
+    """The stored engine reply for `key`, or None on a miss."""
+    if not _ensure_table():
+        return None
+    try:
+        with _connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "UPDATE llm_response_cache SET hits = hits + 1, last_used_at = now() "
+                "WHERE key = %s RETURNING response",
+                (key,),
+            )
+            row = cur.fetchone()
+    except psycopg.Error:
+        logger.exception("Error reading the LLM response cache")
+        return None
+    _count("hits" if row else "misses")
+    return row["response"] if row else None
+
+
+def store(key: str, response: Dict[str, Any], max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+    """Remember the engine reply for `key`, trimming the table when due."""
+    if not _ensure_table():
+        return
+    stores = _count("stores")
+    try:
+        with _connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO llm_response_cache (key, response) VALUES (%s, %s) "
+                "ON CONFLICT (key) DO UPDATE SET response = EXCLUDED.response, last_used_at = now()",
+                (key, Jsonb(response)),
+            )
+            if stores % _PRUNE_EVERY == 1:
+                cur.execute(
+                    """
+                    DELETE FROM llm_response_cache WHERE key IN (
+                      SELECT key FROM llm_response_cache
+                      ORDER BY last_used_at DESC OFFSET %s LIMIT 1000
+                    )
+                    """,
+                    (max(0, int(max_entries)),),
+                )
+    except psycopg.Error:
+        logger.exception("Error writing the LLM response cache")
+
+
+def stats() -> Dict[str, Any]:
+    """This process's hit/miss/store counters, plus the table's size and the
+    hits it has served to every worker."""
+    with _lock:
+        result: Dict[str, Any] = dict(_counters)
+    if _ensure_table():
+        try:
+            with _connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    "SELECT count(*) AS entries, coalesce(sum(hits), 0) AS total_hits "
+                    "FROM llm_response_cache"
+                )
+                row = cur.fetchone()
+            result.update(entries=row["entries"], total_hits=int(row["total_hits"]))
+        except psycopg.Error:
+            logger.exception("Error reading LLM response cache stats")
+    return result
+
+
+def reset() -> None:
+    """Forget the table state and counters (tests, a new database)."""
+    global _ready
+    with _lock:
+        _ready = None
+        for name in _counters:
+            _counters[name] = 0
@@ -4,31 +4,13 @@ Separate from ``database/rag.py`` (vector search over ``memory_vectors``):
 this module reads the canonical rows (name/type/body) the vectors point to.
 """
 
-import psycopg
-from psycopg.rows import dict_row
-
-from config import (
-    POSTGRES_HOST,
-    POSTGRES_PORT,
-    POSTGRES_DB,
-    POSTGRES_USER,
-    POSTGRES_PASSWORD,
-)
+from database.connection import get_pool
 
 
 def _memory_db_connection():
-    # Same effective parameters as Execution.get_connection(), but kept local:
-    # reusing it would instantiate the Execution singleton, which opens an extra
-    # persistent connection as a side effect.
-    return psycopg.connect(
-        host=POSTGRES_HOST,
-        port=POSTGRES_PORT,
-        dbname=POSTGRES_DB,
-        user=POSTGRES_USER,
-        password=POSTGRES_PASSWORD,
-        autocommit=True,
-        row_factory=dict_row,
-    )
+    # Its own pool rather than the Execution singleton's: memory reads happen
+    # inside tool calls and must not compete with queue operations for slots.
+    return get_pool("memory").connection()
 
 
 def recent_entries(assistant_id: int, limit: int) -> list:
@@ -16,28 +16,48 @@ Each table promotes a few payload keys to real, indexed columns (FK + fast
 filtering) and also stores the full payload as JSONB, so queries return it intact.
 Vectors are L2-normalized E5 (384-dim); similarity is cosine, so the score is
 ``1 - (embedding <=> query)`` (1.0 = identical).
+
+Chunk rows get deterministic ids (`chunk_id`), so re-ingesting a source with
+`Rag.sync_source` only embeds and inserts the chunks it didn't have and deletes
+the ones that are gone; unchanged chunks keep their rows and their place in the
+HNSW index.
 """
 
 import json
 import logging
+import uuid
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import psycopg
-from psycopg.rows import dict_row
 from psycopg.types.json import Jsonb
 from pgvector.psycopg import register_vector
 
-from config import (
-    POSTGRES_HOST, POSTGRES_PORT, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD,
-    RAG_TABLE, FOLDER_TABLE, MEMORY_TABLE,
-)
+from config import RAG_TABLE, FOLDER_TABLE, MEMORY_TABLE
+from database.connection import get_pool
 
 logger = logging.getLogger(__name__)
 
 # Columns stored as integers (everything else promoted is text).
 INT_COLUMNS = {"indexed_file_id", "memory_id"}
 
+_CHUNK_NAMESPACE = uuid.UUID("7f1c2d8e-52a4-4b7e-9a43-2f0d6c1e8b59")
+
+def chunk_id(source_id: str, text: str, occurrence: int = 0) -> str:
+    """Row id of a chunk: a UUID derived from its source, its text and, for a
+    text repeated within the source, which repetition it is."""
+    return str(uuid.uuid5(_CHUNK_NAMESPACE, f"{source_id}\0{occurrence}\0{text}"))
+
+
+def chunk_ids(source_id: str, texts: List[str]) -> List[str]:
+    """`chunk_id` of each of a source's chunks, in order."""
+    seen: Dict[str, int] = {}
+    ids = []
+    for text in texts:
+        ids.append(chunk_id(source_id, text, seen.get(text, 0)))
+        seen[text] = seen.get(text, 0) + 1
+    return ids
+
 
 @dataclass
 class PointStruct:
@@ -54,6 +74,17 @@ class ScoredPoint:
     payload: Dict[str, Any]
 
 
+def _configure_vector_session(conn: psycopg.Connection) -> None:
+    """Per-connection setup of the shared `rag` pool."""
+    register_vector(conn)
+    # pgvector >= 0.8: keep recall when combining ANN search with WHERE
+    # filters (project_id / owner_tag / assistant_id). No-op on older builds.
+    try:
+        conn.execute("SET hnsw.iterative_scan = 'relaxed_order'")
+    except psycopg.Error:
+        logger.info("hnsw.iterative_scan unavailable (pgvector < 0.8); continuing")
+
+
 class Rag:
     """Thin wrapper around a single pgvector-backed table.
 
@@ -70,18 +101,9 @@ class Rag:
         self.pk_column = pk_column
         self.promoted = promoted
         self.columns = set(promoted) | {pk_column}
-        self.conn = psycopg.connect(
-            host=POSTGRES_HOST, port=POSTGRES_PORT, dbname=POSTGRES_DB,
-            user=POSTGRES_USER, password=POSTGRES_PASSWORD,
-            autocommit=True, row_factory=dict_row,
-        )
-        register_vector(self.conn)
-        # pgvector >= 0.8: keep recall when combining ANN search with WHERE
-        # filters (project_id / owner_tag / assistant_id). No-op on older builds.
-        try:
-            self.conn.execute("SET hnsw.iterative_scan = 'relaxed_order'")
-        except psycopg.Error:
-            logger.info("hnsw.iterative_scan unavailable (pgvector < 0.8); continuing")
+        # One pool for every vector table: the tables differ, the session
+        # setup doesn't.
+        self.pool = get_pool("rag", configure=_configure_vector_session)
 
     def _cast(self, column: str, raw: Any) -> Any:
         if raw is None:
@@ -113,13 +135,83 @@ class Rag:
             row.append(Jsonb(p.payload))
             rows.append(row)
         try:
-            with self.conn.cursor() as cur:
+            with self.pool.connection() as conn, conn.cursor() as cur:
                 cur.executemany(sql, rows)
             return True
         except psycopg.Error as e:
             logger.error("Error upserting into %s: %s", self.table, e)
             return False
 
+    def payloads_by_column(self, column: str, value: Any) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Primary key -> payload of every row where ``column`` matches ``value``,
+        without their vectors; None if the table can't be read."""
+        if column not in self.columns:
+            logger.warning("payloads_by_column: %s has no column %s", self.table, column)
+            return None
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    f'SELECT "{self.pk_column}" AS pk, payload FROM "{self.table}" WHERE "{column}" = %s',
+                    (self._cast(column, value),),
+                )
+                return {str(r["pk"]): r["payload"] or {} for r in cur.fetchall()}
+        except psycopg.Error as e:
+            logger.error("Error reading %s by %s: %s", self.table, column, e)
+            return None
+
+    def update_payloads(self, points: List[PointStruct]) -> bool:
+        """Rewrite the payload (and promoted columns) of existing rows, leaving
+        their vectors alone."""
+        if not points:
+            return True
+        extra = [c for c in self.promoted if c != self.pk_column]
+        sets = ", ".join([f'"{c}" = %s' for c in extra] + ["payload = %s"])
+        sql = f'UPDATE "{self.table}" SET {sets} WHERE "{self.pk_column}" = %s'
+        rows = [
+            [self._cast(c, p.payload.get(self.promoted[c])) for c in extra]
+            + [Jsonb(p.payload), self._pk_value(p)]
+            for p in points
+        ]
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                cur.executemany(sql, rows)
+            return True
+        except psycopg.Error as e:
+            logger.error("Error updating payloads in %s: %s", self.table, e)
+            return False
+
+    def sync_source(self, column: str, value: Any, points: List[PointStruct],
+                    embed: Callable[[List[str]], Any]) -> Optional[Dict[str, int]]:
+        """Make the rows where ``column`` matches ``value`` exactly ``points``.
+
+        ``points`` carry their `chunk_id` and payload but no vector yet. Rows
+        already stored under one of those ids are kept (their payload, position
+        included, is rewritten without re-embedding if it changed), the
+        texts of the others go through ``embed`` and are inserted, and rows
+        with any other id are deleted. If the current rows can't be read,
+        every row is replaced as before. Returns how many rows were kept,
+        added and removed, or None if any of the writes failed.
+        """
+        existing = self.payloads_by_column(column, value)
+        if existing is None:
+            if not self.delete_by_column(column, value):
+                return None
+            existing = {}
+        wanted = {str(p.id) for p in points}
+        fresh = [p for p in points if str(p.id) not in existing]
+        changed = [p for p in points if str(p.id) in existing and existing[str(p.id)] != p.payload]
+        stored = True
+        if fresh:
+            for point, vector in zip(fresh, embed([p.payload["text"] for p in fresh])):
+                point.vector = vector.tolist() if hasattr(vector, "tolist") else list(vector)
+            stored = self.upsert_points(fresh)
+        stored = self.update_payloads(changed) and stored
+        vanished = [pk for pk in existing if pk not in wanted]
+        stored = self.delete_points(vanished) and stored
+        if not stored:
+            return None
+        return {"kept": len(points) - len(fresh), "added": len(fresh), "removed": len(vanished)}
+
     def query_points(self, query_vector: List[float], limit: int = 3, with_payload: bool = True,
                      project_id: Optional[str] = None, assistant_id: Optional[str] = None,
                      owner_tag: Optional[str] = None,
@@ -141,7 +233,7 @@ class Rag:
             f'ORDER BY embedding <=> %(qv)s LIMIT %(limit)s'
         )
         try:
-            with self.conn.cursor() as cur:
+            with self.pool.connection() as conn, conn.cursor() as cur:
                 cur.execute(sql, params)
                 return [ScoredPoint(score=float(r["score"]), payload=r["payload"] or {})
                         for r in cur.fetchall()]
@@ -156,7 +248,7 @@ class Rag:
             logger.warning("delete_by_column: %s has no column %s", self.table, column)
             return False
         try:
-            with self.conn.cursor() as cur:
+            with self.pool.connection() as conn, conn.cursor() as cur:
                 cur.execute(f'DELETE FROM "{self.table}" WHERE "{column}" = %s',
                             (self._cast(column, value),))
             return True
@@ -170,7 +262,7 @@ class Rag:
             return True
         try:
             cast_ids = [self._cast(self.pk_column, i) for i in ids]
-            with self.conn.cursor() as cur:
+            with self.pool.connection() as conn, conn.cursor() as cur:
                 cur.execute(f'DELETE FROM "{self.table}" WHERE "{self.pk_column}" = ANY(%s)',
                             (cast_ids,))
             return True
@@ -181,7 +273,7 @@ class Rag:
     def recreate_collection(self) -> bool:
         """Empty the table (used by reset/admin paths)."""
         try:
-            with self.conn.cursor() as cur:
+            with self.pool.connection() as conn, conn.cursor() as cur:
                 cur.execute(f'TRUNCATE TABLE "{self.table}"')
             return True
         except psycopg.Error as e:
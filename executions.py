@@ -1,11 +1,12 @@
 import logging
-import time
+import multiprocessing
 import signal
 import sys
 from database.execution import get_execution_database
-from utils.process_execution import process_execution
+from lib.llm.config import get_worker_config
 from utils.device import log_hardware_summary, HAS_CUDA, CPU_COUNT, RAM_GB, GPU_NAME, VRAM_GB
-from worker.capabilities import detect_worker_capabilities
+from worker.capabilities import detect_worker_capabilities, get_supported_task_types
+from worker.pool import ExecutionPool
 from worker.identity import (
     WORKER_ID,
     WORKER_NAME,
@@ -20,7 +21,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-POLL_INTERVAL_MS = 1000  # milliseconds
+# Workers are woken by NOTIFY when something is queued (see
+# `Execution.wait_for_queued`); this poll is only the safety net for wakeups
+# that never arrive (an enqueue path that doesn't notify, the background
+# window opening, a dropped listener connection).
+POLL_INTERVAL_S = float(get_worker_config().get("poll_interval", 5))
 
 
 def main():
@@ -43,9 +48,15 @@ def main():
     # Start heartbeat thread
     start_heartbeat_thread()
 
-    # Graceful shutdown
+    pool = ExecutionPool()
+    logger.info("Execution slots: %s", pool.limits)
+
+    # Graceful shutdown: stop claiming and let the executions already running
+    # finish. The heartbeat keeps going until they have, so the backend doesn't
+    # take their rows for a dead worker's; only then is the worker deregistered.
     def shutdown(sig, frame):
         logger.info("Worker %s shutting down...", WORKER_NAME)
+        pool.shutdown()
         deregister_worker()
         sys.exit(0)
 
@@ -53,17 +64,33 @@ def main():
     signal.signal(signal.SIGINT, shutdown)
 
     db = get_execution_database()
-    logger.info("Execution worker started. Polling queued executions...")
+    logger.info("Execution worker started. Waiting for queued executions...")
 
     while True:
-        execution = db.claim_pending_execution(WORKER_ID, capabilities)
-        if execution:
-            process_execution(execution)
+        pool.slot_freed.clear()
+        supported = get_supported_task_types(capabilities)
+        # Fill every free slot before waiting: claims are one execution each,
+        # restricted to the task types that still have room.
+        while True:
+            claimable = pool.claimable_task_types(supported)
+            if not claimable:
+                break
+            execution = db.claim_pending_execution(WORKER_ID, capabilities, task_types=claimable)
+            if not execution:
+                break
+            pool.submit(execution)
 
-        time.sleep(POLL_INTERVAL_MS / 1000.0)
+        db.wait_for_queued(
+            POLL_INTERVAL_S,
+            pool.claimable_task_types(supported),
+            wake=pool.slot_freed,
+        )
 
 
 if __name__ == "__main__":
+    # CPU slots run in spawned processes; a frozen (PyInstaller) build has to
+    # recognise those children before doing anything else.
+    multiprocessing.freeze_support()
     if "--setup" in sys.argv:
         # Pre-download all ML models without starting the worker
         from setup_models import setup
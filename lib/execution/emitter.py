@@ -42,6 +42,22 @@ _FORBIDDEN_KEYS = {
     "thoughts",
 }
 _MAX_ARTIFACT_BYTES = 1024 * 1024
+# Optional inference metrics beyond the four every operation reports: where a
+# call's time went inside the engine, and the engine's load when it finished
+# (`services.llama_server.engine_stats`). Non-negative integers, like the rest.
+_ENGINE_METRICS = (
+    "promptEvalMs",
+    "generationMs",
+    "promptTokensPerSecond",
+    "generatedTokensPerSecond",
+    "engineSlotsBusy",
+    "engineSlotsTotal",
+    "engineRequestsProcessing",
+    "engineRequestsDeferred",
+    "engineKvCacheUsagePercent",
+    "enginePromptTokensPerSecond",
+    "engineGeneratedTokensPerSecond",
+)
 CONTRACT_SET_HASH = "sha256:5de857c99bfac5a0c77100e4f3f4abf0b729392269062eef789d8e6463185240"
 
 
@@ -728,6 +744,14 @@ class ExecutionEmitter:
         for key, value in (metrics or {}).items():
             if key in normalized_metrics and (value == "unknown" or isinstance(value, int)):
                 normalized_metrics[key] = value
+            elif key in _ENGINE_METRICS and isinstance(value, int) and value >= 0:
+                normalized_metrics[key] = value
+        prompt_ms = normalized_metrics.get("promptEvalMs")
+        generation_ms = normalized_metrics.get("generationMs")
+        if isinstance(prompt_ms, int) and isinstance(generation_ms, int):
+            # Whatever the engine didn't spend evaluating or generating: waiting
+            # for a free slot, plus the round trip.
+            normalized_metrics["queueMs"] = max(0, measured - prompt_ms - generation_ms)
         payload: Dict[str, Any] = {
             "operationKind": handle.kind,
             "status": status,
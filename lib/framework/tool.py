@@ -49,10 +49,18 @@ class Tool:
 
     A leaf capability: it runs an executor and returns a result dict. It carries
     no visibility flags — each agent declares which tools it can use.
+
+    `read_only` marks a tool that only reads and has no side effects, so the
+    agent loop may start it while the model is still streaming the rest of its
+    reply, before the round's budget and repeat guards have ruled on it.
+    `timeout_s` is how long the loop then waits for that result before it
+    answers the call with an error instead.
     """
     schema: Dict[str, Any]
     execute: ExecuteFn
     summarize: Optional[SummarizeFn] = None
+    read_only: bool = False
+    timeout_s: float = 30.0
 
     @property
     def name(self) -> str:
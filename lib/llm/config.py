@@ -13,6 +13,7 @@ import logging
 import os
 import shutil
 import sys
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +66,12 @@ _config = None
 _tasks = None
 _inference_defaults = None
 
+# Parsed JSON of the files that are re-checked on every read (per-task
+# overrides, deployments), keyed by path: {path: (signature, value)}. See
+# `_read_watched_json`.
+_watched = {}
+_watched_lock = threading.Lock()
+
 # Used when the model filename matches no family pattern. Conservative, low-variance
 # sampling so an unrecognised model still gets sane values instead of llama.cpp's
 # generic defaults (which are tuned for none of our models in particular).
@@ -108,6 +115,41 @@ def _load_json(path: str) -> dict:
         return json.load(f)
 
 
+def _file_signature(path: str):
+    """What changes when a file is rewritten: mtime, size and inode (an atomic
+    replace keeps the mtime granularity from hiding a same-second rewrite).
+    None when the file doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _read_watched_json(path: str, parse=None):
+    """`path` parsed as JSON (then through `parse`), re-read only when the file changed.
+
+    For the files that must be picked up without a restart but sit on every
+    inference path: a `stat` per call instead of an open, read and parse.
+    Returns None for a missing file; raises like `json.load` for a malformed
+    one (not cached, so a fixed file is picked up on the next call). The value
+    is shared between callers: read it, don't mutate it.
+    """
+    signature = _file_signature(path)
+    cached = _watched.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    value = None
+    if signature is not None:
+        with open(path, 'r', encoding='utf-8') as f:
+            value = json.load(f)
+        if parse is not None:
+            value = parse(value)
+    with _watched_lock:
+        _watched[path] = (signature, value)
+    return value
+
+
 def _load_config() -> dict:
     global _config
     if _config is not None:
@@ -143,6 +185,25 @@ def get_llm_defaults() -> dict:
     return _load_config().get('llm_defaults', {})
 
 
+def get_llm_servers() -> list:
+    """Additional llama-server endpoints to spread LLM requests over, next to
+    the shared engine at `server_url` (`llm_defaults.servers`, or a
+    comma-separated `LLAMA_SERVER_URLS`). Empty when there is only the one."""
+    raw = os.environ.get('LLAMA_SERVER_URLS', '').strip()
+    servers = raw.split(',') if raw else get_llm_defaults().get('servers') or []
+    urls = []
+    for url in servers:
+        url = str(url).strip().rstrip('/')
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+
+def get_embedding_defaults() -> dict:
+    """Get how the embedding model is run (`embedding_defaults`)."""
+    return _load_config().get('embedding_defaults', {})
+
+
 def get_rag_config() -> dict:
     """Get RAG configuration."""
     return _load_config().get('rag', {})
@@ -156,17 +217,19 @@ def get_worker_config() -> dict:
 def active_deployments() -> dict:
     """Deployed adapters, as `{task_name: {"path": str, "scale": float}}`.
 
-    Read on every call rather than cached: deploying an adapter is an
-    interactive action, and a long-lived worker has to pick it up on the next
-    execution instead of on the next restart. A missing or malformed file simply means
-    no deployments — never an error, because inference must keep working.
+    Checked on every call rather than cached until restart: deploying an
+    adapter is an interactive action, and a long-lived worker has to pick it up
+    on the next execution. The file is only re-read when its mtime changes. A
+    missing or malformed file simply means no deployments — never an error,
+    because inference must keep working.
     """
     try:
-        with open(_deployments_file(), 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        return _read_watched_json(_deployments_file(), _parse_deployments) or {}
     except (OSError, ValueError):
         return {}
 
+
+def _parse_deployments(data) -> dict:
     tasks = data.get('tasks') if isinstance(data, dict) else None
     if not isinstance(tasks, dict):
         return {}
@@ -197,11 +260,11 @@ def get_task_config(task_name: str) -> dict:
     tasks = _load_tasks()
     base = dict(tasks.get(task_name, {}))
 
-    override_path = os.path.join(
-        _CONFIG_DIR, 'tasks', task_name, 'config.json')
-    if os.path.isfile(override_path):
-        with open(override_path, 'r', encoding='utf-8') as f:
-            overrides = json.load(f)
+    # Watched, not cached until restart: edits to an override apply to the
+    # next execution, and an unchanged file costs a stat.
+    overrides = _read_watched_json(os.path.join(
+        _CONFIG_DIR, 'tasks', task_name, 'config.json'))
+    if overrides:
         base.update(overrides)
 
     deployment = active_deployments().get(task_name)
@@ -314,5 +377,7 @@ def reload_config():
     _config = None
     _tasks = None
     _inference_defaults = None
+    with _watched_lock:
+        _watched.clear()
     _load_config()
     _load_tasks()
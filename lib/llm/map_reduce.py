@@ -24,14 +24,30 @@ Dispatcher contract (shared with documents-dev via `execution_mock`/`process_exe
 the fan-out returns
 `{"_sub_agent_pending_many": True, "_state": {...}, "pending_children": {...}}`
 and the `_state` keeps the shape `resume_parent_with_child` knows how to
-reconstruct (`phase`, `chunks`, `results`, `retries`, `chunk_field`,
-`chunk_payload_template`, plus the `carry_fields`). Do not change that shape
-without also touching the dispatcher.
+reconstruct (`phase`, `chunk_refs` or `chunks`, `results`, `retries`,
+`chunk_field`, `chunk_payload_template`, plus the `carry_fields`). Do not
+change that shape without also touching the dispatcher.
+
+Chunk texts live out of row when the queue offers a chunk store
+(`Execution.store_chunks`). The state then keeps `chunk_refs`, and each child
+payload carries `_chunk_ref` instead of the text. `run_map_reduce` resolves a
+child's reference back into `chunk_field` before anything else, so leaves,
+`chunks_fn` and the tasks never see references. Without a store (an
+`execution_mock` without `store_chunks`), the texts stay inline under
+`chunks` and `chunk_field` as before. In the same way, children are queued
+with one bulk `enqueue_child_executions` when the queue has it, and one
+`enqueue_child_execution` at a time otherwise (`enqueue_children`).
+
+Without a queue (`ctx` has no `db`/`execution_id`), the chunks are processed
+in-process instead. Their leaf calls then run concurrently, up to
+`leaf_concurrency` at a time. By default that is as many as the server has
+slots, so one document can use them all.
 """
 
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
+from lib.llm.parallel import llm_concurrency, map_concurrently
 from lib.llm.text import build_chunks, word_count
 from lib.llm.unit_filters import build_units_filter
 
@@ -129,9 +145,60 @@ def run_map_reduce(
     """
     if state and state.get("phase") == "merging":
         return _merge(state, ctx, spec=spec, cfg=cfg)
+    if "_chunk_ref" in payload:
+        payload = dict(payload)
+        [payload[spec.chunk_field]] = ctx.db.load_chunks([payload.pop("_chunk_ref")])
     return _plan_or_leaf(payload, ctx, spec=spec, cfg=cfg)
 
 
+def _state_chunks(state: Dict[str, Any], ctx) -> List[str]:
+    refs = state.get("chunk_refs")
+    if refs is not None:
+        return ctx.db.load_chunks(refs)
+    return state.get("chunks") or []
+
+
+def leaf_concurrency(cfg: Dict[str, Any]) -> int:
+    """How many leaves of one in-process map-reduce run at once
+    (`cfg["leaf_concurrency"]`, else the server's slots)."""
+    return llm_concurrency(cfg, "leaf_concurrency")
+
+
+def _map_leaves(
+    spec: MapReduceSpec, chunks: List[str], payloads: List[Dict[str, Any]], cfg: Dict[str, Any]
+) -> List[Any]:
+    """`leaf_fn` over every chunk, results in chunk order."""
+    workers = leaf_concurrency(cfg) if len(chunks) > 1 else 1
+    return map_concurrently(
+        lambda pair: spec.leaf_fn(pair[0], pair[1], cfg),
+        list(zip(chunks, payloads)), workers, name="leaf",
+    )
+
+
+def enqueue_children(
+    db, parent_id: str, task_type: str, payloads: List[Dict[str, Any]], agent_max_steps: int = 1,
+) -> Optional[List[str]]:
+    """Queue one child per payload; their ids in payload order, or None.
+
+    All in one transaction when `db` has `enqueue_child_executions`, so
+    leaves can start as soon as it commits and a failure leaves no orphaned
+    half of the fan-out behind. Otherwise (an `execution_mock` with only the
+    single-child call) one at a time, stopping at the first failure.
+    """
+    enqueue_many = getattr(db, "enqueue_child_executions", None)
+    if enqueue_many is not None:
+        return enqueue_many(parent_id, task_type, payloads, agent_max_steps=agent_max_steps)
+    child_ids: List[str] = []
+    for payload in payloads:
+        child_id = db.enqueue_child_execution(
+            parent_id, task_type, payload=payload, agent_max_steps=agent_max_steps,
+        )
+        if child_id is None:
+            return None
+        child_ids.append(child_id)
+    return child_ids
+
+
 def _carry(source: Dict[str, Any], spec: MapReduceSpec) -> Dict[str, Any]:
     return {k: source[k] for k in spec.carry_fields if source.get(k) is not None}
 
@@ -149,7 +216,8 @@ def _plan_or_leaf(
         if not is_child:
             units_filter = build_units_filter(spec.units_filters, payload, cfg)
         chunks = build_chunks(
-            payload.get(spec.chunk_field, ""), chunk_word_budget, units_filter=units_filter
+            payload.get(spec.chunk_field, ""), chunk_word_budget, units_filter=units_filter,
+            chunk_token_budget=cfg.get("chunk_token_budget"),
         )
     if not chunks:
         return {spec.result_key: spec.empty_value}
@@ -159,8 +227,8 @@ def _plan_or_leaf(
         # chunk further (rare), process every piece against the payload the
         # child got and concatenate the per-piece lists.
         collected: List[Any] = []
-        for chunk in chunks:
-            collected.extend(spec.leaf_fn(chunk, payload, cfg))
+        for partial in _map_leaves(spec, chunks, [payload] * len(chunks), cfg):
+            collected.extend(partial)
         return {spec.result_key: collected}
 
     if len(chunks) == 1:
@@ -183,39 +251,42 @@ def _plan_or_leaf(
 
     if ctx is None or getattr(ctx, "db", None) is None or getattr(ctx, "execution_id", None) is None:
         # No execution queue (e.g. unit tests): process the chunks in-process and
-        # merge, without fan-out.
+        # merge, without fan-out. The leaves share the server's slots.
         if spec.list_results:
-            partials: List[Any] = []
-            for i, chunk in enumerate(chunks):
-                leaf_payload = {**payload, **chunk_extras[i]} if chunk_extras else payload
-                partials.append(spec.leaf_fn(chunk, leaf_payload, cfg))
+            leaf_payloads = [
+                {**payload, **chunk_extras[i]} if chunk_extras else payload
+                for i in range(len(chunks))
+            ]
+            partials = _map_leaves(spec, chunks, leaf_payloads, cfg)
             merged = spec.reduce_fn(partials, {**payload, "_chunks": chunks}, cfg)
             return {spec.result_key: merged}
-        partials = [spec.leaf_fn(c, payload, cfg) for c in chunks]
+        partials = _map_leaves(spec, chunks, [payload] * len(chunks), cfg)
         return {spec.result_key: spec.reduce_fn(partials, payload, cfg)}
 
     carry = _carry(payload, spec)
     static = spec.child_static_fn(payload, cfg) if spec.child_static_fn is not None else None
 
-    pending: Dict[str, int] = {}
-    results: Dict[str, Optional[Any]] = {}
-    retries: Dict[str, int] = {}
+    store_chunks = getattr(ctx.db, "store_chunks", None)
+    chunk_refs = store_chunks(chunks) if store_chunks is not None else None
+    child_payloads: List[Dict[str, Any]] = []
     for i, chunk in enumerate(chunks):
+        chunk_entry = {"_chunk_ref": chunk_refs[i]} if chunk_refs else {spec.chunk_field: chunk}
         if static is not None:
-            child_payload = {spec.chunk_field: chunk, **static, "_chunk_idx": i}
+            child_payload = {**chunk_entry, **static, "_chunk_idx": i}
         else:
-            child_payload = {spec.chunk_field: chunk, "_chunk_idx": i, **carry}
+            child_payload = {**chunk_entry, "_chunk_idx": i, **carry}
         if chunk_extras is not None:
             child_payload.update(chunk_extras[i])
-        child_id = ctx.db.enqueue_child_execution(
-            ctx.execution_id, spec.task_name,
-            payload=child_payload, agent_max_steps=spec.child_max_steps,
-        )
-        if child_id is None:
-            return {"error": f"failed to enqueue child for chunk {i}"}
-        pending[str(child_id)] = i
-        results[str(i)] = None
-        retries[str(i)] = 0
+        child_payloads.append(child_payload)
+    child_ids = enqueue_children(
+        ctx.db, ctx.execution_id, spec.task_name, child_payloads,
+        agent_max_steps=spec.child_max_steps,
+    )
+    if child_ids is None:
+        return {"error": f"failed to enqueue {len(chunks)} children"}
+    pending: Dict[str, int] = {str(child_id): i for i, child_id in enumerate(child_ids)}
+    results: Dict[str, Optional[Any]] = {str(i): None for i in range(len(chunks))}
+    retries: Dict[str, int] = {str(i): 0 for i in range(len(chunks))}
 
     state = {
         "phase": "merging",
@@ -223,7 +294,7 @@ def _plan_or_leaf(
         "queued": pending,
         "results": results,
         "retries": retries,
-        "chunks": chunks,
+        **({"chunk_refs": chunk_refs} if chunk_refs else {"chunks": chunks}),
         **state_extras,
         "chunk_field": spec.chunk_field,
         "chunk_payload_template": dict(static) if static is not None else dict(carry),
@@ -260,7 +331,7 @@ def _merge(
             base = spec.merge_payload_fn(state)
         else:
             base = _carry(state, spec)
-        ctx_payload = {**base, "_chunks": state.get("chunks") or []}
+        ctx_payload = {**base, "_chunks": _state_chunks(state, ctx)}
         return {spec.result_key: spec.reduce_fn(partials, ctx_payload, cfg)}
 
     partials = []
@@ -0,0 +1,51 @@
+"""Run independent LLM calls of one execution side by side.
+
+The engine has several `--parallel` slots, and calls that don't depend on each
+other (the leaves of an in-process map-reduce, the batches of the relevance
+filter) finish sooner spread over them than queued one after another in this
+thread. `map_concurrently` runs them on a short-lived thread pool sized by
+`llm_concurrency`, and gives the results back in input order.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def llm_concurrency(cfg: Dict[str, Any], key: str) -> int:
+    """How many calls to run at once: `cfg[key]` when set; otherwise the
+    `total_slots` the servers report in `/props`, summed over every engine
+    requests are balanced across, falling back to the slot count the shared
+    one is started with for a server that can't be asked."""
+    configured = cfg.get(key)
+    if configured is not None:
+        try:
+            return max(1, int(configured))
+        except (TypeError, ValueError):
+            pass
+    from services.llama_server import server_slots, server_urls, total_slots
+
+    return sum(total_slots(url) or server_slots() for url in server_urls())
+
+
+def map_concurrently(
+    fn: Callable[[T], R], items: Sequence[T], max_workers: int, *, name: str = "llm",
+) -> List[R]:
+    """`[fn(item) for item in items]` with up to `max_workers` calls in flight.
+
+    Each call runs in a copy of the caller's context, so what it reads from
+    context variables is what the caller would have seen. Runs serially while
+    an execution emitter is active: its producer sequence and pending batch
+    assume one caller at a time. The first exception raised is re-raised.
+    """
+    from lib.execution import get_active_emitter
+
+    workers = min(len(items), max_workers)
+    if workers <= 1 or get_active_emitter() is not None:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [f.result() for f in futures]
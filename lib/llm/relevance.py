@@ -14,9 +14,10 @@ Two independent filters, each registered as its own unit-filter entity (see
 
 2. `llm_relevance` (name `relevance_llm`): one call per `relevance_batch_size`
    units receives a compact `[idx] heading | preview` listing and returns
-   `{"keep": [idx, ...]}`. The model only chooses what to discard; it can't add
-   or paraphrase. Compose it after `relevance` (`["relevance", "relevance_llm"]`)
-   to run the free regex first and the LLM only on survivors.
+   `{"keep":[idx,...]}`, constrained by `RELEVANCE_KEEP_GBNF`. The model only
+   chooses what to discard; it can't add or paraphrase. The batches go to the
+   engine concurrently, up to its slot count. Units whose heading the regex
+   already marks as auxiliary are dropped without being shown to the model.
 
 Fail-open throughout: any parse error, empty result, or LLM unavailability keeps
 the input. Neither filter ever returns an empty list for a non-empty input.
@@ -29,6 +30,8 @@ import re
 from typing import Any, Dict, List, Optional
 
 from lib.llm.config import llm_params_for
+from lib.llm.grammars import RELEVANCE_KEEP_GBNF
+from lib.llm.parallel import llm_concurrency, map_concurrently
 from lib.llm.prompts import load_prompt
 from services.llm_service import get_llm_service
 
@@ -142,6 +145,57 @@ def _parse_keep_indices(raw: str, allowed: List[int]) -> Optional[List[int]]:
     return None
 
 
+def _llm_keep_indices(
+    llm, units: List[str], candidates: List[int], cfg: Dict[str, Any], task_label: str,
+) -> List[int]:
+    """The indices among `candidates` that the model keeps, in order.
+
+    One grammar-constrained call per `relevance_batch_size` candidates, up to
+    `relevance_concurrency` of them in flight (default: the server's slots).
+    A batch whose call fails or whose reply can't be parsed is kept whole.
+    Empty when the model rejected every candidate; callers fail open.
+    """
+    batch_size = max(1, int(cfg.get("relevance_batch_size", 30)))
+    max_tokens = int(cfg.get("relevance_max_tokens", 300))
+
+    def judge(batch: List[int]) -> List[int]:
+        listing = "\n".join(
+            f"[{i}] {_preview_for_judgement(units[i])}" for i in batch
+        )
+        instruction = _RELEVANCE_FILTER_PROMPT.format(task_label=task_label, listing=listing)
+        try:
+            raw = llm.chat(
+                [
+                    {"role": "system", "content": _RELEVANCE_SYSTEM_PROMPT},
+                    {"role": "user", "content": instruction},
+                ],
+                max_tokens=max_tokens,
+                grammar=RELEVANCE_KEEP_GBNF,
+                temperature=0.0,
+            )
+        except Exception as e:
+            logger.warning("Relevance filter: LLM batch failed, keeping batch (%s)", e)
+            return batch
+        parsed = _parse_keep_indices(raw, batch)
+        if parsed is None:
+            logger.warning("Relevance filter: unparseable LLM reply, keeping batch")
+            return batch
+        return parsed
+
+    batches = [
+        candidates[start:start + batch_size]
+        for start in range(0, len(candidates), batch_size)
+    ]
+    verdicts = map_concurrently(
+        judge, batches, llm_concurrency(cfg, "relevance_concurrency"), name="relevance",
+    )
+    accepted = sorted({i for kept in verdicts for i in kept})
+    if not accepted:
+        # Model explicitly rejected every unit — almost certainly wrong.
+        logger.warning("Relevance filter: LLM rejected all units; keeping them")
+    return accepted
+
+
 def heuristic_relevance(units: List[str], cfg: Dict[str, Any]) -> List[str]:
     """Drop units whose heading looks auxiliary (References, Appendix, …). Free
     and deterministic.
@@ -167,11 +221,13 @@ def heuristic_relevance(units: List[str], cfg: Dict[str, Any]) -> List[str]:
 def llm_relevance(units: List[str], cfg: Dict[str, Any]) -> List[str]:
     """Ask the LLM which units carry the substantive content and keep those.
 
-    Operates on whatever `units` it receives (compose it after `relevance` to run
-    the free regex first). `cfg` resolves the LLM (`llm_params_for`) and tunes it:
-    `relevance_filter_enabled` (default True), `relevance_batch_size` (default
-    30), `relevance_max_tokens` (default 300), `relevance_task_label` (label shown
-    to the model, default `content extraction`). Fail-open on every error path.
+    Units with an auxiliary heading (what `heuristic_relevance` drops) are
+    dropped up front; the rest are listed to the model in batches. `cfg`
+    resolves the LLM (`llm_params_for`) and tunes it: `relevance_filter_enabled`
+    (default True), `relevance_batch_size` (default 30), `relevance_max_tokens`
+    (default 300), `relevance_concurrency` (batches in flight, default the
+    server's slots), `relevance_task_label` (label shown to the model, default
+    `content extraction`). Fail-open on every error path.
     """
     if not units:
         return units
@@ -182,50 +238,21 @@ def llm_relevance(units: List[str], cfg: Dict[str, Any]) -> List[str]:
     if not cfg.get("model"):
         return units
 
+    # The regex is decisive for these; no need to spend a batch slot on them.
+    candidates = _heuristic_keep_indices(units)
+    if not candidates:
+        return units
+    if len(candidates) < 2:
+        return [units[i] for i in candidates]
+
     try:
         llm = get_llm_service(**llm_params_for(cfg))
     except Exception as e:
         logger.warning("Relevance filter: LLM unavailable, keeping units (%s)", e)
         return units
 
-    batch_size = int(cfg.get("relevance_batch_size", 30))
-    max_tokens = int(cfg.get("relevance_max_tokens", 300))
     task_label = cfg.get("relevance_task_label", _DEFAULT_TASK_LABEL)
-
-    accepted: List[int] = []
-    any_batch_succeeded = False
-    for start in range(0, len(units), batch_size):
-        batch = list(range(start, min(start + batch_size, len(units))))
-        listing = "\n".join(
-            f"[{i}] {_preview_for_judgement(units[i])}" for i in batch
-        )
-        instruction = _RELEVANCE_FILTER_PROMPT.format(task_label=task_label, listing=listing)
-        try:
-            raw = llm.chat(
-                [
-                    {"role": "system", "content": _RELEVANCE_SYSTEM_PROMPT},
-                    {"role": "user", "content": instruction},
-                ],
-                max_tokens=max_tokens,
-            )
-        except Exception as e:
-            logger.warning("Relevance filter: LLM batch failed, keeping batch (%s)", e)
-            accepted.extend(batch)
-            continue
-
-        parsed = _parse_keep_indices(raw, batch)
-        if parsed is None:
-            # Could not parse; keep the batch (fail-open per batch).
-            logger.warning("Relevance filter: unparseable LLM reply, keeping batch")
-            accepted.extend(batch)
-            continue
-        any_batch_succeeded = True
-        accepted.extend(parsed)
-
+    accepted = _llm_keep_indices(llm, units, candidates, cfg, task_label)
     if not accepted:
-        if any_batch_succeeded:
-            # Model explicitly rejected every unit — almost certainly wrong.
-            logger.warning("Relevance filter: LLM rejected all units; keeping them")
-        return units
-
-    return [units[i] for i in sorted(set(accepted))]
+        return [units[i] for i in candidates]
+    return [units[i] for i in accepted]
@@ -7,13 +7,19 @@ Two groups:
   keywords, key-point, date-extraction). They clean a document
   (HTML → markdown, drop dense blobs), split it into semantic units and pack
   those units into chunks that fit the LLM context.
+- Token counting (`count_tokens`, `token_budget`): sizes against the served
+  model's own tokenizer, which is what the context window is measured in.
 
 Mirrors `documents-dev/models/services/text.py`, minus the RAG-only chunkers
 (`chunk_text`, `semantic_chunk_text`) which no task ported here needs.
 """
 
+import hashlib
 import html
 import re
+import threading
+import time
+from collections import OrderedDict
 
 from bs4 import BeautifulSoup
 
@@ -307,37 +313,129 @@ def chunk_units(units, max_size, size_fn=None, max_words_fallback=None, joiner="
     return chunks
 
 
+# ~4 chars/token: the English heuristic, used while the engine can't be asked.
+_CHARS_PER_TOKEN = 4
+# More than any tokenizer packs into a token of real text: whatever lies beyond
+# this many chars per token of budget can't fit, so it is never sent to be
+# counted.
+_MAX_CHARS_PER_TOKEN = 8
+# Recent counts, keyed by the digest of the text: planning measures the same
+# units again when a task re-chunks, and leaves re-measure their chunk.
+_TOKEN_COUNT_CACHE_SIZE = 4096
+# After a failed /tokenize, use the heuristic for this long before asking
+# again, so a down engine doesn't cost a connect attempt per unit.
+_TOKENIZE_RETRY_S = 30.0
+
+_token_counts: "OrderedDict[bytes, int]" = OrderedDict()
+_token_lock = threading.Lock()
+_tokenize_down_until = 0.0
+
+
+def _approx_tokens(text):
+    return -(-len(text) // _CHARS_PER_TOKEN)
+
+
+def count_tokens(text):
+    """Tokens `text` takes in the served model.
+
+    Asks the engine's `/tokenize`, so non-English and code-heavy text are
+    measured as the model sees them rather than at ~4 chars/token. Recent
+    counts are remembered. Falls back to the heuristic when the engine can't
+    be asked.
+    """
+    global _tokenize_down_until
+    if not text:
+        return 0
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with _token_lock:
+        cached = _token_counts.get(key)
+        if cached is not None:
+            _token_counts.move_to_end(key)
+            return cached
+        if time.monotonic() < _tokenize_down_until:
+            return _approx_tokens(text)
+    from services.llama_server import server_url, tokenize_count
+
+    count = tokenize_count(server_url(), text)
+    with _token_lock:
+        if count is None:
+            _tokenize_down_until = time.monotonic() + _TOKENIZE_RETRY_S
+            return _approx_tokens(text)
+        _token_counts[key] = count
+        if len(_token_counts) > _TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def token_budget(cfg, *, tokens_key="chunk_max_tokens", default_tokens=400):
+    """Max input tokens that fit alongside the prompt in the LLM context.
+
+    Reserves room for the output (`cfg[tokens_key]`) and 512 tokens of prompt
+    boilerplate.
+    """
+    from lib.llm.config import get_llm_defaults
+
+    n_ctx = int(get_llm_defaults().get("n_ctx", 32768))
+    out_tokens = int(cfg.get(tokens_key, default_tokens))
+    return max(512, n_ctx - out_tokens - 512)
+
+
 def char_budget(cfg, *, tokens_key="chunk_max_tokens", default_tokens=400):
     """Approximate max chars that fit alongside the prompt in the LLM context.
 
-    Uses ~4 chars/token (English heuristic) and reserves room for the system
-    prompt and output. Honours overrides via `<task>.input_char_budget`.
-    Tasks that size their output with `max_tokens` pass `tokens_key`.
+    `token_budget` at ~4 chars/token, or `<task>.input_char_budget` when set.
+    Kept for callers that only need a rough bound; `truncate_for_llm`
+    measures tokens.
     """
     override = cfg.get("input_char_budget")
     if override is not None:
         return int(override)
-    from lib.llm.config import get_llm_defaults
-
-    n_ctx = int(get_llm_defaults().get("n_ctx", 32768))
-    out_tokens = int(cfg.get(tokens_key, default_tokens))
-    # Leave 512 tokens of headroom for the prompt boilerplate.
-    available_tokens = max(512, n_ctx - out_tokens - 512)
-    return available_tokens * 4
+    return token_budget(cfg, tokens_key=tokens_key, default_tokens=default_tokens) * _CHARS_PER_TOKEN
 
 
 def truncate_for_llm(text, cfg, *, tokens_key="chunk_max_tokens", default_tokens=400):
-    """Truncate `text` to the character budget from `char_budget`."""
-    cap = char_budget(cfg, tokens_key=tokens_key, default_tokens=default_tokens)
-    if len(text) <= cap:
-        return text
-    return text[:cap]
+    """Truncate `text` to the `token_budget`, measured with `count_tokens`.
+
+    An `input_char_budget` override still cuts by characters.
+    """
+    if cfg.get("input_char_budget") is not None:
+        cap = char_budget(cfg, tokens_key=tokens_key, default_tokens=default_tokens)
+        return text if len(text) <= cap else text[:cap]
+    budget = token_budget(cfg, tokens_key=tokens_key, default_tokens=default_tokens)
+    # A whole document would be one multi-MB /tokenize request, and a timeout
+    # there marks the tokenizer down for every caller.
+    text = text[:budget * _MAX_CHARS_PER_TOKEN]
+    tokens = count_tokens(text)
+    # Cut at the text's own chars/token ratio, then shrink until it fits: a
+    # few /tokenize calls, however dense the text is.
+    while tokens > budget:
+        cut = int(len(text) * budget / tokens * 0.97)
+        if cut <= 0:
+            return ""
+        text = text[:cut]
+        tokens = count_tokens(text)
+    return text
+
+
+def pack_units(units, chunk_word_budget, chunk_token_budget=None):
+    """`chunk_units` for the content tasks: up to `chunk_token_budget` tokens
+    of the served model per chunk when set (`<task>.chunk_token_budget`),
+    otherwise up to `chunk_word_budget` words."""
+    if chunk_token_budget:
+        return chunk_units(
+            units, int(chunk_token_budget), size_fn=count_tokens,
+            max_words_fallback=min(chunk_word_budget, int(chunk_token_budget)), joiner="\n\n",
+        )
+    return chunk_units(units, chunk_word_budget, joiner="\n\n")
 
 
-def build_chunks(content, chunk_word_budget, *, units_filter=None):
+def build_chunks(content, chunk_word_budget, *, units_filter=None, chunk_token_budget=None):
     """Input pipeline of the content tasks: clean the document (HTML → markdown,
     drop dense blobs), split it into semantic units, apply an optional relevance
     filter and pack the units into chunks that fit `chunk_word_budget` words.
+
+    With `chunk_token_budget`, chunks are packed to that many tokens instead
+    (`pack_units`).
     """
     cleaned = strip_dense_blobs(html_to_markdown(content or ""))
     units = extract_section_units(cleaned)
@@ -345,4 +443,4 @@ def build_chunks(content, chunk_word_budget, *, units_filter=None):
         return []
     if units_filter is not None:
         units = units_filter(units) or units
-    return chunk_units(units, chunk_word_budget, joiner="\n\n")
+    return pack_units(units, chunk_word_budget, chunk_token_budget)
@@ -1,7 +1,178 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
-from utils.device import get_device
-from lib.llm.config import get_task_config
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from typing import Any, Dict, List, Optional
+from lib.llm.config import (  # type: ignore
+    _PROJECT_DIR, get_embedding_defaults, get_llm_defaults, get_task_config,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("sentence-transformers", "onnx-int8")
+ONNX_MODEL_FILE = "model.int8.onnx"
+ONNX_META_FILE = "embedding.json"
+
+
+def _model_id(model_name: str, backend: str) -> str:
+    """Names the vectors a model produces: quantized vectors differ slightly
+    from the PyTorch model's, so the backend is part of it."""
+    return model_name if backend == "sentence-transformers" else f"{model_name}#{backend}"
+
+
+def _cache_config() -> Optional[Dict[str, Any]]:
+    """`embedding.cache` from the task config, unless it is turned off."""
+    cfg = get_task_config("embedding").get("cache", {"enabled": True})
+    if isinstance(cfg, dict) and cfg.get("enabled", True):
+        return cfg
+    return None
+
+
+def onnx_model_dir(model_name: str) -> str:
+    """Where `setup_models.py` exports the quantized ONNX graph of `model_name`."""
+    model_dir = get_llm_defaults().get("model_dir", "models")
+    if not os.path.isabs(model_dir):
+        model_dir = os.path.join(_PROJECT_DIR, model_dir)
+    return os.path.join(model_dir, "onnx", model_name.replace("/", "--"))
+
+
+class _OnnxEncoder:
+    """The E5 model as an int8 ONNX graph, behind `SentenceTransformer.encode`.
+
+    `setup_models.py` exports the transformer with dynamic int8 quantization of
+    its weights, next to its tokenizer and an `embedding.json` of what encoding
+    needs (padding token, maximum length). Here the tokens go through ONNX
+    Runtime on the CPU and are mean-pooled over the attention mask, as the
+    model's sentence-transformers pooling does, without importing torch.
+    """
+
+    def __init__(self, path: str, threads: int = 0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(path, ONNX_META_FILE)) as f:
+            meta = json.load(f)
+        self._tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=int(meta.get("max_length", 512)))
+        self._tokenizer.enable_padding(pad_id=int(meta["pad_id"]), pad_token=meta["pad_token"])
+        options = onnxruntime.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self._session = onnxruntime.InferenceSession(
+            os.path.join(path, ONNX_MODEL_FILE), options, providers=["CPUExecutionProvider"],
+        )
+        self._inputs = {i.name for i in self._session.get_inputs()}
+        self.dimension = int(meta.get("dimension", 384))
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True):
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        encodings = self._tokenizer.encode_batch(list(texts))
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": np.array([e.ids for e in encodings], dtype=np.int64), "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feed["token_type_ids"] = np.zeros_like(mask)
+        hidden = self._session.run(None, feed)[0]
+        weights = mask[..., None].astype(np.float32)
+        rows = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        if normalize_embeddings:
+            rows /= np.clip(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12, None)
+        return rows.astype(np.float32, copy=False)
+
+
+def _load_onnx(model_name: str, threads: int) -> Optional[_OnnxEncoder]:
+    """The exported ONNX graph of `model_name`, or None (with a warning) when
+    it can't be run here, in which case the PyTorch model is used instead."""
+    path = onnx_model_dir(model_name)
+    if not os.path.exists(os.path.join(path, ONNX_MODEL_FILE)):
+        logger.warning(
+            "No ONNX export of %s in %s (run setup_models.py); using sentence-transformers",
+            model_name, path,
+        )
+        return None
+    try:
+        return _OnnxEncoder(path, threads)
+    except ImportError as e:
+        logger.warning("ONNX Runtime unavailable (%s); using sentence-transformers", e)
+    except Exception:
+        logger.exception("Error loading the ONNX export of %s; using sentence-transformers", model_name)
+    return None
+
+
+class _MicroBatcher:
+    """Runs the forward passes of concurrent callers as one batch.
+
+    A search, a memory lookup and a RAG question arriving together used to be
+    three forward passes of one text each, on a CPU where a pass of sixteen
+    texts costs little more than a pass of one. Callers hand their texts to
+    `encode` and wait; a single thread takes the first request, gathers
+    whatever else arrives within `window_s` (up to `max_texts` texts), runs
+    them through the model together and hands each caller its own rows.
+    Requests that queue while a pass is running join the next one without
+    waiting at all. A request of `max_texts` or more is a batch already and
+    runs on the caller's thread.
+    """
+
+    def __init__(self, model, window_s: float, max_texts: int):
+        self._model = model
+        self._window_s = max(0.0, window_s)
+        self._max_texts = max(1, max_texts)
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.passes = 0  # forward passes run; for tests and logs
+
+    def encode(self, texts: List[str], normalize_embeddings: bool):
+        if len(texts) >= self._max_texts:
+            return self._model.encode(texts, normalize_embeddings=normalize_embeddings)
+        future: Future = Future()
+        self._queue.put((texts, normalize_embeddings, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True,
+                )
+                self._thread.start()
+        return future.result()
+
+    def _gather(self) -> List[tuple]:
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self._window_s
+        while size < self._max_texts:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self) -> None:
+        while True:
+            pending = self._gather()
+            for normalize in {item[1] for item in pending}:
+                group = [item for item in pending if item[1] == normalize]
+                try:
+                    rows = self._model.encode(
+                        [text for texts, _, _ in group for text in texts],
+                        normalize_embeddings=normalize,
+                    )
+                except BaseException as error:  # noqa: BLE001 — raised in each caller
+                    for _, _, future in group:
+                        future.set_exception(error)
+                    continue
+                self.passes += 1
+                offset = 0
+                for texts, _, future in group:
+                    future.set_result(rows[offset:offset + len(texts)])
+                    offset += len(texts)
 
 
 class EmbeddingService:
@@ -13,34 +184,115 @@ class EmbeddingService:
     prefixes (``passage:`` / ``query:``) — so symmetric callers (e.g. dedupe by
     cosine similarity) must compare ``encode`` against ``encode``, never against
     ``encode_query``.
+
+    The model runs under sentence-transformers (PyTorch, on the GPU when
+    there is one) or, with `embedding_defaults.backend` set to ``onnx-int8``,
+    as the int8 ONNX graph `setup_models.py` exports (`_OnnxEncoder`).
+    Texts already encoded are read back from `database.embedding_cache`
+    instead of going through the model again, and the rest of concurrent
+    callers' texts go through it together (`_MicroBatcher`).
     """
 
     def __init__(self):
         task_config = get_task_config("embedding")
         self.model_name = task_config.get("model", "intfloat/multilingual-e5-small")
-        self.device = get_device()
-        self.model = SentenceTransformer(self.model_name, device=self.device)
+        defaults = get_embedding_defaults()
+        backend = defaults.get("backend", "sentence-transformers")
+        if backend not in BACKENDS:
+            logger.warning("Unknown embedding backend %r; using sentence-transformers", backend)
+        self.model = None
+        if backend == "onnx-int8":
+            self.model = _load_onnx(self.model_name, int(defaults.get("onnx_threads", 0)))
+        if self.model is not None:
+            self.backend, self.device = backend, "cpu"
+        else:
+            from sentence_transformers import SentenceTransformer
+            from utils.device import get_device
+
+            self.backend, self.device = "sentence-transformers", get_device()
+            self.model = SentenceTransformer(self.model_name, device=self.device)
+        logger.info("Embedding model %s on %s (%s)", self.model_name, self.device, self.backend)
+        self._batcher = None
+        batching = task_config.get("micro_batch", {"enabled": True})
+        if isinstance(batching, dict) and batching.get("enabled", True):
+            self._batcher = _MicroBatcher(
+                self.model,
+                float(batching.get("window_ms", 2)) / 1000.0,
+                int(batching.get("max_texts", 64)),
+            )
+
+    def _forward(self, texts: List[str], normalize_embeddings: bool):
+        batcher = getattr(self, "_batcher", None)
+        if batcher is None:
+            return self.model.encode(texts, normalize_embeddings=normalize_embeddings)
+        return batcher.encode(texts, normalize_embeddings)
+
+    def _encode(self, prefix: str, texts: List[str], normalize_embeddings: bool):
+        """`model.encode` of the prefixed `texts`, one row per text, encoding
+        only those the cache doesn't already hold."""
+        cache_cfg = _cache_config()
+        if cache_cfg is None or not texts:
+            return self._forward([f"{prefix}: {t}" for t in texts], normalize_embeddings)
+        from database import embedding_cache
+
+        model = _model_id(self.model_name, getattr(self, "backend", "sentence-transformers"))
+        keys = [
+            embedding_cache.cache_key(model, prefix, t, normalize_embeddings)
+            for t in texts
+        ]
+        vectors = {
+            key: np.frombuffer(raw, dtype=np.float32)
+            for key, raw in embedding_cache.lookup_many(keys).items()
+        }
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            encoded = self._forward(
+                [f"{prefix}: {t}" for t in missing.values()], normalize_embeddings,
+            ).astype(np.float32, copy=False)
+            fresh = dict(zip(missing, encoded))
+            vectors.update(fresh)
+            embedding_cache.store_many(
+                {key: vector.tobytes() for key, vector in fresh.items()},
+                int(cache_cfg.get("max_entries", embedding_cache.DEFAULT_MAX_ENTRIES)),
+            )
+        if len(texts) > 1:
+            encoded_now = sum(1 for key in keys if key in missing)
+            logger.info(
+                "Embeddings: %d of %d texts from cache", len(texts) - encoded_now, len(texts),
+            )
+        return np.stack([vectors[key] for key in keys])
 
     def encode(self, texts: List[str], normalize_embeddings: bool = True):
         """Encode passages (documents) with the E5 passage prefix."""
-        prefixed = [f"passage: {t}" for t in texts]
-        return self.model.encode(prefixed, normalize_embeddings=normalize_embeddings)
+        return self._encode("passage", texts, normalize_embeddings)
 
     def encode_single(self, text: str, normalize_embeddings: bool = True):
         """Encode a single passage."""
-        prefixed = f"passage: {text}"
-        return self.model.encode([prefixed], normalize_embeddings=normalize_embeddings)[0]
+        return self._encode("passage", [text], normalize_embeddings)[0]
 
     def encode_query(self, text: str, normalize_embeddings: bool = True):
         """Encode a search query (E5 asymmetric prefix)."""
-        prefixed = f"query: {text}"
-        return self.model.encode([prefixed], normalize_embeddings=normalize_embeddings)[0]
+        return self._encode("query", [text], normalize_embeddings)[0]
 
 
 # Singleton instance
 _embedding_service = None
 
 
+def embedding_model_id() -> str:
+    """The model (and backend) this process embeds with, without loading it
+    when it isn't loaded yet."""
+    if _embedding_service is not None:
+        return _model_id(_embedding_service.model_name, _embedding_service.backend)
+    return _model_id(
+        get_task_config("embedding").get("model", "intfloat/multilingual-e5-small"),
+        get_embedding_defaults().get("backend", "sentence-transformers"),
+    )
+
+
 def get_embedding_service() -> EmbeddingService:
     """Get the singleton embedding service instance"""
     global _embedding_service
@@ -0,0 +1,183 @@
+"""Keep-alive HTTP connections to the engine.
+
+`urllib.request.urlopen` opens a new TCP connection per request and closes it
+after the reply. Against llama-server that was most of the cost of a short
+call: agent loops and relevance batches send many small requests, and each
+paid a connect plus urllib's handler chain before the server saw a byte.
+
+A `ConnectionPool` keeps the connections to one server open between requests
+(HTTP/1.1 keep-alive, `http.client`). It keeps at most `max_idle` idle
+connections, by default the server's `--parallel` slot count
+(`llama_server.server_slots`). More callers than that can still run at once,
+but the extra connections are closed when they finish instead of parked.
+A connection the server dropped while idle is retried once on a fresh one.
+Pools are per server, not per timeout: each request sets its own socket
+timeout on the connection it checks out, so a short `/tokenize` call and a
+long generation can share connections.
+"""
+
+import http.client
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Errors that mean a reused connection was closed by the server while it sat
+# idle: nothing was processed, so the request can go out again on a new one.
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class PooledResponse:
+    """An `http.client.HTTPResponse` that hands its connection back to the
+    pool once the body has been read to the end.
+
+    Iterating yields raw lines, like the urllib response it replaces. Used as
+    a context manager, a body left unread at a normal exit (a stream the
+    caller stopped reading after its terminator) is drained so the
+    connection can be reused. An exit by exception closes the connection
+    instead, because the server may still be generating.
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn: http.client.HTTPConnection, response: http.client.HTTPResponse):
+        self._pool = pool
+        self._conn = conn
+        self._response = response
+        self.status = response.status
+
+    def read(self) -> bytes:
+        body = self._response.read()
+        self._release()
+        return body
+
+    def __iter__(self):
+        for line in self._response:
+            yield line
+        self._release()
+
+    def close(self) -> None:
+        self._release(reuse=False)
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, exc_type, *_exc) -> None:
+        if self._conn is None:
+            return
+        if exc_type is None:
+            try:
+                self._response.read()
+            except (OSError, http.client.HTTPException):
+                self._release(reuse=False)
+                return
+            self._release()
+        else:
+            self._release(reuse=False)
+
+    def _release(self, reuse: bool = True) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        reusable = reuse and self._response.isclosed() and not self._response.will_close
+        self._pool._put(conn if reusable else None, conn)
+
+
+class ConnectionPool:
+    """Reusable connections to one `scheme://host:port`."""
+
+    def __init__(self, base_url: str, max_idle: int):
+        parts = urlsplit(base_url)
+        self._https = parts.scheme == "https"
+        self._host = parts.hostname or "127.0.0.1"
+        self._port = parts.port or (443 if self._https else 80)
+        self.max_idle = max(1, max_idle)
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self.opened = 0  # connections created so far; for tests and logs
+
+    def _new(self, timeout: float) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        self.opened += 1
+        return cls(self._host, self._port, timeout=timeout)
+
+    def _get(self, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            return self._new(timeout), False
+        # The connection was opened for an earlier request's timeout.
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _put(self, conn: Optional[http.client.HTTPConnection], original: http.client.HTTPConnection) -> None:
+        if conn is not None:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(conn)
+                    return
+        original.close()
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None, timeout: float = 60.0) -> PooledResponse:
+        """Send one request and return its response, body unread. `timeout`
+        is the socket timeout for this request, connecting and reading alike.
+
+        Connection failures raise `OSError` or `http.client.HTTPException`.
+        HTTP error statuses don't raise; check `status`.
+        """
+        conn, reused = self._get(timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+        except _STALE_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+            conn = self._new(timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+        return PooledResponse(self, conn, response)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(url: str) -> ConnectionPool:
+    """The process-wide pool for the server `url` lives on."""
+    from services.llama_server import server_slots
+
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(key, server_slots())
+        return pool
+
+
+def close_pools() -> None:
+    """Drop every idle connection (engine restarted, tests)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
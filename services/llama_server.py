@@ -24,6 +24,7 @@ came up it is the same server: same model, same context, same slots.
 """
 
 import atexit
+import http.client
 import json
 import logging
 import os
@@ -36,11 +37,15 @@ import threading
 import time
 import urllib.error
 import urllib.request
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
 
+from services import http_pool
 from lib.llm.config import (
     active_deployments,
     get_llm_defaults,
+    get_llm_servers,
     get_tasks,
     llm_params_for,
 )
@@ -71,6 +76,26 @@ def server_url() -> str:
     return url.strip().rstrip("/")
 
 
+def server_urls() -> List[str]:
+    """Every engine LLM requests may go to: the shared one first, then the
+    extra endpoints of `llm_defaults.servers` (`LLAMA_SERVER_URLS`)."""
+    primary = server_url()
+    return [primary] + [url for url in get_llm_servers() if url != primary]
+
+
+def server_slots() -> int:
+    """How many `--parallel` slots the engine is started with.
+
+    One slot per concurrent caller (see `engine_cmd`). Also what a worker sizes
+    its LLM execution slots by when nothing else is configured: more concurrent
+    executions than slots would only queue inside the server.
+    """
+    try:
+        return max(1, int(os.environ.get("LLAMA_SERVER_SLOTS", "2")))
+    except ValueError:
+        return 2
+
+
 def _bundled_binaries() -> List[str]:
     """Where documents-dev keeps the engine, most specific first.
 
@@ -141,6 +166,204 @@ def props(url: str, timeout: float = 5.0) -> Dict[str, Any]:
         return {}
 
 
+def tokenize_count(url: str, text: str, timeout: float = 10.0) -> Optional[int]:
+    """How many tokens `text` is to the served model, from `/tokenize`.
+
+    None when the server can't be asked. Goes over the engine's kept-alive
+    connections: planning a document asks once per unit.
+    """
+    body = json.dumps({"content": text, "add_special": False}).encode("utf-8")
+    try:
+        with http_pool.get_pool(url).request(
+            "POST", urlsplit(url).path + "/tokenize", body=body,
+            headers={"Content-Type": "application/json"}, timeout=timeout,
+        ) as resp:
+            if resp.status != 200:
+                return None
+            tokens = json.loads(resp.read().decode("utf-8")).get("tokens")
+    except (http.client.HTTPException, OSError, ValueError, AttributeError):
+        return None
+    return len(tokens) if isinstance(tokens, list) else None
+
+
+_total_slots: Dict[str, int] = {}
+
+
+def total_slots(url: str) -> Optional[int]:
+    """How many slots the server at `url` actually has, from `/props`.
+
+    Remembered per server once it answers: the count is fixed for the life of
+    the engine. None while it can't be asked, so callers fall back to
+    `server_slots()` and ask again next time.
+    """
+    if url not in _total_slots:
+        slots = props(url).get("total_slots")
+        if not isinstance(slots, int) or slots < 1:
+            return None
+        _total_slots[url] = slots
+    return _total_slots[url]
+
+
+# How long a server that failed a request is left out before /health is asked
+# whether it is back.
+DOWN_RETRY_S = float(os.environ.get("LLAMA_SERVER_RETRY_S", "15"))
+
+_balance_lock = threading.Lock()
+_outstanding: Dict[str, int] = {}
+_down_until: Dict[str, float] = {}
+
+
+def mark_down(url: str) -> None:
+    """Leave `url` out of `acquire` for `DOWN_RETRY_S`: it stopped answering."""
+    with _balance_lock:
+        _down_until[url] = time.monotonic() + DOWN_RETRY_S
+    logger.warning("Engine at %s is not answering; sending requests elsewhere for %.0fs", url, DOWN_RETRY_S)
+
+
+def _available(url: str) -> bool:
+    with _balance_lock:
+        until = _down_until.get(url)
+        if until is None:
+            return True
+        if time.monotonic() < until:
+            return False
+        # Retry window reached: one caller probes, the others keep avoiding it.
+        _down_until[url] = time.monotonic() + DOWN_RETRY_S
+    if is_alive(url):
+        with _balance_lock:
+            _down_until.pop(url, None)
+        logger.info("Engine at %s answers again", url)
+        return True
+    return False
+
+
+@contextmanager
+def acquire(urls: List[str]) -> Iterator[str]:
+    """The server in `urls` to send a request to, held for the request.
+
+    The one with the most free slots: its slot count (`total_slots`) less the
+    requests this process has outstanding there. Ties go to the earlier one,
+    so a single idle engine keeps the traffic. Servers marked down are skipped
+    until their health check passes again. When every server is down the
+    first is used anyway, and its error reaches the caller.
+    """
+    candidates = [url for url in urls if _available(url)] or urls[:1]
+    with _balance_lock:
+        url = max(
+            candidates,
+            key=lambda u: (
+                (_total_slots.get(u) or server_slots()) - _outstanding.get(u, 0),
+                -candidates.index(u),
+            ),
+        )
+        _outstanding[url] = _outstanding.get(url, 0) + 1
+    try:
+        yield url
+    finally:
+        with _balance_lock:
+            _outstanding[url] -= 1
+
+
+def _get(url: str, path: str, timeout: float) -> Optional[bytes]:
+    try:
+        with urllib.request.urlopen(f"{url}{path}", timeout=timeout) as resp:
+            return resp.read()
+    except (urllib.error.URLError, urllib.error.HTTPError, TimeoutError, OSError):
+        return None
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """The samples of a Prometheus text exposition, `{name: value}`, with the
+    `llamacpp:` prefix dropped. Labelled series are not used by llama-server
+    and are skipped."""
+    samples: Dict[str, float] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "{" in line:
+            continue
+        name, _, rest = line.partition(" ")
+        try:
+            value = float(rest.split()[0])
+        except (IndexError, ValueError):
+            continue
+        samples[name.split(":", 1)[-1]] = value
+    return samples
+
+
+def slots(url: str, timeout: float = 2.0) -> List[Dict[str, Any]]:
+    """The server's slots as `/slots` lists them, or [] when it can't be asked
+    (or was started with `--no-slots`)."""
+    raw = _get(url, "/slots", timeout)
+    try:
+        data = json.loads(raw.decode("utf-8")) if raw else []
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return []
+    return [slot for slot in data if isinstance(slot, dict)] if isinstance(data, list) else []
+
+
+# How long a scrape answers for. Every inference that finishes under an
+# execution records the engine's state, and a busy worker finishes several a
+# second; scraping once per interval is plenty to see the load.
+STATS_MAX_AGE_S = 2.0
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, tuple] = {}
+
+
+def engine_stats(url: str, timeout: float = 1.0) -> Dict[str, int]:
+    """The engine's load right now, from `/metrics` (`--metrics`) and `/slots`.
+
+    Joined to each inference's own timings (`services.llm_service`), it tells
+    whether a slow call waited for a slot, spent its time evaluating the
+    prompt, or generating:
+
+      engineSlotsBusy / engineSlotsTotal   slots processing a request
+      engineRequestsProcessing             requests being served
+      engineRequestsDeferred               requests waiting for a free slot
+      engineKvCacheUsagePercent            KV cache in use
+      enginePromptTokensPerSecond          prompt evaluation rate
+      engineGeneratedTokensPerSecond       generation rate
+
+    llama-server computes both rates over the interval since the previous
+    scrape. Keys the engine didn't report are left out; {} when it can't be
+    asked. Remembered for `STATS_MAX_AGE_S`.
+    """
+    now = time.monotonic()
+    with _stats_lock:
+        cached = _stats.get(url)
+        if cached and now - cached[0] < STATS_MAX_AGE_S:
+            return dict(cached[1])
+        # Claim the interval before scraping, so concurrent callers use the
+        # previous snapshot instead of all scraping at once.
+        _stats[url] = (now, cached[1] if cached else {})
+
+    stats: Dict[str, int] = {}
+    raw = _get(url, "/metrics", timeout)
+    samples = parse_metrics(raw.decode("utf-8", "replace")) if raw else {}
+    for key, name, scale in (
+        ("engineRequestsProcessing", "requests_processing", 1),
+        ("engineRequestsDeferred", "requests_deferred", 1),
+        ("engineKvCacheUsagePercent", "kv_cache_usage_ratio", 100),
+        ("enginePromptTokensPerSecond", "prompt_tokens_seconds", 1),
+        ("engineGeneratedTokensPerSecond", "predicted_tokens_seconds", 1),
+    ):
+        value = samples.get(name)
+        if value is not None and value >= 0:
+            stats[key] = int(round(value * scale))
+    listed = slots(url, timeout)
+    if listed:
+        stats["engineSlotsTotal"] = len(listed)
+        # `is_processing` in current builds, `state` (0 = idle) in older ones.
+        stats["engineSlotsBusy"] = sum(
+            1 for slot in listed
+            if slot.get("is_processing", slot.get("state", 0) not in (0, None))
+        )
+
+    with _stats_lock:
+        _stats[url] = (time.monotonic(), stats)
+    return dict(stats)
+
+
 def lora_adapters(url: str, timeout: float = 5.0) -> List[Dict[str, Any]]:
     """The adapters the server has loaded: `[{"id", "path", "scale"}, …]`.
 
@@ -216,6 +439,14 @@ def _most_used_model() -> str:
     return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[0][0]
 
 
+def _env_int(name: str, fallback: Any) -> int:
+    raw = os.environ.get(name, "").strip()
+    try:
+        return int(raw) if raw else int(fallback)
+    except (TypeError, ValueError):
+        return int(fallback)
+
+
 def engine_defaults() -> Dict[str, Any]:
     """The one definition of documents-dev's engine: what to load and how.
 
@@ -235,23 +466,49 @@ def engine_defaults() -> Dict[str, Any]:
     task = {"model_path": model} if os.path.isabs(model) else {"model": model}
     params = llm_params_for(task)
 
-    def _int(name: str, fallback: Any) -> int:
-        raw = os.environ.get(name, "").strip()
-        try:
-            return int(raw) if raw else int(fallback)
-        except (TypeError, ValueError):
-            return int(fallback)
-
     return {
         "model_path": params["model_path"],
-        "n_ctx": _int("LLAMA_SERVER_CTX", params["n_ctx"]),
-        "n_threads": _int("LLAMA_SERVER_THREADS", params["n_threads"]),
-        "n_gpu_layers": _int("LLAMA_SERVER_GPU_LAYERS", params["n_gpu_layers"]),
+        "n_ctx": _env_int("LLAMA_SERVER_CTX", params["n_ctx"]),
+        "n_threads": _env_int("LLAMA_SERVER_THREADS", params["n_threads"]),
+        "n_gpu_layers": _env_int("LLAMA_SERVER_GPU_LAYERS", params["n_gpu_layers"]),
         # Every adapter deployed on a task, loaded once even if several tasks
         # share it. They have to be here because llama-server only attaches
         # adapters at startup: a task whose LoRA didn't make it into the command
         # line would silently answer as the base model.
         "lora_paths": _deployed_adapters(),
+        "draft": _draft_model(params),
+    }
+
+
+def _draft_model(params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The draft model for speculative decoding, from `llm_defaults.draft`.
+
+    A small model of the same family (same vocabulary) guesses the next few
+    tokens and the served model checks them all in one batch, so a long
+    summary or chat reply costs fewer full forward passes. Worth most on CPU,
+    where every pass of an 8B model is expensive. None when no draft is
+    configured, or when its file isn't there: like a missing adapter, that
+    would stop llama-server from starting at all.
+    """
+    draft = get_llm_defaults().get("draft") or {}
+    name = os.environ.get("LLAMA_SERVER_DRAFT_MODEL", "").strip() or draft.get("model") or ""
+    if not name:
+        return None
+    path = llm_params_for({"model_path": name} if os.path.isabs(name) else {"model": name})["model_path"]
+    if not os.path.isfile(path):
+        logger.warning(
+            "Draft model %s not found; serving without speculative decoding. "
+            "Download it with `python setup_models.py`.", path,
+        )
+        return None
+    return {
+        "model_path": path,
+        "draft_max": _env_int("LLAMA_SERVER_DRAFT_MAX", draft.get("draft_max", 16)),
+        "draft_min": _env_int("LLAMA_SERVER_DRAFT_MIN", draft.get("draft_min", 0)),
+        "draft_p_min": float(draft.get("draft_p_min", 0.75)),
+        "n_gpu_layers": _env_int("LLAMA_SERVER_DRAFT_GPU_LAYERS", draft.get(
+            "n_gpu_layers", _env_int("LLAMA_SERVER_GPU_LAYERS", params["n_gpu_layers"]),
+        )),
     }
 
 
@@ -286,7 +543,7 @@ def engine_cmd(binary: str, url: str, engine: Dict[str, Any]) -> List[str]:
     # land on the same server and would otherwise queue behind each other. Each
     # slot keeps its own KV cache, which is what makes `cache_prompt` worth
     # anything.
-    slots = max(1, int(os.environ.get("LLAMA_SERVER_SLOTS", "2")))
+    slots = server_slots()
     cmd = [
         binary,
         "--host", host,
@@ -310,6 +567,15 @@ def engine_cmd(binary: str, url: str, engine: Dict[str, Any]) -> List[str]:
     ]
     if engine["n_threads"]:
         cmd += ["--threads", str(engine["n_threads"])]
+    draft = engine.get("draft")
+    if draft:
+        cmd += [
+            "--model-draft", draft["model_path"],
+            "--gpu-layers-draft", str(draft["n_gpu_layers"]),
+            "--draft-max", str(draft["draft_max"]),
+            "--draft-min", str(draft["draft_min"]),
+            "--draft-p-min", str(draft["draft_p_min"]),
+        ]
     for adapter in engine.get("lora_paths") or []:
         cmd += ["--lora", str(adapter)]
     if engine.get("lora_paths"):
@@ -439,6 +705,7 @@ def main(argv: Optional[List[str]] = None) -> int:
     Flags, for the service manager's benefit rather than a human's:
       --url        print where the engine is expected to answer
       --print-cmd  print the command that would be run, and exit
+      --stats      print the running engine's load (`engine_stats`) as JSON
     """
     argv = list(sys.argv[1:] if argv is None else argv)
     logging.basicConfig(
@@ -448,6 +715,9 @@ def main(argv: Optional[List[str]] = None) -> int:
     if "--url" in argv:
         print(url)
         return 0
+    if "--stats" in argv:
+        print(json.dumps(engine_stats(url, timeout=5.0), indent=2, sort_keys=True))
+        return 0
 
     binary = server_binary()
     if not binary:
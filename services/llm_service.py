@@ -15,19 +15,37 @@ modules that call it did not have to change. What changed underneath:
     comparing against what the server actually serves.
   - LoRA adapters are not applied. The server loads what it was told to load; a
     task asking for one gets a warning and the base model.
+
+Deterministic calls (temperature 0 or a fixed seed) can be answered from
+`database.llm_cache` instead of the engine when
+`llm_defaults.response_cache.enabled` is set.
+
+Requests that open with the same instructions are pinned to the same engine
+slot (`_affine_slot`), so the prefix that slot already evaluated is reused
+through `cache_prompt` instead of re-evaluated on whichever slot was free.
+
+With extra endpoints in `llm_defaults.servers`, each request goes to the
+engine with the most free slots (`llama_server.acquire`); one that stops
+answering is skipped until its health check passes again.
+
+`chat_with_tools_stream` reads a tool round as it is generated and reports each
+tool call as soon as its arguments are complete.
 """
 
+import hashlib
+import http.client
 import json
 import logging
 import os
-import urllib.error
-import urllib.request
-from typing import Any, Dict, Iterator, List, Optional
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
 
 import re
 
-from lib.llm.config import get_inference_sampling
-from services import llama_server
+from lib.llm.config import get_inference_sampling, get_llm_defaults
+from services import http_pool, llama_server
 
 logger = logging.getLogger(__name__)
 
@@ -79,9 +97,26 @@ def _response_metrics(response: Dict[str, Any]) -> Dict[str, Any]:
             timings.get("time_to_first_token_ms"),
             timings.get("ttft_ms"),
         ),
+        # Left out rather than "unknown" when the engine didn't time the call
+        # (a cached reply, an error).
+        **{
+            key: value
+            for key, value in (
+                ("promptEvalMs", integer(timings.get("prompt_ms"))),
+                ("generationMs", integer(timings.get("predicted_ms"))),
+                ("promptTokensPerSecond", integer(timings.get("prompt_per_second"))),
+                ("generatedTokensPerSecond", integer(timings.get("predicted_per_second"))),
+            )
+            if value != "unknown"
+        },
     }
 
 
+def _without_timings(response: Dict[str, Any]) -> Dict[str, Any]:
+    """`response` without the engine's `timings` of the call that produced it."""
+    return {key: value for key, value in response.items() if key != "timings"}
+
+
 def _finish_inference(
     emitter,
     handle,
@@ -91,9 +126,16 @@ def _finish_inference(
     raw_response: Optional[Dict[str, Any]] = None,
     error: Optional[str] = None,
     reason: Optional[str] = None,
+    engine_url: Optional[str] = None,
 ) -> None:
     if not emitter or not handle:
         return
+    metrics = _response_metrics(raw_response or {})
+    if engine_url:
+        # The engine's load as the call finished, next to the call's own
+        # timings: a slow call under many busy slots waited, one on an idle
+        # engine with a long promptEvalMs was all prompt.
+        metrics.update(llama_server.engine_stats(engine_url))
     emitter.finish_inference(
         handle,
         response,
@@ -101,7 +143,7 @@ def _finish_inference(
         status="failed" if error else "succeeded",
         error=error,
         reason=reason,
-        metrics=_response_metrics(raw_response or {}),
+        metrics=metrics,
         raw_response=raw_response,
     )
     emitter.flush_evidence()
@@ -114,19 +156,30 @@ def strip_thinking(text: str) -> str:
     return _THINK_RE.sub("", text).strip()
 
 
+class EngineUnavailable(RuntimeError):
+    """The engine didn't answer at all: refused, dropped, or timed out. Unlike
+    a rejected request, the same request may succeed on another engine."""
+
+
 def _post(url: str, payload: Dict[str, Any], stream: bool = False):
     """POST JSON to the engine. Returns the parsed reply, or the live response
-    object when `stream` is set so the caller can read it as it arrives."""
+    object when `stream` is set so the caller can read it as it arrives.
+
+    Goes over a kept-alive connection from the engine's pool
+    (`services.http_pool`), so a burst of short calls doesn't pay a TCP
+    connect each."""
     data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        url, data=data, method="POST", headers={"Content-Type": "application/json"}
-    )
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
     try:
-        resp = urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT_S)
-    except urllib.error.HTTPError as e:
-        raise RuntimeError(f"llama-server rejected the request: {_error_detail(e)}") from e
-    except (urllib.error.URLError, TimeoutError, OSError) as e:
-        raise RuntimeError(f"llama-server at {url} is not answering: {e}") from e
+        resp = http_pool.get_pool(url).request(
+            "POST", path, body=data, headers={"Content-Type": "application/json"},
+            timeout=REQUEST_TIMEOUT_S,
+        )
+    except (http.client.HTTPException, OSError) as e:
+        raise EngineUnavailable(f"llama-server at {url} is not answering: {e}") from e
+    if resp.status >= 400:
+        raise RuntimeError(f"llama-server rejected the request: {_error_detail(resp.status, resp.read())}")
     if stream:
         return resp
     with resp:
@@ -137,17 +190,188 @@ def _post(url: str, payload: Dict[str, Any], stream: bool = False):
         raise RuntimeError(f"llama-server returned something that isn't JSON: {raw[:200]}") from e
 
 
-def _error_detail(e: urllib.error.HTTPError) -> str:
+def _response_cache_config() -> Optional[Dict[str, Any]]:
+    """`llm_defaults.response_cache` when it is enabled, else None."""
+    cfg = get_llm_defaults().get("response_cache")
+    if isinstance(cfg, dict) and cfg.get("enabled"):
+        return cfg
+    return None
+
+
+def _is_deterministic(body: Dict[str, Any]) -> bool:
+    """Whether the engine gives the same answer to `body` every time: greedy
+    sampling, or a fixed seed (-1 asks the server for a random one)."""
+    if body.get("temperature") == 0:
+        return True
+    seed = body.get("seed")
+    return isinstance(seed, int) and seed >= 0
+
+
+# How much of the start of a request identifies its prefix. Enough to cover a
+# task's system prompt and instructions; the document text that follows them
+# differs per call anyway.
+_PREFIX_CHARS = 2048
+
+_slot_lock = threading.Lock()
+_slots_in_use: Dict[str, Set[int]] = {}
+
+
+def _prompt_prefix(body: Dict[str, Any]) -> str:
+    messages = body.get("messages")
+    if messages is None:
+        return (body.get("prompt") or "")[:_PREFIX_CHARS]
+    text = "".join(f"{m.get('role')}\n{m.get('content')}\n" for m in messages)
+    return text[:_PREFIX_CHARS]
+
+
+@contextmanager
+def _affine_slot(url: str, body: Dict[str, Any]):
+    """`body` with an `id_slot` chosen by hashing its prompt prefix.
+
+    With several `--parallel` slots the server hands each request to any free
+    slot, so map-reduce leaves and relevance batches that repeat the same long
+    instructions keep landing on slots that cached something else. Hashing the
+    prefix sends them back to the slot that already holds it. When that slot is
+    already busy with a request from this process, the body goes out unpinned
+    so the call doesn't queue behind it while other slots sit idle. Off with
+    `llm_defaults.slot_affinity: false`.
+    """
+    slots = llama_server.total_slots(url)
+    if not slots or slots < 2 or not get_llm_defaults().get("slot_affinity", True):
+        yield body
+        return
+    digest = hashlib.sha256(_prompt_prefix(body).encode("utf-8")).digest()
+    slot = int.from_bytes(digest[:8], "big") % slots
+    with _slot_lock:
+        in_use = _slots_in_use.setdefault(url, set())
+        if slot in in_use:
+            slot = None
+        else:
+            in_use.add(slot)
+    if slot is None:
+        yield body
+        return
+    try:
+        yield {**body, "id_slot": slot}
+    finally:
+        with _slot_lock:
+            in_use.discard(slot)
+
+
+_INLINE_CALL_RE = re.compile(r"<tool_call>\s*(\{.*?\})\s*</tool_call>", re.DOTALL)
+
+
+class _StreamedToolReply:
+    """Assembles a streamed `/v1/chat/completions` reply with tools enabled.
+
+    The server sends each native tool call as fragments under its `index`: the
+    id and name first, then the arguments a few characters at a time. A call is
+    complete once a fragment for a later index arrives or the stream ends.
+    Calls the model writes inline as `<tool_call>{…}</tool_call>` in the
+    content are complete at their closing tag. `on_tool_call(index, call)` is
+    told about each call once, as soon as it is complete.
+    """
+
+    def __init__(self, on_tool_call=None):
+        self.on_tool_call = on_tool_call
+        self.parts: List[str] = []
+        self.calls: Dict[int, Dict[str, Any]] = {}
+        self.last_chunk: Dict[str, Any] = {}
+        self._announced: Set[int] = set()
+        self._inline_announced = 0
+
+    @property
+    def content(self) -> str:
+        return "".join(self.parts)
+
+    def feed(self, chunk: Dict[str, Any]) -> None:
+        self.last_chunk = chunk
+        delta = (chunk.get("choices") or [{}])[0].get("delta") or {}
+        piece = delta.get("content") or ""
+        if piece:
+            self.parts.append(piece)
+            if ">" in piece and not self.calls:
+                self._announce_inline()
+        for fragment in delta.get("tool_calls") or []:
+            index = fragment.get("index")
+            if not isinstance(index, int):
+                # A server that omits the index starts a new call with each id.
+                last = max(self.calls, default=-1)
+                index = last + 1 if fragment.get("id") or last < 0 else last
+            for earlier in sorted(i for i in self.calls if i < index):
+                self._announce(earlier)
+            call = self.calls.setdefault(index, {
+                "id": "", "type": "function", "function": {"name": "", "arguments": ""},
+            })
+            if fragment.get("id"):
+                call["id"] = fragment["id"]
+            function = fragment.get("function") or {}
+            call["function"]["name"] += function.get("name") or ""
+            call["function"]["arguments"] += function.get("arguments") or ""
+
+    def finish(self) -> Dict[str, Any]:
+        """The assembled assistant message, announcing whatever is left."""
+        for index in sorted(self.calls):
+            self._announce(index)
+        message: Dict[str, Any] = {"role": "assistant", "content": self.content}
+        if self.calls:
+            message["tool_calls"] = [self.calls[i] for i in sorted(self.calls)]
+        return message
+
+    def _announce(self, index: int) -> None:
+        if index in self._announced:
+            return
+        self._announced.add(index)
+        if self.on_tool_call is not None:
+            self.on_tool_call(index, self.calls[index])
+
+    def _announce_inline(self) -> None:
+        # Only what follows the model's reasoning: a call it merely considered
+        # inside <think> is not one it made.
+        text = _THINK_RE.sub("", self.content).split("<think>", 1)[0]
+        matches = _INLINE_CALL_RE.findall(text)
+        for i in range(self._inline_announced, len(matches)):
+            try:
+                obj = json.loads(matches[i])
+            except json.JSONDecodeError:
+                continue
+            name = str(obj.get("name") or "").strip() if isinstance(obj, dict) else ""
+            if name and self.on_tool_call is not None:
+                arguments = obj.get("arguments")
+                self.on_tool_call(i, {
+                    "id": f"inline_call_{i}",
+                    "type": "function",
+                    "function": {
+                        "name": name,
+                        "arguments": (
+                            arguments if isinstance(arguments, str)
+                            else json.dumps(arguments or {}, ensure_ascii=False)
+                        ),
+                    },
+                })
+        self._inline_announced = len(matches)
+
+
+def _tool_reply_outcome(content: str, tool_calls: List[dict]) -> str:
+    has_inline_tool_call = isinstance(content, str) and "<tool_call>" in content
+    if tool_calls or has_inline_tool_call:
+        return "tool_requests"
+    return "final_text" if content else "invalid"
+
+
+def _error_detail(status: int, raw: bytes) -> str:
     """The message llama-server puts in the body of a 4xx, which says what is
     actually wrong (bad grammar, context overflow) far better than the status."""
     try:
-        body = json.loads(e.read().decode("utf-8"))
-    except (UnicodeDecodeError, json.JSONDecodeError, OSError):
-        return f"HTTP {e.code}"
+        body = json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return f"HTTP {status}"
+    if not isinstance(body, dict):
+        return f"HTTP {status}: {body}"
     error = body.get("error")
     if isinstance(error, dict):
-        return f"HTTP {e.code}: {error.get('message') or error}"
-    return f"HTTP {e.code}: {error or body}"
+        return f"HTTP {status}: {error.get('message') or error}"
+    return f"HTTP {status}: {error or body}"
 
 
 class LLMService:
@@ -174,6 +398,10 @@ class LLMService:
         )
 
         self.url = llama_server.ensure_server(model_path)
+        # The shared engine, then any extra endpoints requests are balanced
+        # over (`llm_defaults.servers`). They are expected to serve the same
+        # model; only the shared one is checked.
+        self.urls = llama_server.server_urls()
         self._warn_on_mismatch()
 
         # The adapter is applied per request, citing the id the server gave it
@@ -194,6 +422,7 @@ class LLMService:
                 "LLM using LoRA %s (id=%s, scale=%s)",
                 os.path.basename(lora_path), self._lora_id, self.lora_scale,
             )
+        self._lora_ids = {self.url: self._lora_id}
 
     def _lora_field(self) -> Dict[str, Any]:
         """The `lora` field of a request, or nothing when there's no adapter.
@@ -214,6 +443,7 @@ class LLMService:
         not from the model its config names.
         """
         served = llama_server.loaded_model(self.url)
+        self._served_model = served
         wanted = os.path.basename(self.model_path)
         if served and wanted and served != wanted:
             logger.warning(
@@ -230,6 +460,79 @@ class LLMService:
                 served_ctx, self.n_ctx,
             )
 
+    def _complete(self, endpoint: str, body: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """POST `body` to `endpoint`, through the response cache when it is
+        enabled and the call is deterministic, on the slot its prefix maps to.
+
+        Returns the reply and the engine that produced it, or None for the
+        engine when the reply came from the cache. A cached reply carries no
+        `timings`: they belonged to an inference that didn't happen now."""
+        cache_cfg = _response_cache_config()
+        if cache_cfg is None or not _is_deterministic(body):
+            return self._post_to_slot(endpoint, body)
+        from database import llm_cache
+
+        # The served model, not the configured one: what the engine actually
+        # loaded is what decides the answer.
+        model = getattr(self, "_served_model", None) or os.path.basename(self.model_path)
+        key = llm_cache.cache_key(model, endpoint, body)
+        cached = llm_cache.lookup(key)
+        if cached is not None:
+            return _without_timings(cached), None
+        resp, url = self._post_to_slot(endpoint, body)
+        llm_cache.store(
+            key, _without_timings(resp),
+            int(cache_cfg.get("max_entries", llm_cache.DEFAULT_MAX_ENTRIES)),
+        )
+        return resp, url
+
+    def _servers(self) -> List[str]:
+        """The engines this client may send to. With an adapter, only those
+        that loaded it: another engine would answer as the base model."""
+        urls = getattr(self, "urls", None) or [self.url]
+        if getattr(self, "_lora_id", None) is None:
+            return urls
+        ids = self._lora_ids
+        for url in urls:
+            if url not in ids:
+                ids[url] = llama_server.lora_adapter_id(url, self.lora_path)
+        return [url for url in urls if ids[url] is not None]
+
+    @contextmanager
+    def _engine(self, body: Dict[str, Any]):
+        """`(url, body)`: the engine to send `body` to, picked by
+        `llama_server.acquire`, and `body` as that engine needs it (its own
+        adapter id, a slot for its prefix). Held for the whole request. An
+        engine that doesn't answer is marked down so the next request goes
+        elsewhere. An error raised while it is held carries the engine as its
+        `engine_url`, for the inference record."""
+        servers = self._servers()
+        with llama_server.acquire(servers) as url:
+            if url != self.url and getattr(self, "_lora_id", None) is not None:
+                body = {**body, "lora": [{"id": self._lora_ids[url], "scale": self.lora_scale}]}
+            try:
+                with _affine_slot(url, body) as routed:
+                    yield url, routed
+            except Exception as error:
+                error.engine_url = url
+                if isinstance(error, EngineUnavailable) and len(servers) > 1:
+                    llama_server.mark_down(url)
+                raise
+
+    def _post_to_slot(self, endpoint: str, body: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """POST to an engine, moving on to the next one when it doesn't
+        answer: a stalled server shouldn't fail the calls others could take.
+        Returns the reply and the engine that gave it."""
+        attempts = len(self._servers())
+        for attempt in range(1, attempts + 1):
+            try:
+                with self._engine(body) as (url, routed):
+                    return _post(f"{url}{endpoint}", routed), url
+            except EngineUnavailable:
+                if attempt >= attempts:
+                    raise
+        raise EngineUnavailable("no llama-server to send the request to")
+
     def _sampling_kwargs(self, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Map the resolved per-model sampling defaults to llama-server fields.
 
@@ -283,10 +586,11 @@ class LLMService:
             body["grammar"] = grammar
         emitter, trace = _begin_inference("generate", body)
         try:
-            resp = _post(f"{self.url}/completion", body)
+            resp, engine_url = self._complete("/completion", body)
         except Exception as error:
             _finish_inference(
                 emitter, trace, {}, outcome="invalid", error=str(error),
+                engine_url=getattr(error, "engine_url", None),
             )
             raise
         text = (resp.get("content") or "").strip()
@@ -297,6 +601,7 @@ class LLMService:
             outcome="final_text" if text else "invalid",
             raw_response=resp,
             reason=None if text else "empty_model_response",
+            engine_url=engine_url,
         )
         return text if allow_thinking else strip_thinking(text)
 
@@ -366,10 +671,11 @@ class LLMService:
             body["response_format"] = response_format
         emitter, trace = _begin_inference(inference_name, body, trace_metadata)
         try:
-            resp = _post(f"{self.url}/v1/chat/completions", body)
+            resp, engine_url = self._complete("/v1/chat/completions", body)
         except Exception as error:
             _finish_inference(
                 emitter, trace, {}, outcome="invalid", error=str(error),
+                engine_url=getattr(error, "engine_url", None),
             )
             raise
         text = _content_of(resp)
@@ -380,6 +686,7 @@ class LLMService:
             outcome="final_text" if text else "invalid",
             raw_response=resp,
             reason=None if text else "empty_model_response",
+            engine_url=engine_url,
         )
         return text if allow_thinking else strip_thinking(text)
 
@@ -399,9 +706,10 @@ class LLMService:
         functions the model wants invoked). The caller is responsible for
         executing the tools and feeding the results back in a follow-up call.
 
-        Non-streaming on purpose: the model decides whether to call a tool
-        before producing user-visible text, so there's nothing useful to
-        stream yet.
+        Non-streaming: the model decides whether to call a tool before
+        producing user-visible text, so there's no text worth streaming. A
+        caller that wants to act on each call before the reply ends uses
+        `chat_with_tools_stream`.
 
         Needs a server started with --jinja; without it llama-server has no
         chat template to render the tool calls with and answers 500.
@@ -425,22 +733,18 @@ class LLMService:
             trace_metadata,
         )
         try:
-            resp = _post(f"{self.url}/v1/chat/completions", body)
+            resp, engine_url = self._complete("/v1/chat/completions", body)
         except Exception as error:
             _finish_inference(
                 emitter, trace, {}, outcome="invalid", error=str(error),
+                engine_url=getattr(error, "engine_url", None),
             )
             raise
         choices = resp.get("choices") or [{}]
         message = choices[0].get("message") or {}
         tool_calls = message.get("tool_calls") or []
         content = message.get("content") or ""
-        has_inline_tool_call = isinstance(content, str) and "<tool_call>" in content
-        outcome = (
-            "tool_requests"
-            if tool_calls or has_inline_tool_call
-            else ("final_text" if content else "invalid")
-        )
+        outcome = _tool_reply_outcome(content, tool_calls)
         _finish_inference(
             emitter,
             trace,
@@ -448,6 +752,82 @@ class LLMService:
             outcome=outcome,
             raw_response=resp,
             reason="empty_model_response" if outcome == "invalid" else None,
+            engine_url=engine_url,
+        )
+        return message
+
+    def chat_with_tools_stream(
+        self,
+        messages: list,
+        tools: List[dict],
+        max_tokens: int = 1000,
+        tool_choice: str = "auto",
+        inference_name: str = "chat_with_tools",
+        trace_metadata: Optional[Dict[str, Any]] = None,
+        on_tool_call: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    ) -> dict:
+        """`chat_with_tools`, read as a stream.
+
+        Returns the same message dict, assembled from the deltas. On the way,
+        `on_tool_call(index, call)` is called with each tool call the moment its
+        arguments are complete, so the caller can start on it while the model
+        is still writing the next one. The callback runs on this thread and
+        should hand the work off rather than do it.
+
+        Never answered from the response cache: tool rounds sample, and a
+        stream has no single reply to store.
+        """
+        body: Dict[str, Any] = {
+            "messages": messages,
+            "tools": tools,
+            "tool_choice": tool_choice,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        body.update(self._sampling_kwargs())
+        body.update(self._lora_field())
+        emitter, trace = _begin_inference(
+            inference_name,
+            body,
+            trace_metadata,
+        )
+        reply = _StreamedToolReply(on_tool_call)
+        engine_url: Optional[str] = None
+        try:
+            with self._engine(body) as (engine_url, routed):
+                resp = _post(f"{engine_url}/v1/chat/completions", routed, stream=True)
+                with resp:
+                    for raw in resp:
+                        line = raw.decode("utf-8", "replace").strip()
+                        if not line.startswith("data:"):
+                            continue
+                        payload = line[len("data:"):].strip()
+                        if payload == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(payload)
+                        except json.JSONDecodeError:
+                            continue
+                        if isinstance(chunk, dict):
+                            reply.feed(chunk)
+            message = reply.finish()
+        except Exception as error:
+            _finish_inference(
+                emitter, trace, {}, outcome="invalid", error=str(error),
+                engine_url=engine_url,
+            )
+            raise
+        tool_calls = message.get("tool_calls") or []
+        content = message["content"]
+        outcome = _tool_reply_outcome(content, tool_calls)
+        _finish_inference(
+            emitter,
+            trace,
+            {"content": content, "tool_calls": tool_calls},
+            outcome=outcome,
+            raw_response=reply.last_chunk,
+            reason="empty_model_response" if outcome == "invalid" else None,
+            engine_url=engine_url,
         )
         return message
 
@@ -484,29 +864,32 @@ class LLMService:
         )
         parts: List[str] = []
         last_chunk: Dict[str, Any] = {}
+        engine_url: Optional[str] = None
         try:
-            resp = _post(f"{self.url}/v1/chat/completions", body, stream=True)
-            with resp:
-                for raw in resp:
-                    line = raw.decode("utf-8", "replace").strip()
-                    if not line.startswith("data:"):
-                        continue
-                    payload = line[len("data:"):].strip()
-                    if payload == "[DONE]":
-                        break
-                    try:
-                        chunk = json.loads(payload)
-                        last_chunk = chunk
-                        delta = (chunk.get("choices") or [{}])[0].get("delta") or {}
-                        piece = delta.get("content") or ""
-                    except (json.JSONDecodeError, IndexError, TypeError, AttributeError):
-                        piece = ""
-                    if piece:
-                        parts.append(piece)
-                        yield piece
+            with self._engine(body) as (engine_url, routed):
+                resp = _post(f"{engine_url}/v1/chat/completions", routed, stream=True)
+                with resp:
+                    for raw in resp:
+                        line = raw.decode("utf-8", "replace").strip()
+                        if not line.startswith("data:"):
+                            continue
+                        payload = line[len("data:"):].strip()
+                        if payload == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(payload)
+                            last_chunk = chunk
+                            delta = (chunk.get("choices") or [{}])[0].get("delta") or {}
+                            piece = delta.get("content") or ""
+                        except (json.JSONDecodeError, IndexError, TypeError, AttributeError):
+                            piece = ""
+                        if piece:
+                            parts.append(piece)
+                            yield piece
         except Exception as error:
             _finish_inference(
                 emitter, trace, "".join(parts), outcome="invalid", error=str(error),
+                engine_url=engine_url,
             )
             raise
         _finish_inference(
@@ -516,6 +899,7 @@ class LLMService:
             outcome="final_text" if parts else "invalid",
             raw_response=last_chunk,
             reason=None if parts else "empty_model_response",
+            engine_url=engine_url,
         )
 
 
@@ -554,6 +938,7 @@ def reset_cache() -> None:
     A client holds the engine URL and the id its adapter had in THAT server;
     both are meaningless once the server is replaced, and reusing them would
     send requests citing an adapter id that now belongs to another file — or to
-    nothing at all.
+    nothing at all. The kept-alive connections to the old server go too.
     """
     _llm_cache.clear()
+    http_pool.close_pools()
@@ -9,8 +9,8 @@ Two-stage pipeline:
 
 2. **LLM (Phi)**: a single Phi call (batched if many units) receives a compact
    `[idx] heading | preview` listing of each surviving unit and returns
-   `{"keep": [idx, ...]}`. The model only chooses what to discard; it can't
-   add or paraphrase.
+   `{"keep":[idx,...]}`. The model only chooses what to discard; it can't
+   add or paraphrase. Batches run concurrently (`lib.llm.relevance`).
 
 Fail-open: any parse error, empty result, or LLM unavailability returns the
 heuristic result (or, in the worst case, the original list). The function
@@ -18,7 +18,6 @@ must never return an empty list when given a non-empty input.
 """
 
 import logging
-import os
 import re
 from typing import Any, Dict, List
 
@@ -29,19 +28,14 @@ from agent.types import ModelSpec
 # `_heuristic_keep_indices` stays local because it calls
 # `_looks_auxiliary_heading`, which HAS diverged (the lib version strips the
 # markdown ATX marker before matching the auxiliary-heading regex).
+# The batched LLM pass (prompts included) is shared the same way.
 from lib.llm.relevance import (
     _heading_of,
-    _parse_keep_indices,
-    _preview_for_judgement,
+    _llm_keep_indices,
 )
-from lib.llm.prompts import load_prompt
 
 logger = logging.getLogger(__name__)
 
-_PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "prompt_templates")
-_RELEVANCE_SYSTEM_PROMPT = load_prompt(_PROMPTS_DIR, "relevance_system.md").strip()
-_RELEVANCE_FILTER_PROMPT = load_prompt(_PROMPTS_DIR, "relevance_filter.md")
-
 
 # Headings that are almost always auxiliary content, regardless of document type.
 # Allows an optional short identifier (e.g. "Appendix A", "Annex II") and an
@@ -96,7 +90,8 @@ def select_relevant_units(
 
     `cfg` is the task config dict (must contain `model` for the LLM step).
     Recognized keys: `relevance_filter_enabled` (default True),
-    `relevance_batch_size` (default 30), `relevance_max_tokens` (default 300).
+    `relevance_batch_size` (default 30), `relevance_max_tokens` (default 300),
+    `relevance_concurrency` (batches in flight, default the server's slots).
     """
     if not units:
         return units
@@ -122,53 +117,9 @@ def select_relevant_units(
         logger.warning("Relevance filter: LLM unavailable, using heuristic only (%s)", e)
         return [units[i] for i in heuristic_idx]
 
-    batch_size = int(cfg.get("relevance_batch_size", 30))
-    max_tokens = int(cfg.get("relevance_max_tokens", 300))
-
-    accepted: List[int] = []
-    any_batch_succeeded = False
-    for start in range(0, len(heuristic_idx), batch_size):
-        batch = heuristic_idx[start:start + batch_size]
-        listing = "\n".join(
-            f"[{i}] {_preview_for_judgement(units[i])}" for i in batch
-        )
-        instruction = _RELEVANCE_FILTER_PROMPT.format(task_label=task_label, listing=listing)
-        try:
-            raw = llm.chat(
-                [
-                    {"role": "system", "content": _RELEVANCE_SYSTEM_PROMPT},
-                    {"role": "user", "content": instruction},
-                ],
-                max_tokens=max_tokens,
-            )
-        except Exception as e:
-            logger.warning("Relevance filter: LLM batch failed, keeping batch (%s)", e)
-            accepted.extend(batch)
-            continue
-
-        parsed = _parse_keep_indices(raw, batch)
-        if parsed is None:
-            # Could not parse; keep the batch (fail-open per batch).
-            logger.warning("Relevance filter: unparseable LLM reply, keeping batch")
-            accepted.extend(batch)
-            continue
-        any_batch_succeeded = True
-        accepted.extend(parsed)
-
-    # Safety nets.
+    accepted = _llm_keep_indices(llm, units, heuristic_idx, cfg, task_label)
     if not accepted:
-        if any_batch_succeeded:
-            # Model explicitly rejected every unit across all batches. That's
-            # almost certainly wrong — fail-open to the heuristic result.
-            logger.warning("Relevance filter: LLM rejected all units; reverting to heuristic")
+        # Model explicitly rejected every unit across all batches. That's
+        # almost certainly wrong — fail-open to the heuristic result.
         return [units[i] for i in heuristic_idx]
-
-    # Preserve original order; dedupe in case overlapping batches ever occurred.
-    seen = set()
-    ordered = []
-    for i in sorted(set(accepted)):
-        if i in seen:
-            continue
-        seen.add(i)
-        ordered.append(units[i])
-    return ordered
+    return [units[i] for i in accepted]
@@ -221,10 +221,52 @@ def chunk_units(units, max_size, size_fn=None, max_words_fallback=None, joiner="
     return chunks
 
 
-def semantic_chunk_text(text_elements, target_words=None, max_words=None, overlap_words=None):
+def _fit_tokens(chunk, max_tokens, count_tokens):
+    """Split `chunk` until every piece is at most `max_tokens` tokens."""
+    tokens = count_tokens(chunk)
+    words = chunk.split()
+    if tokens <= max_tokens or len(words) <= 1:
+        return [chunk]
+    # Words per piece at this chunk's own words/token ratio, with some slack.
+    max_piece_words = max(1, int(len(words) * max_tokens / tokens * 0.95))
+    pieces = []
+    for piece in _recursive_split(chunk, max_piece_words):
+        pieces.extend(_fit_tokens(piece, max_tokens, count_tokens))
+    return pieces
+
+
+def _cap_tokens(chunks, max_tokens):
+    if not max_tokens:
+        return chunks
+    from lib.llm.text import count_tokens
+
+    return [piece for chunk in chunks for piece in _fit_tokens(chunk, max_tokens, count_tokens)]
+
+
+# Bump when `semantic_chunk_text` starts splitting the same text differently,
+# so that files ingested with the old splitting are ingested again.
+CHUNKER_VERSION = 1
+
+
+def chunker_version() -> str:
+    """`CHUNKER_VERSION` with the configured chunk sizes: what decides how
+    `semantic_chunk_text` splits a text by default."""
+    from lib.llm.config import get_rag_config
+    rag = get_rag_config()
+    sizes = (rag.get("chunk_target_words", 150), rag.get("chunk_max_words", 250),
+             rag.get("chunk_overlap_words", 30))
+    return f"semantic-{CHUNKER_VERSION}:" + "/".join(str(n) for n in sizes)
+
+
+def semantic_chunk_text(text_elements, target_words=None, max_words=None, overlap_words=None,
+                        max_tokens=None):
     """
     Chunk text using recursive splitting with overlap.
     Works well for both small and large texts.
+
+    `max_tokens` additionally caps every chunk at that many tokens of the
+    served LLM (`lib.llm.text.count_tokens`), for callers that send the chunks
+    to it: word counts say little about dense or non-English text.
     """
     if target_words is None or max_words is None or overlap_words is None:
         from lib.llm.config import get_rag_config
@@ -248,7 +290,7 @@ def semantic_chunk_text(text_elements, target_words=None, max_words=None, overla
 
     # Small text: return as single chunk
     if total_words <= max_words:
-        return [full_text]
+        return _cap_tokens([full_text], max_tokens)
 
     # Recursively split into semantic segments
     segments = _recursive_split(full_text, max_words)
@@ -280,4 +322,4 @@ def semantic_chunk_text(text_elements, target_words=None, max_words=None, overla
     if current_words:
         chunks.append(" ".join(current_words))
 
-    return chunks
\ No newline at end of file
+    return _cap_tokens(chunks, max_tokens)
\ No newline at end of file
@@ -19,9 +19,11 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # proportion to how long each download really takes. The GGUF LLM dwarfs the rest.
 STEP_WEIGHTS = {
     "embeddings": 0.15,
+    "embeddings-onnx": 0.3,
     "summarization": 1.0,
     "whisper": 0.5,
     "llm": 5.7,
+    "llm-draft": 0.6,
 }
 
 
@@ -41,6 +43,19 @@ def load_tasks():
         return json.load(f)
 
 
+def load_config_section(section):
+    """`section` of config/config.json, over the shipped defaults."""
+    defaults = {}
+    for path in (
+        os.path.join(SCRIPT_DIR, "common", "config.default.json"),
+        os.path.join(SCRIPT_DIR, "config", "config.json"),
+    ):
+        if os.path.exists(path):
+            with open(path) as f:
+                defaults.update(json.load(f).get(section) or {})
+    return defaults
+
+
 def progress(component, percent):
     print(f"PROGRESS:{component}:{percent}", flush=True)
 
@@ -55,6 +70,9 @@ def setup():
     if embedding_task.get("enabled", False):
         model = embedding_task.get("model", "intfloat/multilingual-e5-small")
         steps.append(("embeddings", model, download_embedding))
+        # Its int8 ONNX graph, for workers running embeddings on ONNX Runtime.
+        if load_config_section("embedding_defaults").get("backend") == "onnx-int8":
+            steps.append(("embeddings-onnx", model, export_embedding_onnx))
 
     # Summarization model — only seq2seq HF repos here; GGUF/LLM summarizers are
     # handled by the GGUF step below (download_seq2seq would treat the .gguf
@@ -84,6 +102,16 @@ def setup():
                 steps.append(("llm", model, download_gguf))
                 break  # Only need to download once
 
+    # Draft model for the engine's speculative decoding — optional, only when
+    # llm_defaults.draft names one.
+    draft = load_config_section("llm_defaults").get("draft") or {}
+    if draft.get("model", "").endswith(".gguf") and not os.path.isabs(draft["model"]):
+        repo_id = draft.get("repo_id") or "Qwen/Qwen3-0.6B-GGUF"
+        steps.append((
+            "llm-draft", draft["model"],
+            lambda model, report, _repo=repo_id: download_gguf(model, report, repo_id=_repo),
+        ))
+
     # LoRA adapters are placed manually; warn if configured but missing
     check_lora_files(tasks)
 
@@ -120,6 +148,45 @@ def download_embedding(model_name, report=None):
     SentenceTransformer(model_name)
 
 
+def export_embedding_onnx(model_name, report=None):
+    """Export the embedding transformer to ONNX with dynamically quantized int8
+    weights, into the directory `services.embedding_service.onnx_model_dir`
+    reads. Pooling stays outside the graph; an existing export is kept."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    out = os.path.join(_model_dir(), "onnx", model_name.replace("/", "--"))
+    target = os.path.join(out, "model.int8.onnx")
+    if os.path.exists(target):
+        print(f"ONNX export already present: {target}", flush=True)
+        return
+    os.makedirs(out, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["query: hello", "passage: a longer sample text"], padding=True, return_tensors="pt")
+    full = os.path.join(out, "model.onnx")
+    axes = {0: "batch", 1: "tokens"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (sample["input_ids"], sample["attention_mask"]), full,
+            input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": axes, "attention_mask": axes, "last_hidden_state": axes},
+            opset_version=17, dynamo=False,
+        )
+    if report:
+        report(60)
+    quantize_dynamic(full, target, weight_type=QuantType.QInt8)
+    os.remove(full)
+    tokenizer.save_pretrained(out)
+    with open(os.path.join(out, "embedding.json"), "w") as f:
+        json.dump({
+            "model": model_name,
+            "pad_id": tokenizer.pad_token_id,
+            "pad_token": tokenizer.pad_token,
+            "max_length": min(int(tokenizer.model_max_length), 512),
+            "dimension": int(model.config.hidden_size),
+        }, f, indent=2)
 
 
 def download_seq2seq(model_name, report=None):
@@ -163,14 +230,13 @@ def _dir_size(path):
     return total
 
 
-def download_gguf(model_filename, report=None):
+def download_gguf(model_filename, report=None, repo_id="Qwen/Qwen3-8B-GGUF"):
     """Download GGUF model from HuggingFace Hub.
 
     This is by far the longest step (~5.7 GB), so a background thread watches the
     download dir growing against the known file size and reports sub-progress —
     otherwise the bar would sit frozen here for minutes.
     """
-    repo_id = "Qwen/Qwen3-8B-GGUF"
 
     try:
         from huggingface_hub import hf_hub_download
@@ -18,7 +18,8 @@ Every task must follow this structure:
    - model: str           -- model name or path (optional)
    - ...additional task-specific parameters
 
-4. Registration: import the module in utils/process_execution.py
+4. Registration: run `python -m utils.task_manifest` to add the type to
+   common/task_manifest.json (the module is imported on first dispatch)
 
 Users can override task behavior via:
 - config/tasks/<task-type>/prompt.md   -- custom prompt
@@ -38,10 +38,10 @@ from lib.llm.config import get_llm_params, get_task_config
 from lib.llm.grammars import DATE_RESOLUTION_GBNF, STRING_ARRAY_GBNF
 from lib.llm.map_reduce import MapReduceSpec, run_map_reduce
 from lib.llm.prompts import get_prompt
+from lib.llm.text import pack_units
 from services.llm_service import get_llm_service
 from services.relevance import select_relevant_units
 from services.text import (
-    chunk_units,
     extract_section_units,
     html_to_markdown,
     strip_dense_blobs,
@@ -632,7 +632,9 @@ def _chunks(payload: Dict[str, Any], cfg: Dict[str, Any], is_child: bool) -> Lis
             units, cfg, task_label="date extraction", target_lang="en",
         ) or units
 
-    return chunk_units(units, int(cfg.get("chunk_word_budget", 1500)), joiner="\n\n")
+    return pack_units(
+        units, int(cfg.get("chunk_word_budget", 1500)), cfg.get("chunk_token_budget"),
+    )
 
 
 def _leaf(chunk: str, payload: Dict[str, Any], cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -7,13 +7,13 @@ service and pgvector infrastructure underneath.
 """
 
 import logging
-import uuid
 from typing import List
 
-from services.text import semantic_chunk_text
+from services.text import chunker_version, semantic_chunk_text
 from common.execution_registry import execution_handler
-from database.rag import get_folder_rag, PointStruct
-from services.embedding_service import get_embedding_service
+from database import ingest_manifest
+from database.rag import chunk_ids, get_folder_rag, PointStruct
+from services.embedding_service import embedding_model_id, get_embedding_service
 
 logger = logging.getLogger(__name__)
 
@@ -30,8 +30,10 @@ def _owner_tag(owner_type: str, owner_id: int) -> str:
 @execution_handler("indexed-file-ingest")
 def ingest_indexed_file(payload: dict) -> dict:
     """Vectorize the extracted text of an IndexedFile and upsert into the
-    folder collection. Idempotent: deletes prior points for this `source_id`
-    before upserting.
+    folder collection. Idempotent: the file's chunks are diffed against its
+    stored ones, so only new chunks are embedded and vanished ones deleted.
+    A file whose checksum, chunker and embedding model match its ingest
+    manifest (`database.ingest_manifest`) is not chunked at all.
 
     Payload keys:
         - indexedFileId (int): IndexedFile id.
@@ -41,6 +43,7 @@ def ingest_indexed_file(payload: dict) -> dict:
         - filename (str): filename relative to the working folder.
         - checksum (str): content checksum, echoed back so the backend can
           ignore stale results if the file changed again in the meantime.
+        - force (bool, optional): ingest even if the checksum is unchanged.
     """
     indexed_file_id = int(payload["indexedFileId"])
     owner_type = str(payload.get("ownerType") or "main-assistant")
@@ -51,27 +54,33 @@ def ingest_indexed_file(payload: dict) -> dict:
 
     rag = get_folder_rag()
     source_id = _source_id(indexed_file_id)
+    owner_tag = _owner_tag(owner_type, owner_id)
+    version = chunker_version()
+
+    if not payload.get("force"):
+        stored = ingest_manifest.current_chunks(
+            indexed_file_id, checksum, version, embedding_model_id(), filename, owner_tag,
+        )
+        if stored is not None:
+            logger.info("Indexed file %s unchanged (%s); skipped", indexed_file_id, checksum)
+            return {
+                "success": True,
+                "indexedFileId": indexed_file_id,
+                "sourceId": source_id,
+                "chunks": stored,
+                "checksum": checksum,
+                "skipped": True,
+            }
 
-    rag.delete_by_column("indexed_file_id", indexed_file_id)
-
-    if not content:
-        return {
-            "success": True,
-            "indexedFileId": indexed_file_id,
-            "sourceId": source_id,
-            "chunks": 0,
-            "checksum": checksum,
-        }
-
-    chunks = semantic_chunk_text(content)
-    embeddings = get_embedding_service().encode(chunks, normalize_embeddings=True)
+    # The whole text is one element: iterating the string itself would make
+    # every character a paragraph of its own.
+    chunks = semantic_chunk_text([content]) if content else []
 
-    owner_tag = _owner_tag(owner_type, owner_id)
     points: List[PointStruct] = []
-    for i, (chunk, embedding) in enumerate(zip(chunks, embeddings), 1):
+    for i, (chunk, point_id) in enumerate(zip(chunks, chunk_ids(source_id, chunks)), 1):
         points.append(PointStruct(
-            id=str(uuid.uuid4()),
-            vector=embedding.tolist(),
+            id=point_id,
+            vector=[],
             payload={
                 "text": chunk,
                 "source_id": source_id,
@@ -86,8 +95,17 @@ def ingest_indexed_file(payload: dict) -> dict:
             },
         ))
 
-    if points:
-        rag.upsert_points(points)
+    counts = rag.sync_source(
+        "indexed_file_id", indexed_file_id, points,
+        lambda texts: get_embedding_service().encode(texts, normalize_embeddings=True),
+    )
+    if counts is None:
+        # Not recorded: the next rescan has to ingest the file again.
+        raise RuntimeError(f"Could not store the chunks of indexed file {indexed_file_id}")
+    logger.info("Indexed file %s: %s", indexed_file_id, counts)
+    ingest_manifest.record(
+        indexed_file_id, checksum, version, embedding_model_id(), filename, owner_tag, len(points),
+    )
 
     return {
         "success": True,
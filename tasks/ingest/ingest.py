@@ -1,15 +1,19 @@
-import uuid
+import logging
+
 from services.text import semantic_chunk_text, clean_html_text
 from common.execution_registry import execution_handler
-from database.rag import get_rag, PointStruct
+from database.rag import chunk_ids, get_rag, PointStruct
 from services.embedding_service import get_embedding_service
 
+logger = logging.getLogger(__name__)
+
 
 @execution_handler("ingest-content")
 def ingest(payload) -> dict:
     """
     Ingests content for a resource or doc into the vector database.
-    Deletes old vectors before upserting new ones to keep data in sync.
+    Re-ingesting a source diffs its chunks against the stored ones: only new
+    chunks are embedded and inserted, vanished ones are deleted.
 
     Payload keys:
         - content (str): HTML content to ingest
@@ -31,24 +35,16 @@ def ingest(payload) -> dict:
 
     project_id = str(payload["projectId"]) if payload.get("projectId") else None
 
-    # Always delete old vectors for this source before re-ingesting
-    database.delete_by_column("source_id", source_id)
-
     clean_content = clean_html_text(payload["content"])
-
-    if not clean_content:
-        return {"success": True}
-
-    chunks = semantic_chunk_text(clean_content)
-    chunk_embeddings = embedding_service.encode(chunks, normalize_embeddings=True)
+    chunks = semantic_chunk_text(clean_content) if clean_content else []
 
     total_chunks = len(chunks)
     points = []
-    for i, (chunk, embedding) in enumerate(zip(chunks, chunk_embeddings), 1):
+    for i, (chunk, point_id) in enumerate(zip(chunks, chunk_ids(source_id, chunks)), 1):
         points.append(
             PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding.tolist(),
+                id=point_id,
+                vector=[],
                 payload={
                     "text": chunk,
                     "source_id": source_id,
@@ -60,8 +56,14 @@ def ingest(payload) -> dict:
             )
         )
 
-    if points:
-        database.upsert_points(points=points)
+    # An empty content leaves no points, which removes the source's rows.
+    counts = database.sync_source(
+        "source_id", source_id, points,
+        lambda texts: embedding_service.encode(texts, normalize_embeddings=True),
+    )
+    if counts is None:
+        raise RuntimeError(f"Could not store the chunks of {source_id}")
+    logger.info("Ingested %s: %s", source_id, counts)
 
     return {"success": True}
 
@@ -28,10 +28,9 @@ from services.llm_service import get_llm_service
 from lib.llm.config import get_llm_params, get_task_config
 from lib.llm.map_reduce import MapReduceSpec, run_map_reduce
 from lib.llm.prompts import get_prompt
-from lib.llm.text import truncate_for_llm
+from lib.llm.text import pack_units, truncate_for_llm
 from services.relevance import select_relevant_units
 from services.text import (
-    chunk_units,
     extract_section_units,
     html_to_markdown,
     normalize_text,
@@ -52,6 +51,7 @@ def _build_chunks(
     chunk_word_budget: int,
     *,
     units_filter=None,
+    chunk_token_budget=None,
 ) -> List[str]:
     cleaned = strip_dense_blobs(html_to_markdown(content or ""))
     units = extract_section_units(cleaned)
@@ -59,7 +59,7 @@ def _build_chunks(
         return []
     if units_filter is not None:
         units = units_filter(units) or units
-    return chunk_units(units, chunk_word_budget, joiner="\n\n")
+    return pack_units(units, chunk_word_budget, chunk_token_budget)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -337,7 +337,8 @@ def _chunks(payload: Dict[str, Any], cfg: Dict[str, Any], is_child: bool) -> Lis
             us, cfg, task_label="key-point extraction", target_lang=target_lang,
         )
     return _build_chunks(
-        raw_content, int(cfg.get("chunk_word_budget", 1500)), units_filter=units_filter
+        raw_content, int(cfg.get("chunk_word_budget", 1500)), units_filter=units_filter,
+        chunk_token_budget=cfg.get("chunk_token_budget"),
     )
 
 
@@ -25,6 +25,7 @@ from typing import Any, Dict, List, Optional, Set
 from lib.llm.grammars import RELATIONSHIPS_GBNF
 from services.llm_service import get_llm_service
 from lib.llm.config import get_llm_params, get_task_config
+from lib.llm.map_reduce import enqueue_children
 from lib.llm.prompts import get_prompt
 from lib.llm.text import truncate_for_llm
 from services.relevance import select_relevant_units
@@ -278,6 +279,7 @@ def _phase_plan_or_leaf(payload: Dict[str, Any], cfg: Dict[str, Any], ctx) -> Di
         target_words=chunk_words,
         max_words=max_words_per_chunk,
         overlap_words=chunk_overlap,
+        max_tokens=cfg.get("chunk_token_budget"),
     )
     if not chunks:
         return _final_result([], resource_id)
@@ -304,28 +306,27 @@ def _phase_plan_or_leaf(payload: Dict[str, Any], cfg: Dict[str, Any], ctx) -> Di
         return _final_result(deduped, resource_id, error=err)
 
     # FAN-OUT: one child per chunk.
-    pending: Dict[str, int] = {}
-    results: Dict[str, Optional[Dict[str, Any]]] = {}
-    retries: Dict[str, int] = {}
-    for i, chunk in enumerate(chunks):
-        child_payload = {
-            "text": chunk,
-            "entities": entities,
-            "resource_id": resource_id,
-            "project_id": project_id,
-            "_chunk_idx": i,
-        }
-        child_id = ctx.db.enqueue_child_execution(
-            ctx.execution_id,
-            "relationship-extraction",
-            payload=child_payload,
-            agent_max_steps=1,
-        )
-        if child_id is None:
-            return {"error": f"failed to enqueue child for chunk {i}"}
-        pending[str(child_id)] = i
-        results[str(i)] = None
-        retries[str(i)] = 0
+    child_ids = enqueue_children(
+        ctx.db,
+        ctx.execution_id,
+        "relationship-extraction",
+        [
+            {
+                "text": chunk,
+                "entities": entities,
+                "resource_id": resource_id,
+                "project_id": project_id,
+                "_chunk_idx": i,
+            }
+            for i, chunk in enumerate(chunks)
+        ],
+        agent_max_steps=1,
+    )
+    if child_ids is None:
+        return {"error": f"failed to enqueue {len(chunks)} children"}
+    pending: Dict[str, int] = {str(child_id): i for i, child_id in enumerate(child_ids)}
+    results: Dict[str, Optional[Dict[str, Any]]] = {str(i): None for i in range(len(chunks))}
+    retries: Dict[str, int] = {str(i): 0 for i in range(len(chunks))}
 
     state = {
         "phase": "merging",
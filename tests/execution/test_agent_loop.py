@@ -1,11 +1,13 @@
 import copy
 import json
 import os
+import threading
 import unittest
 from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch
 
-from agents.loop import run_agent_loop
+from agents.loop import _ReadOnlyPrefetch, run_agent_loop
 from lib.execution import (
     InferenceBudgetDenied,
     ToolBudgetDenied,
@@ -13,7 +15,7 @@ from lib.execution import (
     ToolLoopGuardTerminated,
 )
 from lib.framework.agent import AgentRunResult, AgentSpec
-from lib.framework.tool import ToolContext
+from lib.framework.tool import Tool, ToolContext
 from lib.execution.emitter import ExecutionEmitter
 from tests.execution.support import RecordingIngestClient
 from tests.execution.test_emitter import CONTEXT
@@ -1081,5 +1083,137 @@ class AgentLoopResultTest(unittest.TestCase):
         self.assertEqual(result, {"summary": "done"})
 
 
+class StreamingLlm(FakeLlm):
+    """Streams each reply's tool calls to `on_tool_call`, then holds the reply
+    open until the tool has started (or a timeout), as a slow model would."""
+
+    def __init__(self, messages, started):
+        super().__init__(messages)
+        self.started = started
+        self.started_during_stream = []
+
+    def chat_with_tools_stream(self, *_args, on_tool_call=None, **_kwargs):
+        message = self.messages.pop(0)
+        for index, call in enumerate(message.get("tool_calls") or []):
+            on_tool_call(index, call)
+        if message.get("tool_calls"):
+            self.started_during_stream.append(self.started.wait(timeout=1))
+        return message
+
+
+class StreamedToolCallTest(unittest.TestCase):
+    def run_loop(self, read_only, calls=(("read_fixture", '{"query":"item"}'),),
+                 release=None, timeout_s=30.0, **cfg):
+        started = threading.Event()
+        dispatched = []
+
+        def dispatch(name, arguments, _ctx):
+            dispatched.append((name, arguments))
+            started.set()
+            if release is not None:
+                release.wait(5)
+            return {"value": "fixture"}
+
+        llm = StreamingLlm([
+            {
+                "content": "",
+                "tool_calls": [
+                    {"id": f"call-{index}", "function": {"name": name, "arguments": arguments}}
+                    for index, (name, arguments) in enumerate(calls, 1)
+                ],
+            },
+            {"content": "answer from fixture", "tool_calls": []},
+        ], started)
+        schema = {"type": "function", "function": {"name": "read_fixture"}}
+        write_schema = {"type": "function", "function": {"name": "write_fixture"}}
+        spec = AgentSpec(
+            name="test-agent",
+            config_key="test-agent",
+            system_prompt="test",
+            tool_names=frozenset({"read_fixture", "write_fixture"}),
+        )
+        with patch.dict(
+            "agents.loop.REGISTRY",
+            {
+                "read_fixture": Tool(schema=schema, execute=None, read_only=read_only,
+                                     timeout_s=timeout_s),
+                "write_fixture": Tool(schema=write_schema, execute=None),
+            },
+        ), patch(
+            "agents.loop.get_task_config",
+            return_value={"max_rounds": 3, "max_tokens": 32, **cfg},
+        ), patch("agents.loop.get_llm_params", return_value={}), patch(
+            "agents.loop.get_llm_service", return_value=llm
+        ):
+            self.messages = [{"role": "user", "content": "question"}]
+            result = run_agent_loop(spec, self.messages, ToolContext(), [schema, write_schema],
+                                    dispatch)
+        return result, llm, dispatched
+
+    def test_read_only_tool_starts_before_the_reply_ends(self):
+        result, llm, dispatched = self.run_loop(read_only=True)
+
+        self.assertEqual(result, AgentRunResult.final_text("answer from fixture"))
+        self.assertEqual(llm.started_during_stream, [True])
+        self.assertEqual(dispatched, [("read_fixture", '{"query":"item"}')])
+        self.assertEqual(llm.tool_calls, [])
+
+    def test_other_tools_wait_for_the_whole_reply(self):
+        result, llm, dispatched = self.run_loop(read_only=False)
+
+        self.assertEqual(result, AgentRunResult.final_text("answer from fixture"))
+        self.assertEqual(llm.started_during_stream, [False])
+        self.assertEqual(dispatched, [("read_fixture", '{"query":"item"}')])
+
+    def test_a_read_after_a_write_in_the_same_reply_waits_for_the_write(self):
+        calls = (("write_fixture", '{"value":"new"}'), ("read_fixture", '{"query":"item"}'))
+        result, llm, dispatched = self.run_loop(read_only=True, calls=calls)
+
+        self.assertEqual(result, AgentRunResult.final_text("answer from fixture"))
+        self.assertEqual(llm.started_during_stream, [False])
+        self.assertEqual(dispatched, list(calls))
+
+    def test_a_prefetched_read_that_hangs_is_answered_with_an_error(self):
+        release = threading.Event()
+        try:
+            result, llm, dispatched = self.run_loop(read_only=True, release=release, timeout_s=0.05)
+        finally:
+            release.set()
+
+        self.assertEqual(result, AgentRunResult.final_text("answer from fixture"))
+        self.assertEqual(dispatched, [("read_fixture", '{"query":"item"}')])
+        tool_turn = next(m for m in self.messages if m["role"] == "tool")
+        self.assertIn("did not answer within 0.05s", tool_turn["content"])
+
+    def test_prefetches_nobody_took_are_cancelled(self):
+        release = threading.Event()
+        schema = {"type": "function", "function": {"name": "read_fixture"}}
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown, wait=False, cancel_futures=True)
+        self.addCleanup(release.set)
+        prefetch = _ReadOnlyPrefetch(lambda *_: release.wait(5), ToolContext(), [schema], executor)
+        with patch.dict("agents.loop.REGISTRY", {
+            "read_fixture": Tool(schema=schema, execute=None, read_only=True),
+        }):
+            for index, query in enumerate(("a", "b")):
+                prefetch.on_tool_call(index, {"function": {
+                    "name": "read_fixture", "arguments": json.dumps({"query": query}),
+                }})
+        queued = prefetch._futures[("read_fixture", '{"query": "b"}')]
+
+        prefetch.discard()
+
+        self.assertTrue(queued.cancelled())
+        self.assertIsNone(prefetch.take("read_fixture", '{"query": "a"}'))
+
+    def test_streaming_can_be_turned_off(self):
+        result, llm, dispatched = self.run_loop(read_only=True, stream_tool_calls=False)
+
+        self.assertEqual(result, AgentRunResult.final_text("answer from fixture"))
+        self.assertEqual(llm.started_during_stream, [])
+        self.assertEqual(len(llm.tool_calls), 2)
+        self.assertEqual(len(dispatched), 1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from lib.llm import config
+
+
+class WatchedConfigTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.override = self.root / "tasks" / "summarize" / "config.json"
+        self.override.parent.mkdir(parents=True)
+        self.deployments = self.root / "deployments.json"
+        for patcher in (
+            patch.object(config, "_CONFIG_DIR", str(self.root)),
+            patch.dict(os.environ, {"MODELS_DEPLOYMENTS_PATH": str(self.deployments)}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(config._watched.clear)
+
+    def write(self, path, value, mtime):
+        path.write_text(json.dumps(value), encoding="utf-8")
+        os.utime(path, ns=(mtime, mtime))
+
+    def test_unchanged_files_are_parsed_once_and_rewrites_are_picked_up(self):
+        self.write(self.override, {"max_tokens": 11}, 1_000_000_000)
+        self.write(self.deployments, {"tasks": {"summarize": {"path": "/a.gguf"}}}, 1_000_000_000)
+        config.get_tasks()
+
+        with patch.object(config.json, "load", wraps=json.load) as load:
+            first = config.get_task_config("summarize")
+            second = config.get_task_config("summarize")
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual((first["max_tokens"], first["lora_path"]), (11, "/a.gguf"))
+        self.assertEqual(first, second)
+
+        self.write(self.override, {"max_tokens": 22}, 2_000_000_000)
+        self.deployments.unlink()
+        refreshed = config.get_task_config("summarize")
+        self.assertEqual(refreshed["max_tokens"], 22)
+        self.assertNotIn("lora_path", refreshed)
+
+    def test_reload_config_drops_the_cache(self):
+        self.write(self.override, {"max_tokens": 11}, 1_000_000_000)
+        config.get_task_config("summarize")
+
+        with patch.object(config, "_load_config"), patch.object(config, "_load_tasks", return_value={}):
+            config.reload_config()
+            with patch.object(config.json, "load", wraps=json.load) as load:
+                self.assertEqual(config.get_task_config("summarize")["max_tokens"], 11)
+        self.assertEqual(load.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import patch
+from contextlib import contextmanager, nullcontext
 
 from database.execution import Execution
 
@@ -18,7 +18,7 @@ class _Cursor:
     def __exit__(self, *_args):
         return False
 
-    def execute(self, query, params):
+    def execute(self, query, params=None):
         self.query = query
         self.params = params
         self.queries.append((query, params))
@@ -51,14 +51,17 @@ class _Connection:
         self.last_cursor = _Cursor()
         return self.last_cursor
 
-    def commit(self):
-        pass
+    def transaction(self):
+        return nullcontext()
 
-    def rollback(self):
-        pass
 
-    def close(self):
-        pass
+class _Pool:
+    def __init__(self, connection):
+        self._connection = connection
+
+    @contextmanager
+    def connection(self):
+        yield self._connection
 
 
 class ExecutionFencingTests(unittest.TestCase):
@@ -66,16 +69,15 @@ class ExecutionFencingTests(unittest.TestCase):
         self.connection = _Connection()
         self.database = Execution.__new__(Execution)
         self.database.table = "executions"
-        self.database.conn = self.connection
+        self.database.pool = _Pool(self.connection)
         self.database.connection_args = {}
 
     def test_worker_status_update_is_fenced_by_attempt(self):
-        with patch("database.execution.psycopg.connect", return_value=self.connection):
-            updated = self.database.update_execution_status(
-                "execution-id",
-                "waiting",
-                attempt_id="attempt-id",
-            )
+        updated = self.database.update_execution_status(
+            "execution-id",
+            "waiting",
+            attempt_id="attempt-id",
+        )
 
         self.assertTrue(updated)
         cursor = self.connection.last_cursor
@@ -0,0 +1,248 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from database import embedding_cache
+from services.embedding_service import EmbeddingService, _MicroBatcher, _OnnxEncoder
+
+
+class _Model:
+    """Encodes a text as [len, first char code, 1.0] and records what it saw."""
+
+    def __init__(self):
+        self.seen = []
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.seen.append(list(texts))
+        return np.array([[len(t), ord(t[0]), 1.0] for t in texts], dtype=np.float32)
+
+
+class EmbeddingCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.stored = {}
+        self.model = _Model()
+        self.service = EmbeddingService.__new__(EmbeddingService)
+        self.service.model_name = "e5-test"
+        self.service.model = self.model
+        for target, value in (
+            ("database.embedding_cache.lookup_many",
+             lambda keys: {k: self.stored[k] for k in keys if k in self.stored}),
+            ("database.embedding_cache.store_many",
+             lambda vectors, _max: self.stored.update(vectors)),
+            ("services.embedding_service.get_task_config", lambda _name: {}),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_only_unseen_texts_reach_the_model(self):
+        first = self.service.encode(["alpha", "beta"])
+        second = self.service.encode(["beta", "gamma", "gamma", "alpha"])
+
+        self.assertEqual(self.model.seen, [["passage: alpha", "passage: beta"], ["passage: gamma"]])
+        np.testing.assert_array_equal(second[0], first[1])
+        np.testing.assert_array_equal(second[3], first[0])
+        self.assertEqual(second.shape, (4, 3))
+        self.assertEqual(second.dtype, np.float32)
+
+    def test_queries_and_passages_are_cached_apart(self):
+        self.service.encode_query("alpha")
+        self.service.encode_query("alpha")
+        self.service.encode_single("alpha")
+
+        self.assertEqual(self.model.seen, [["query: alpha"], ["passage: alpha"]])
+
+    def test_a_disabled_cache_encodes_everything(self):
+        with mock.patch(
+            "services.embedding_service.get_task_config",
+            return_value={"cache": {"enabled": False}},
+        ):
+            self.service.encode(["alpha"])
+            self.service.encode(["alpha"])
+
+        self.assertEqual(len(self.model.seen), 2)
+        self.assertEqual(self.stored, {})
+
+    def test_the_key_covers_model_prefix_and_normalization(self):
+        key = embedding_cache.cache_key("m", "passage", "text", True)
+
+        for variant in (
+            embedding_cache.cache_key("n", "passage", "text", True),
+            embedding_cache.cache_key("m", "query", "text", True),
+            embedding_cache.cache_key("m", "passage", "text", False),
+            embedding_cache.cache_key("m", "passage", "text ", True),
+        ):
+            self.assertNotEqual(variant, key)
+
+    def test_each_backend_keeps_its_own_entries(self):
+        self.service.encode(["alpha"])
+        self.service.backend = "onnx-int8"
+        self.service.encode(["alpha"])
+
+        self.assertEqual(len(self.model.seen), 2)
+        self.assertEqual(len(self.stored), 2)
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        return False
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def executemany(self, query, params):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+class _Connection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        return False
+
+    def cursor(self):
+        return self._cursor
+
+
+class EmbeddingCacheTableTests(unittest.TestCase):
+    def use_rows(self, rows):
+        cursor = _Cursor(rows)
+        patcher = mock.patch("database.embedding_cache._connection",
+                             return_value=_Connection(cursor))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        embedding_cache.reset()
+        embedding_cache._ready = True
+        self.addCleanup(embedding_cache.reset)
+        return cursor
+
+    def test_a_lookup_of_fresh_rows_only_reads(self):
+        cursor = self.use_rows([{"key": "k1", "vector": b"\x01", "stale": False}])
+
+        found = embedding_cache.lookup_many(["k1", "k2"])
+
+        self.assertEqual(found, {"k1": b"\x01"})
+        self.assertEqual(len(cursor.queries), 1)
+        self.assertTrue(cursor.queries[0][0].startswith("SELECT"))
+
+    def test_a_lookup_refreshes_only_the_stale_rows(self):
+        cursor = self.use_rows([
+            {"key": "k2", "vector": b"\x02", "stale": True},
+            {"key": "k1", "vector": b"\x01", "stale": False},
+        ])
+
+        embedding_cache.lookup_many(["k2", "k1"])
+
+        update, params = cursor.queries[1]
+        self.assertTrue(update.startswith("UPDATE embedding_cache SET last_used_at"))
+        self.assertEqual(params[0], ["k2"])
+
+    def test_stores_are_written_in_key_order(self):
+        cursor = self.use_rows([])
+
+        embedding_cache.store_many({"k3": b"c", "k1": b"a", "k2": b"b"})
+
+        self.assertEqual([key for key, _ in cursor.queries[0][1]], ["k1", "k2", "k3"])
+
+
+class OnnxEncoderTests(unittest.TestCase):
+    def setUp(self):
+        class Encoding:
+            def __init__(self, ids, mask):
+                self.ids, self.attention_mask = ids, mask
+
+        self.encoder = _OnnxEncoder.__new__(_OnnxEncoder)
+        self.encoder.dimension = 2
+        self.encoder._inputs = {"input_ids", "attention_mask"}
+        self.encoder._tokenizer = mock.Mock()
+        self.encoder._tokenizer.encode_batch.return_value = [
+            Encoding([5, 6, 1], [1, 1, 0]), Encoding([7, 8, 9], [1, 1, 1]),
+        ]
+        hidden = np.array([
+            [[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]],
+            [[0.0, 3.0], [0.0, 3.0], [0.0, 6.0]],
+        ], dtype=np.float32)
+        self.encoder._session = mock.Mock()
+        self.encoder._session.run.return_value = [hidden]
+
+    def test_token_vectors_are_mean_pooled_over_the_mask(self):
+        rows = self.encoder.encode(["a b", "c d e"], normalize_embeddings=False)
+
+        np.testing.assert_allclose(rows, [[2.0, 0.0], [0.0, 4.0]])
+        feed = self.encoder._session.run.call_args[0][1]
+        self.assertEqual(sorted(feed), ["attention_mask", "input_ids"])
+
+    def test_normalized_rows_have_unit_length(self):
+        rows = self.encoder.encode(["a b", "c d e"])
+
+        np.testing.assert_allclose(np.linalg.norm(rows, axis=1), [1.0, 1.0], rtol=1e-6)
+        self.assertEqual(rows.dtype, np.float32)
+
+
+class MicroBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.model = _Model()
+        encode = self.model.encode
+
+        def slow_encode(texts, normalize_embeddings=True):
+            time.sleep(0.05)
+            return encode(texts, normalize_embeddings)
+
+        self.model.encode = slow_encode
+
+    def test_concurrent_callers_share_forward_passes(self):
+        batcher = _MicroBatcher(self.model, window_s=0.01, max_texts=64)
+        texts = [f"{chr(97 + i)}" * (i + 1) for i in range(8)]
+        results = {}
+
+        def call(text):
+            results[text] = batcher.encode([text], True)
+
+        threads = [threading.Thread(target=call, args=(t,)) for t in texts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLess(batcher.passes, 4)
+        for text in texts:
+            np.testing.assert_array_equal(results[text], [[len(text), ord(text[0]), 1.0]])
+
+    def test_a_failed_pass_reaches_every_caller_in_it(self):
+        def broken(_texts, normalize_embeddings=True):
+            raise RuntimeError("out of memory")
+
+        self.model.encode = broken
+        batcher = _MicroBatcher(self.model, window_s=0.0, max_texts=64)
+
+        with self.assertRaisesRegex(RuntimeError, "out of memory"):
+            batcher.encode(["x"], True)
+
+    def test_large_requests_run_on_the_callers_thread(self):
+        batcher = _MicroBatcher(self.model, window_s=0.0, max_texts=2)
+
+        rows = batcher.encode(["ab", "c"], True)
+
+        self.assertEqual(rows.shape, (2, 3))
+        self.assertIsNone(batcher._thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1012,6 +1012,28 @@ class ExecutionEmitterTest(unittest.TestCase):
         self.assertEqual(emitter.artifact_bytes, len("reply"))
         self.assertIn("artifact_batch", emitter.summary()["errors"])
 
+    def test_engine_timings_split_out_the_time_spent_queueing(self):
+        client = RecordingIngestClient()
+        emitter = self.emitter(client)
+
+        handle = emitter.start_operation("inference", "chat")
+        emitter.finish_operation(
+            handle,
+            status="succeeded",
+            result={},
+            error=None,
+            outcome="final_text",
+            metrics={"promptEvalMs": 0, "generationMs": 0, "engineSlotsBusy": 2,
+                     "engineKvCacheUsagePercent": -1, "unrelated": 5},
+        )
+        emitter.flush()
+
+        metrics = client.sent_events[-1]["payload"]["metrics"]
+        self.assertEqual(metrics["engineSlotsBusy"], 2)
+        self.assertEqual(metrics["queueMs"], metrics["durationMs"])
+        self.assertNotIn("engineKvCacheUsagePercent", metrics)
+        self.assertNotIn("unrelated", metrics)
+
     def test_multiple_drains_send_only_new_evidence(self):
         client = RecordingIngestClient()
         emitter = self.emitter(client)
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from services import llama_server
+
+
+class DraftModelTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.draft_path = os.path.join(tmp.name, "Qwen3-0.6B-Q8_0.gguf")
+        self.engine = {
+            "model_path": os.path.join(tmp.name, "Qwen3-8B-Q5_K_M.gguf"),
+            "n_ctx": 8192,
+            "n_threads": 4,
+            "n_gpu_layers": 0,
+            "lora_paths": [],
+        }
+        env = mock.patch.dict(os.environ, {"LLAMA_SERVER_DRAFT_MAX": "8"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def draft(self, **cfg):
+        with mock.patch(
+            "services.llama_server.get_llm_defaults",
+            return_value={"draft": {"model": self.draft_path, **cfg}},
+        ):
+            return llama_server._draft_model({"n_gpu_layers": 0})
+
+    def test_a_configured_draft_is_passed_to_the_engine(self):
+        open(self.draft_path, "wb").close()
+
+        cmd = llama_server.engine_cmd(
+            "llama-server", "http://127.0.0.1:18080", {**self.engine, "draft": self.draft(draft_p_min=0.6)},
+        )
+
+        flags = dict(zip(cmd, cmd[1:]))
+        self.assertEqual(flags["--model-draft"], self.draft_path)
+        self.assertEqual(flags["--draft-max"], "8")
+        self.assertEqual(flags["--draft-min"], "0")
+        self.assertEqual(flags["--draft-p-min"], "0.6")
+        self.assertEqual(flags["--gpu-layers-draft"], "0")
+
+    def test_a_missing_draft_file_leaves_the_engine_without_one(self):
+        with self.assertLogs("services.llama_server", "WARNING"):
+            draft = self.draft()
+
+        self.assertIsNone(draft)
+        cmd = llama_server.engine_cmd("llama-server", "http://127.0.0.1:18080", {**self.engine, "draft": draft})
+        self.assertNotIn("--model-draft", cmd)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,399 @@
+import json
+import socket
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from database import llm_cache
+from services import http_pool, llama_server
+from services.llm_service import LLMService, _StreamedToolReply, _affine_slot, _finish_inference, _post
+
+
+# Two tool calls as llama-server streams them: id and name first, then the
+# arguments in pieces.
+_TOOL_DELTAS = [
+    {"tool_calls": [{"index": 0, "id": "c0", "function": {"name": "search", "arguments": ""}}]},
+    {"tool_calls": [{"index": 0, "function": {"arguments": '{"query":'}}]},
+    {"tool_calls": [{"index": 0, "function": {"arguments": '"dates"}'}}]},
+    {"tool_calls": [{"index": 1, "id": "c1", "function": {"name": "list_notes", "arguments": "{}"}}]},
+]
+
+
+_METRICS = """\
+# HELP llamacpp:prompt_tokens_seconds Average prompt throughput in tokens/s.
+# TYPE llamacpp:prompt_tokens_seconds gauge
+llamacpp:prompt_tokens_seconds 812.4
+llamacpp:predicted_tokens_seconds 23.6
+llamacpp:kv_cache_usage_ratio 0.375
+llamacpp:requests_processing 2
+llamacpp:requests_deferred 3
+"""
+
+
+class _Engine(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    clients = set()
+    requests = 0
+    bodies = []
+    scrapes = 0
+
+    def log_message(self, *_args):
+        pass
+
+    def do_POST(self):
+        type(self).clients.add(self.client_address)
+        type(self).requests += 1
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).bodies.append(body)
+        if self.path == "/completion" and body.get("prompt") == "bad":
+            self.reply(400, {"error": {"message": "grammar is invalid"}})
+        elif body.get("stream") and body.get("tools"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for delta in _TOOL_DELTAS:
+                self.chunk(f"data: {json.dumps({'choices': [{'delta': delta}]})}\n\n")
+            self.chunk("data: [DONE]\n\n")
+            self.chunk("")
+        elif body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for piece in ("Hel", "lo"):
+                self.chunk(f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n")
+            self.chunk("data: [DONE]\n\n")
+            self.chunk("")
+        else:
+            self.reply(200, {"content": body.get("prompt", ""),
+                             "timings": {"prompt_n": 4, "prompt_ms": 2.0}})
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            type(self).scrapes += 1
+            data = _METRICS.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif self.path == "/slots":
+            self.reply(200, [{"id": 0, "is_processing": True}, {"id": 1, "is_processing": False},
+                             {"id": 2, "state": 1}])
+        else:
+            self.reply(404, {"error": {"message": "not found"}})
+
+    def reply(self, status, value):
+        data = json.dumps(value).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+
+def _service(url):
+    service = LLMService.__new__(LLMService)
+    service.url = url
+    service.model_path = "/models/base.gguf"
+    service.sampling = {}
+    service._lora_id = None
+    return service
+
+
+class _EngineTestCase(unittest.TestCase):
+    def setUp(self):
+        _Engine.clients = set()
+        _Engine.requests = 0
+        _Engine.bodies = []
+        _Engine.scrapes = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Engine)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(http_pool.close_pools)
+
+
+class KeepAliveClientTests(_EngineTestCase):
+    def test_sequential_calls_and_streams_share_one_connection(self):
+        service = _service(self.url)
+
+        for prompt in ("one", "two"):
+            self.assertEqual(_post(f"{self.url}/completion", {"prompt": prompt})["content"], prompt)
+        self.assertEqual("".join(service.chat_stream([{"role": "user", "content": "hi"}])), "Hello")
+        with self.assertRaisesRegex(RuntimeError, "grammar is invalid"):
+            _post(f"{self.url}/completion", {"prompt": "bad"})
+        self.assertEqual(_post(f"{self.url}/completion", {"prompt": "three"})["content"], "three")
+
+        self.assertEqual(len(_Engine.clients), 1)
+        self.assertEqual(http_pool.get_pool(self.url).opened, 1)
+
+    def test_a_connection_the_server_dropped_is_replaced(self):
+        _post(f"{self.url}/completion", {"prompt": "one"})
+        pool = http_pool.get_pool(self.url)
+        # What a server closing an idle keep-alive connection looks like from here.
+        pool._idle[0].sock.shutdown(socket.SHUT_RDWR)
+
+        self.assertEqual(_post(f"{self.url}/completion", {"prompt": "two"})["content"], "two")
+        self.assertEqual(pool.opened, 2)
+
+    def test_each_request_sets_its_own_timeout_on_a_shared_connection(self):
+        pool = http_pool.get_pool(self.url)
+        pool.request("POST", "/completion", body=b'{"prompt": "one"}', timeout=2.0).read()
+        conn = pool._idle[0]
+        self.assertEqual(conn.sock.gettimeout(), 2.0)
+
+        with mock.patch("services.llm_service.REQUEST_TIMEOUT_S", 600):
+            _post(f"{self.url}/completion", {"prompt": "two"})
+
+        self.assertIs(pool._idle[0], conn)
+        self.assertEqual(conn.sock.gettimeout(), 600)
+
+
+class ResponseCacheTests(_EngineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stored = {}
+        for target, value in (
+            ("services.llm_service.get_llm_defaults", lambda: {"response_cache": {"enabled": True}}),
+            ("database.llm_cache.lookup", self.stored.get),
+            ("database.llm_cache.store", lambda key, resp, _max: self.stored.__setitem__(key, resp)),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_deterministic_calls_are_answered_from_the_cache(self):
+        service = _service(self.url)
+
+        for _ in range(3):
+            self.assertEqual(service.generate("same", temperature=0.0), "same")
+        self.assertEqual(_Engine.requests, 1)
+
+        service.generate("same", temperature=0.0, grammar='root ::= "x"')
+        service.generate("same", seed=7)
+        self.assertEqual(_Engine.requests, 3)
+
+        service._served_model = "other.gguf"
+        service.generate("same", temperature=0.0)
+        self.assertEqual(_Engine.requests, 4)
+        self.assertEqual(len(self.stored), 4)
+
+    def test_a_cached_reply_reports_no_engine_timings_or_load(self):
+        recorded = []
+        service = _service(self.url)
+        service.generate("same", temperature=0.0)
+
+        with mock.patch("services.llm_service._finish_inference",
+                        side_effect=lambda *a, **kw: recorded.append(kw)):
+            self.assertEqual(service.generate("same", temperature=0.0), "same")
+
+        self.assertNotIn("timings", recorded[0]["raw_response"])
+        self.assertIsNone(recorded[0]["engine_url"])
+        self.assertTrue(all("timings" not in resp for resp in self.stored.values()))
+
+    def test_sampled_calls_always_reach_the_engine(self):
+        service = _service(self.url)
+
+        service.generate("same", temperature=0.7)
+        service.generate("same", temperature=0.7, seed=-1)
+        self.assertEqual(_Engine.requests, 2)
+        self.assertEqual(self.stored, {})
+
+    def test_the_key_covers_the_whole_request(self):
+        base = {"prompt": "p", "temperature": 0, "lora": [{"id": 0, "scale": 1.0}]}
+        key = llm_cache.cache_key("m.gguf", "/completion", base)
+
+        self.assertEqual(key, llm_cache.cache_key("m.gguf", "/completion", dict(reversed(base.items()))))
+        for variant in (
+            llm_cache.cache_key("n.gguf", "/completion", base),
+            llm_cache.cache_key("m.gguf", "/v1/chat/completions", base),
+            llm_cache.cache_key("m.gguf", "/completion", {**base, "lora": [{"id": 0, "scale": 0.5}]}),
+            llm_cache.cache_key("m.gguf", "/completion", {**base, "response_format": {"type": "json_object"}}),
+        ):
+            self.assertNotEqual(variant, key)
+
+
+class SlotAffinityTests(_EngineTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("services.llama_server.total_slots", return_value=4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def chat(self, system, user):
+        _service(self.url).chat(
+            [{"role": "system", "content": system}, {"role": "user", "content": user}],
+        )
+        return _Engine.bodies[-1].get("id_slot")
+
+    def test_requests_sharing_a_prefix_land_on_one_slot(self):
+        instructions = "Summarize the text. " * 200
+        slot = self.chat(instructions, "chunk one")
+
+        self.assertIn(slot, range(4))
+        self.assertEqual(self.chat(instructions, "chunk two"), slot)
+        self.assertEqual(
+            {self.chat(f"Task {i}", "chunk") for i in range(16)} - {None}, set(range(4)),
+        )
+
+    def test_a_busy_slot_is_not_waited_for(self):
+        instructions = "Extract the dates. " * 200
+        slot = self.chat(instructions, "chunk one")
+        body = {"messages": _Engine.bodies[-1]["messages"]}
+
+        with _affine_slot(self.url, body) as held:
+            self.assertEqual(held["id_slot"], slot)
+            self.assertIsNone(self.chat(instructions, "chunk two"))
+        self.assertEqual(self.chat(instructions, "chunk three"), slot)
+
+    def test_a_single_slot_server_is_left_to_choose(self):
+        with mock.patch("services.llama_server.total_slots", return_value=1):
+            self.assertIsNone(self.chat("Task", "chunk"))
+
+
+class StreamedToolCallTests(_EngineTestCase):
+    def test_calls_are_assembled_and_reported_as_they_complete(self):
+        seen = []
+
+        message = _service(self.url).chat_with_tools_stream(
+            [{"role": "user", "content": "hi"}], [{"type": "function", "function": {"name": "search"}}],
+            on_tool_call=lambda index, call: seen.append((index, call["function"]["arguments"])),
+        )
+
+        self.assertEqual(seen, [(0, '{"query":"dates"}'), (1, "{}")])
+        self.assertEqual(
+            [(c["id"], c["function"]["name"]) for c in message["tool_calls"]],
+            [("c0", "search"), ("c1", "list_notes")],
+        )
+        self.assertTrue(_Engine.bodies[-1]["stream"])
+
+    def test_a_call_is_reported_before_the_next_one_streams(self):
+        seen = []
+        reply = _StreamedToolReply(lambda index, _call: seen.append(index))
+
+        for delta in _TOOL_DELTAS[:3]:
+            reply.feed({"choices": [{"delta": delta}]})
+        self.assertEqual(seen, [])
+        reply.feed({"choices": [{"delta": _TOOL_DELTAS[3]}]})
+        self.assertEqual(seen, [0])
+        reply.finish()
+        self.assertEqual(seen, [0, 1])
+
+    def test_inline_calls_are_reported_at_their_closing_tag(self):
+        seen = []
+        reply = _StreamedToolReply(lambda _index, call: seen.append(call["function"]))
+
+        for piece in ("<think>maybe <tool_call>{\"name\": \"x\"}</tool_call></think>",
+                      '<tool_call>{"name": "search", ', '"arguments": {"q": 1}}</tool_call>', "\n"):
+            reply.feed({"choices": [{"delta": {"content": piece}}]})
+
+        self.assertEqual(seen, [{"name": "search", "arguments": '{"q": 1}'}])
+        self.assertNotIn("tool_calls", reply.finish())
+
+
+class EngineStatsTests(_EngineTestCase):
+    def setUp(self):
+        super().setUp()
+        llama_server._stats.clear()
+        self.addCleanup(llama_server._stats.clear)
+
+    def test_metrics_and_slots_are_scraped_once_per_interval(self):
+        expected = {
+            "enginePromptTokensPerSecond": 812,
+            "engineGeneratedTokensPerSecond": 24,
+            "engineKvCacheUsagePercent": 38,
+            "engineRequestsProcessing": 2,
+            "engineRequestsDeferred": 3,
+            "engineSlotsTotal": 3,
+            "engineSlotsBusy": 2,
+        }
+
+        self.assertEqual(llama_server.engine_stats(self.url), expected)
+        self.assertEqual(llama_server.engine_stats(self.url), expected)
+        self.assertEqual(_Engine.scrapes, 1)
+
+    def test_an_engine_that_cannot_be_asked_reports_nothing(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+        self.assertEqual(llama_server.engine_stats(self.url, timeout=0.5), {})
+
+    def test_the_engine_load_is_joined_to_the_request_timings(self):
+        recorded = {}
+
+        class Emitter:
+            def finish_inference(self, _handle, _response, **kwargs):
+                recorded.update(kwargs["metrics"])
+
+            def flush_evidence(self):
+                pass
+
+        _finish_inference(
+            Emitter(), object(), "text", outcome="final_text",
+            raw_response={"timings": {"prompt_n": 900, "prompt_ms": 1200.4, "predicted_n": 40,
+                                      "predicted_ms": 1700.0, "predicted_per_second": 23.5}},
+            engine_url=self.url,
+        )
+
+        self.assertEqual(recorded["promptTokens"], 900)
+        self.assertEqual(recorded["promptEvalMs"], 1200)
+        self.assertEqual(recorded["generationMs"], 1700)
+        self.assertEqual(recorded["generatedTokensPerSecond"], 24)
+        self.assertNotIn("promptTokensPerSecond", recorded)
+        self.assertEqual(recorded["engineRequestsDeferred"], 3)
+
+
+class LoadBalancingTests(_EngineTestCase):
+    def setUp(self):
+        super().setUp()
+        for state in (llama_server._outstanding, llama_server._down_until):
+            state.clear()
+            self.addCleanup(state.clear)
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.dead_url = f"http://127.0.0.1:{probe.getsockname()[1]}"
+
+    def test_requests_go_to_the_server_with_the_most_free_slots(self):
+        urls = ["http://a", "http://b"]
+
+        with llama_server.acquire(urls) as first, llama_server.acquire(urls) as second:
+            self.assertEqual((first, second), ("http://a", "http://b"))
+            with llama_server.acquire(urls) as third:
+                self.assertEqual(third, "http://a")
+        with llama_server.acquire(urls) as again:
+            self.assertEqual(again, "http://a")
+
+    def test_a_server_that_does_not_answer_is_skipped(self):
+        service = _service(self.url)
+        service.urls = [self.dead_url, self.url]
+
+        with self.assertLogs("services.llama_server", "WARNING"):
+            self.assertEqual(service.generate("one"), "one")
+        self.assertIn(self.dead_url, llama_server._down_until)
+        self.assertEqual(service.generate("two"), "two")
+        self.assertEqual(_Engine.requests, 2)
+
+    def test_the_engine_that_answered_is_the_one_recorded(self):
+        recorded = []
+        service = _service(self.dead_url)
+        service.urls = [self.dead_url, self.url]
+
+        with mock.patch("services.llm_service._finish_inference",
+                        side_effect=lambda *a, **kw: recorded.append(kw)), \
+                self.assertLogs("services.llama_server", "WARNING"):
+            service.generate("one")
+            "".join(service.chat_stream([{"role": "user", "content": "hi"}]))
+
+        self.assertEqual([kw["engine_url"] for kw in recorded], [self.url, self.url])
+
+
+if __name__ == "__main__":
+    unittest.main()
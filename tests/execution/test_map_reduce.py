@@ -0,0 +1,182 @@
+import hashlib
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from database.execution import Execution
+from lib.execution import activate_emitter, reset_emitter
+from lib.llm import map_reduce
+from lib.llm.map_reduce import MapReduceSpec, run_map_reduce
+from services import llama_server
+
+
+class _ChunkStoreDB:
+    """Just enough of `Execution` for a fan-out: children and the chunk store."""
+
+    def __init__(self):
+        self.chunks = {}
+        self.children = []
+
+    def store_chunks(self, chunks):
+        refs = ["sha256:" + hashlib.sha256(c.encode("utf-8")).hexdigest() for c in chunks]
+        self.chunks.update(zip(refs, chunks))
+        return refs
+
+    def load_chunks(self, refs):
+        return [self.chunks[ref] for ref in refs]
+
+    def enqueue_child_executions(self, parent_id, task_type, payloads, **_kwargs):
+        self.children.extend(payloads)
+        return [f"child-{i}" for i in range(len(payloads))]
+
+
+class _InlineDB(_ChunkStoreDB):
+    store_chunks = None
+
+
+class _SingleChildDB:
+    """The older dispatcher contract: one `enqueue_child_execution` per child."""
+
+    def __init__(self, fail_at=None):
+        self.children = []
+        self.fail_at = fail_at
+
+    def enqueue_child_execution(self, parent_id, task_type, payload, **_kwargs):
+        if len(self.children) == self.fail_at:
+            return None
+        self.children.append(payload)
+        return f"child-{len(self.children) - 1}"
+
+
+def _spec(**overrides):
+    fields = dict(
+        task_name="keywords",
+        leaf_fn=lambda chunk, payload, cfg: [chunk.split()[0]],
+        reduce_fn=lambda partials, payload, cfg: {"partials": partials, "chunks": payload["_chunks"]},
+        chunks_fn=lambda payload, cfg, is_child: (
+            [payload["content"]] if is_child else payload["content"].split("|")
+        ),
+        result_key="keywords",
+        list_results=True,
+        carry_fields=("language",),
+    )
+    return MapReduceSpec(**{**fields, **overrides})
+
+
+class MapReduceChunkStoreTests(unittest.TestCase):
+    def fan_out(self, db):
+        ctx = SimpleNamespace(db=db, execution_id="parent")
+        payload = {"content": "alpha one|beta two|alpha one", "language": "en"}
+        return run_map_reduce(payload, None, ctx, spec=_spec(), cfg={}), ctx
+
+    def test_fan_out_keeps_only_chunk_references_in_rows(self):
+        db = _ChunkStoreDB()
+        result, ctx = self.fan_out(db)
+
+        state = result["_state"]
+        self.assertNotIn("chunks", state)
+        self.assertEqual(len(state["chunk_refs"]), 3)
+        self.assertEqual(state["chunk_refs"][0], state["chunk_refs"][2])
+        self.assertEqual(len(db.chunks), 2)
+        for index, child in enumerate(db.children):
+            self.assertNotIn("content", child)
+            self.assertEqual(child["_chunk_ref"], state["chunk_refs"][index])
+            self.assertEqual(child["language"], "en")
+
+        leaf = run_map_reduce(db.children[1], None, ctx, spec=_spec(), cfg={})
+        self.assertEqual(leaf, {"keywords": ["beta"]})
+
+        retry = Execution._build_retry_payload(state, 1)
+        self.assertEqual(retry["_chunk_ref"], state["chunk_refs"][1])
+        self.assertEqual(retry["_chunk_idx"], 1)
+
+        state["results"] = {str(i): {"keywords": [f"k{i}"]} for i in range(3)}
+        merged = run_map_reduce({}, state, ctx, spec=_spec(), cfg={})
+        self.assertEqual(
+            merged["keywords"]["chunks"], ["alpha one", "beta two", "alpha one"],
+        )
+
+    def test_without_a_chunk_store_texts_stay_inline(self):
+        db = _InlineDB()
+        result, _ctx = self.fan_out(db)
+
+        state = result["_state"]
+        self.assertEqual(state["chunks"], ["alpha one", "beta two", "alpha one"])
+        self.assertNotIn("chunk_refs", state)
+        self.assertEqual(db.children[1]["content"], "beta two")
+        self.assertEqual(Execution._build_retry_payload(state, 1)["content"], "beta two")
+
+    def test_a_queue_without_bulk_enqueue_gets_one_child_at_a_time(self):
+        db = _SingleChildDB()
+        result, _ctx = self.fan_out(db)
+
+        self.assertEqual(result["_state"]["queued"], {"child-0": 0, "child-1": 1, "child-2": 2})
+        self.assertEqual([c["content"] for c in db.children], ["alpha one", "beta two", "alpha one"])
+
+        self.assertIn("error", self.fan_out(_SingleChildDB(fail_at=1))[0])
+
+
+class _LeafProbe:
+    """A leaf that records how many calls overlap."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def __call__(self, chunk, payload, cfg):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return [chunk.upper()]
+
+
+class InProcessLeafConcurrencyTests(unittest.TestCase):
+    def setUp(self):
+        llama_server._total_slots.clear()
+        self.addCleanup(llama_server._total_slots.clear)
+
+    def run_in_process(self, probe, cfg):
+        payload = {"content": "|".join(f"c{i}" for i in range(6)), "language": "en"}
+        return run_map_reduce(payload, None, None, spec=_spec(leaf_fn=probe), cfg=cfg)
+
+    def test_leaves_run_up_to_the_configured_concurrency_in_order(self):
+        probe = _LeafProbe()
+        result = self.run_in_process(probe, {"leaf_concurrency": 3})
+
+        self.assertEqual(probe.peak, 3)
+        self.assertEqual(
+            result["keywords"]["partials"], [[f"C{i}"] for i in range(6)],
+        )
+
+    def test_concurrency_defaults_to_the_server_slots(self):
+        with mock.patch("services.llama_server.props", return_value={"total_slots": 4}) as props:
+            self.assertEqual(map_reduce.leaf_concurrency({}), 4)
+            self.assertEqual(map_reduce.leaf_concurrency({}), 4)
+        props.assert_called_once()
+
+        llama_server._total_slots.clear()
+        with mock.patch("services.llama_server.props", return_value={}), \
+                mock.patch("services.llama_server.server_slots", return_value=2):
+            self.assertEqual(map_reduce.leaf_concurrency({}), 2)
+        self.assertEqual(llama_server._total_slots, {})
+
+    def test_leaves_stay_serial_under_an_execution_emitter(self):
+        probe = _LeafProbe()
+        token = activate_emitter(object())
+        try:
+            result = self.run_in_process(probe, {"leaf_concurrency": 3})
+        finally:
+            reset_emitter(token)
+
+        self.assertEqual(probe.peak, 1)
+        self.assertEqual(len(result["keywords"]["partials"]), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
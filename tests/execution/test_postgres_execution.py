@@ -16,6 +16,7 @@ from config import (
     POSTGRES_PORT,
     POSTGRES_USER,
 )
+from database.connection import open_pool
 from database.execution import Execution
 
 
@@ -108,9 +109,11 @@ class ExecutionPostgresTests(unittest.TestCase):
                 );
                 """
             )
+        cls.pool = open_pool("execution", cls.connection_args)
 
     @classmethod
     def tearDownClass(cls):
+        cls.pool.close()
         cls.admin.execute(f'DROP SCHEMA IF EXISTS "{cls.schema}" CASCADE')
         cls.admin.close()
 
@@ -118,6 +121,7 @@ class ExecutionPostgresTests(unittest.TestCase):
         self.database = Execution.__new__(Execution)
         self.database.table = "executions"
         self.database.connection_args = self.connection_args
+        self.database.pool = self.pool
         self.database.conn = psycopg.connect(
             **self.connection_args,
             autocommit=True,
@@ -213,6 +217,7 @@ class ExecutionPostgresTests(unittest.TestCase):
             database = Execution.__new__(Execution)
             database.table = "executions"
             database.connection_args = self.connection_args
+            database.pool = self.pool
             barrier.wait()
             return database.claim_pending_execution(worker_id, ["cpu"])
 
@@ -283,6 +288,272 @@ class ExecutionPostgresTests(unittest.TestCase):
         self.assertEqual(str(child["root_execution_id"]), parent_id)
         self.assertEqual(str(child["parent_execution_id"]), parent_id)
 
+    def test_siblings_finishing_together_each_land_and_the_last_wakes_the_parent(self):
+        parent_id = str(uuid.uuid4())
+        with self.database.conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO executions (
+                  execution_id, root_execution_id, owner_principal,
+                  workspace_id, schema_version, task_type, payload
+                ) VALUES (%s, %s, 'test', 'test', 'execution-event/1',
+                          'summarize', '{}'::jsonb)
+                """,
+                (parent_id, parent_id),
+            )
+        chunks = [f"chunk {i}" for i in range(6)]
+        child_ids = self.database.enqueue_child_executions(
+            parent_id, "summarize", [{"content": c, "_chunk_idx": i} for i, c in enumerate(chunks)],
+        )
+        waiting = {child_id: i for i, child_id in enumerate(child_ids)}
+        checkpoint = {
+            "chunks": chunks,
+            "chunk_field": "content",
+            "chunk_payload_template": {},
+            "waiting_for_children": waiting,
+            "children_outstanding": len(waiting),
+            "results": {str(i): None for i in range(len(chunks))},
+            "retries": {str(i): 0 for i in range(len(chunks))},
+        }
+        self.assertTrue(self.database.update_agent_state(parent_id, checkpoint))
+        self.assertTrue(self.database.update_execution_status(parent_id, "waiting"))
+
+        retry = self.database.resume_parent_with_child(
+            parent_id, child_ids[0], error="boom", max_retries=1,
+        )
+        self.assertEqual(retry, {"action": "retry_enqueued", "all_done": False})
+        parent = self.database.get_execution(parent_id)
+        [retry_id] = [k for k in parent["checkpoint"]["waiting_for_children"] if k not in waiting]
+        self.assertEqual(parent["checkpoint"]["retries"]["0"], 1)
+        finishing = [retry_id, *child_ids[1:]]
+
+        barrier = Barrier(len(finishing))
+
+        def finish(index_and_child):
+            index, child_id = index_and_child
+            barrier.wait()
+            return self.database.resume_parent_with_child(
+                parent_id, child_id, success_result={"summary": f"part {index}"},
+            )
+
+        with ThreadPoolExecutor(max_workers=len(finishing)) as pool:
+            outcomes = list(pool.map(finish, enumerate(finishing)))
+
+        self.assertEqual(sum(outcome["all_done"] for outcome in outcomes), 1)
+        parent = self.database.get_execution(parent_id)
+        self.assertEqual(parent["status"], "queued")
+        self.assertEqual(parent["checkpoint"]["waiting_for_children"], {})
+        self.assertEqual(parent["checkpoint"]["children_outstanding"], 0)
+        self.assertEqual(
+            parent["checkpoint"]["results"],
+            {str(i): {"summary": f"part {i}"} for i in range(len(chunks))},
+        )
+        self.assertEqual(
+            self.database.resume_parent_with_child(parent_id, child_ids[1], success_result={}),
+            {"action": "ignored", "reason": "not_waiting_on_child"},
+        )
+
+    def test_child_enqueue_wakes_a_listening_worker(self):
+        parent_id = str(uuid.uuid4())
+        with self.database.conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO executions (
+                  execution_id, root_execution_id, owner_principal,
+                  workspace_id, schema_version, task_type, payload
+                ) VALUES (%s, %s, 'test', 'test', 'execution-event/1',
+                          'summarize', '{}'::jsonb)
+                """,
+                (parent_id, parent_id),
+            )
+        listener = Execution.__new__(Execution)
+        listener.table = "executions"
+        listener.connection_args = self.connection_args
+        listener.pool = self.pool
+        try:
+            self.assertFalse(listener.wait_for_queued(0.1))
+            self.database.enqueue_child_execution(
+                parent_id, "summarize", {"content": "chunk", "_chunk_idx": 0},
+            )
+            self.database.enqueue_child_execution(
+                parent_id, "translate", {"texts": []},
+            )
+            self.assertTrue(listener.wait_for_queued(2.0, ["translate"]))
+        finally:
+            listener._listen_conn.close()
+
+    def test_fan_out_queues_every_child_in_one_transaction(self):
+        parent_id = str(uuid.uuid4())
+        with self.database.conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO executions (
+                  execution_id, root_execution_id, owner_principal,
+                  workspace_id, schema_version, task_type, payload
+                ) VALUES (%s, %s, 'test', 'test', 'execution-event/1',
+                          'summarize', '{}'::jsonb)
+                """,
+                (parent_id, parent_id),
+            )
+        payloads = [{"content": f"chunk {i}", "_chunk_idx": i} for i in range(5)]
+        child_ids = self.database.enqueue_child_executions(
+            parent_id, "summarize", payloads, agent_max_steps=2,
+        )
+
+        self.assertEqual(len(child_ids), 5)
+        with self.database.conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT execution_id, parent_execution_id, root_execution_id, origin,
+                       status, max_steps, payload
+                FROM executions WHERE parent_execution_id = %s
+                """,
+                (parent_id,),
+            )
+            children = {str(row["execution_id"]): row for row in cursor.fetchall()}
+            cursor.execute(
+                """
+                SELECT execution_id, producer_sequence FROM execution_events
+                WHERE root_execution_id = %s AND event_type = 'execution.created'
+                ORDER BY sequence
+                """,
+                (parent_id,),
+            )
+            created = cursor.fetchall()
+        for index, child_id in enumerate(child_ids):
+            child = children[child_id]
+            self.assertEqual(child["payload"], payloads[index])
+            self.assertEqual(str(child["root_execution_id"]), parent_id)
+            self.assertEqual((child["origin"], child["status"], child["max_steps"]), ("child", "queued", 2))
+        self.assertEqual([str(row["execution_id"]) for row in created], child_ids)
+        self.assertEqual([row["producer_sequence"] for row in created], [1, 2, 3, 4, 5])
+        self.assertIsNone(
+            self.database.enqueue_child_executions(str(uuid.uuid4()), "summarize", payloads),
+        )
+
+    def test_chunks_are_stored_once_by_content(self):
+        text = f"chunk {uuid.uuid4()}"
+        refs = self.database.store_chunks([text, "other " + text, text])
+
+        self.assertEqual(refs[0], refs[2])
+        self.assertEqual(self.database.load_chunks(refs), [text, "other " + text, text])
+        self.assertEqual(self.database.store_chunks([text]), refs[:1])
+        with self.assertRaises(KeyError):
+            self.database.load_chunks(["sha256:" + "0" * 64])
+
+    def test_batched_events_continue_both_sequences_and_the_causal_chain(self):
+        root_id = str(uuid.uuid4())
+        with self.database.conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO executions (
+                  execution_id, root_execution_id, owner_principal,
+                  workspace_id, schema_version, task_type, payload
+                ) VALUES (%s, %s, 'test', 'test', 'execution-event/1',
+                          'summarize', '{}'::jsonb)
+                """,
+                (root_id, root_id),
+            )
+        root = {"execution_id": root_id, "root_execution_id": root_id}
+        self.database.update_execution_status(root_id, "running")
+        first = self.database.append_events(root_id, [
+            {
+                "execution": root,
+                "event_type": "execution.note",
+                "payload_schema": "execution.note/1",
+                "payload": {"index": index},
+                "producer_instance_id": "producer-a" if index < 2 else "producer-b",
+                "actor": {"type": "worker"},
+            }
+            for index in range(3)
+        ])
+        second = self.database.append_events(root_id, [{
+            "execution": root,
+            "event_type": "execution.note",
+            "payload_schema": "execution.note/1",
+            "payload": {"index": 3},
+            "producer_instance_id": "producer-a",
+            "actor": {"type": "worker"},
+        }])
+
+        with self.database.conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT event_id, sequence, producer_instance_id, producer_sequence,
+                       caused_by_event_id, envelope
+                FROM execution_events WHERE root_execution_id = %s ORDER BY sequence
+                """,
+                (root_id,),
+            )
+            events = cursor.fetchall()
+            cursor.execute("SELECT last_sequence, last_event_id FROM executions WHERE execution_id = %s", (root_id,))
+            root_row = cursor.fetchone()
+        self.assertEqual([event["sequence"] for event in events], [1, 2, 3, 4, 5])
+        self.assertEqual([str(event["event_id"]) for event in events[1:]], first + second)
+        self.assertEqual(
+            [(event["producer_instance_id"], event["producer_sequence"]) for event in events[1:]],
+            [("producer-a", 1), ("producer-a", 2), ("producer-b", 1), ("producer-a", 3)],
+        )
+        for previous, event in zip(events, events[1:]):
+            self.assertEqual(event["caused_by_event_id"], previous["event_id"])
+            self.assertEqual(event["envelope"]["causedByEventId"], str(previous["event_id"]))
+        self.assertEqual(root_row["last_sequence"], 5)
+        self.assertEqual(str(root_row["last_event_id"]), second[0])
+
+    def test_queue_stats_follow_every_status_change(self):
+        ids = [str(uuid.uuid4()) for _ in range(3)]
+        with self.database.conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO executions (
+                  execution_id, root_execution_id, owner_principal,
+                  workspace_id, schema_version, task_type, priority, payload
+                ) VALUES (%s, %s, 'test', 'test', 'execution-event/1',
+                          'summarize', 'normal', '{}'::jsonb)
+                """,
+                (ids[0], ids[0]),
+            )
+        self.assertTrue(self.database._ensure_queued_index())
+        self.assertEqual(self.database.queue_stats()["normal"], 1)
+        with self.database.conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexdef FROM pg_indexes WHERE indexname = 'executions_queued_priority_idx'"
+            )
+            self.assertIn("WHERE ((status)::text = 'queued'::text)", cursor.fetchone()["indexdef"])
+
+        with self.database.conn.cursor() as cursor:
+            for execution_id, priority in zip(ids[1:], ("high", "background")):
+                cursor.execute(
+                    """
+                    INSERT INTO executions (
+                      execution_id, root_execution_id, owner_principal,
+                      workspace_id, schema_version, task_type, priority, payload
+                    ) VALUES (%s, %s, 'test', 'test', 'execution-event/1',
+                              'summarize', %s, '{}'::jsonb)
+                    """,
+                    (execution_id, execution_id, priority),
+                )
+        self.assertEqual(
+            self.database.queue_stats(), {"high": 1, "normal": 1, "background": 1},
+        )
+
+        worker_id = str(uuid.uuid4())
+        with patch.object(Execution, "_is_background_eligible", return_value=False):
+            claimed = self.database.claim_pending_execution(worker_id, ["llm"], ["summarize"])
+        self.assertEqual(str(claimed["execution_id"]), ids[1])
+        self.assertEqual(self.database.queue_stats()["high"], 0)
+
+        with self.database.conn.cursor() as cursor:
+            cursor.execute("UPDATE executions SET priority = 'high' WHERE execution_id = %s", (ids[0],))
+            cursor.execute("DELETE FROM executions WHERE execution_id = %s", (ids[2],))
+        self.assertEqual(
+            self.database.queue_stats(), {"high": 1, "normal": 0, "background": 0},
+        )
+        outside_hours = {"background_hours_start": 0, "background_hours_end": 0}
+        with patch("lib.llm.config.get_worker_config", return_value=outside_hours), \
+                self.database.conn.cursor() as cursor:
+            self.assertFalse(self.database._is_background_eligible(cursor))
+
     def test_chat_translation_and_extraction_use_the_same_worker_flow(self):
         from utils.process_execution import process_execution
 
@@ -0,0 +1,175 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from database.rag import PointStruct, Rag, chunk_ids
+from tasks.indexed_file import indexed_file
+
+
+class _Table(Rag):
+    """A `Rag` over a dict instead of a pgvector table."""
+
+    def __init__(self):
+        self.rows = {}
+        self.embedded = []
+        self.upserted = 0
+        self.updated = 0
+
+    def payloads_by_column(self, column, value):
+        return {pk: row["payload"] for pk, row in self.rows.items() if row["payload"].get(column) == value}
+
+    def upsert_points(self, points):
+        self.upserted += len(points)
+        for p in points:
+            self.rows[p.id] = {"vector": p.vector, "payload": dict(p.payload)}
+        return True
+
+    def update_payloads(self, points):
+        self.updated += len(points)
+        for p in points:
+            self.rows[p.id]["payload"] = dict(p.payload)
+        return True
+
+    def delete_points(self, ids):
+        for pk in ids:
+            self.rows.pop(pk, None)
+        return True
+
+    def embed(self, texts):
+        self.embedded.append(list(texts))
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+    def ingest(self, texts, source="doc_1"):
+        points = [
+            PointStruct(id=pk, vector=[], payload={
+                "text": text, "source_id": source, "part_number": i, "total_chunks": len(texts),
+            })
+            for i, (text, pk) in enumerate(zip(texts, chunk_ids(source, texts)), 1)
+        ]
+        return self.sync_source("source_id", source, points, self.embed)
+
+
+class SyncSourceTests(unittest.TestCase):
+    def setUp(self):
+        self.table = _Table()
+        self.table.ingest(["intro", "body", "outro"])
+        self.table.ingest(["other"], source="doc_2")
+
+    def test_an_edit_embeds_only_the_changed_chunk(self):
+        counts = self.table.ingest(["intro", "body, edited", "outro"])
+
+        self.assertEqual(counts, {"kept": 2, "added": 1, "removed": 1})
+        self.assertEqual(self.table.embedded[-1], ["body, edited"])
+        self.assertEqual(self.table.updated, 0)
+        texts = sorted(r["payload"]["text"] for r in self.table.rows.values())
+        self.assertEqual(texts, ["body, edited", "intro", "other", "outro"])
+
+    def test_shifted_chunks_keep_their_rows_with_new_positions(self):
+        counts = self.table.ingest(["preface", "intro", "body", "outro"])
+
+        self.assertEqual(counts, {"kept": 3, "added": 1, "removed": 0})
+        self.assertEqual((self.table.upserted, self.table.updated), (5, 3))
+        parts = {r["payload"]["text"]: r["payload"]["part_number"] for r in self.table.rows.values()}
+        self.assertEqual((parts["preface"], parts["outro"]), (1, 4))
+        self.assertEqual(sorted(parts[t] for t in ("preface", "intro", "body", "outro")), [1, 2, 3, 4])
+
+    def test_a_failed_write_fails_the_sync(self):
+        for method in ("upsert_points", "update_payloads", "delete_points"):
+            with mock.patch.object(self.table, method, return_value=False):
+                self.assertIsNone(self.table.ingest(["intro", "body, edited", "outro"]))
+
+    def test_an_unchanged_source_writes_nothing(self):
+        upserted = self.table.upserted
+
+        counts = self.table.ingest(["intro", "body", "outro"])
+
+        self.assertEqual(counts, {"kept": 3, "added": 0, "removed": 0})
+        self.assertEqual((self.table.upserted, self.table.updated), (upserted, 0))
+
+    def test_empty_content_removes_only_that_source(self):
+        self.table.ingest([])
+
+        self.assertEqual([r["payload"]["text"] for r in self.table.rows.values()], ["other"])
+
+    def test_repeated_texts_get_distinct_stable_ids(self):
+        first = chunk_ids("doc_1", ["same", "same"])
+
+        self.assertNotEqual(first[0], first[1])
+        self.assertEqual(first, chunk_ids("doc_1", ["same", "same"]))
+        self.assertNotEqual(first, chunk_ids("doc_2", ["same", "same"]))
+
+
+class IndexedFileIngestTests(unittest.TestCase):
+    def setUp(self):
+        self.table = _Table()
+        self.manifest = {}
+
+        def current_chunks(file_id, *identity):
+            entry = self.manifest.get(file_id)
+            stored = sum(1 for r in self.table.rows.values() if r["payload"]["indexed_file_id"] == file_id)
+            return entry[1] if entry and entry == (identity, stored) else None
+
+        def record(file_id, *identity_and_chunks):
+            self.manifest[file_id] = (identity_and_chunks[:-1], identity_and_chunks[-1])
+
+        service = mock.Mock(encode=lambda texts, normalize_embeddings: self.table.embed(texts))
+        for target, value in (
+            ("get_folder_rag", lambda: self.table),
+            ("get_embedding_service", lambda: service),
+            ("embedding_model_id", lambda: "e5"),
+            ("ingest_manifest.current_chunks", current_chunks),
+            ("ingest_manifest.record", record),
+        ):
+            patcher = mock.patch(f"tasks.indexed_file.indexed_file.{target}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def ingest(self, **overrides):
+        return indexed_file.ingest_indexed_file({
+            "indexedFileId": 3, "ownerId": 1, "filename": "notes.md",
+            "content": "Meeting notes about the budget.", "checksum": "sha256:1", **overrides,
+        })
+
+    def test_an_unchanged_checksum_skips_chunking_and_embedding(self):
+        first = self.ingest()
+        with mock.patch("tasks.indexed_file.indexed_file.semantic_chunk_text") as chunker:
+            second = self.ingest()
+
+        chunker.assert_not_called()
+        self.assertEqual(len(self.table.embedded), 1)
+        self.assertNotIn("skipped", first)
+        self.assertEqual((second["skipped"], second["chunks"]), (True, first["chunks"]))
+
+    def test_a_new_checksum_rename_or_force_ingests_again(self):
+        self.ingest()
+
+        for overrides in ({"checksum": "sha256:2"}, {"filename": "renamed.md"}, {"force": True}):
+            self.assertNotIn("skipped", self.ingest(**overrides))
+
+    def test_chunks_lost_since_the_last_ingest_are_restored(self):
+        self.ingest()
+        self.table.rows.clear()
+
+        result = self.ingest()
+
+        self.assertNotIn("skipped", result)
+        self.assertEqual(len(self.table.rows), 1)
+
+    def test_a_failed_sync_is_not_recorded(self):
+        with mock.patch.object(self.table, "upsert_points", return_value=False), \
+                self.assertRaises(RuntimeError):
+            self.ingest()
+
+        self.assertEqual(self.manifest, {})
+        self.assertNotIn("skipped", self.ingest())
+
+    def test_the_content_is_chunked_as_one_text(self):
+        self.ingest()
+
+        [row] = self.table.rows.values()
+        self.assertEqual(row["payload"]["text"], "Meeting notes about the budget.")
+
+
+if __name__ == "__main__":
+    unittest.main()
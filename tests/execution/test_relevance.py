@@ -0,0 +1,72 @@
+import json
+import re
+import threading
+import time
+import unittest
+from unittest import mock
+
+from lib.llm.grammars import RELEVANCE_KEEP_GBNF
+from lib.llm.relevance import llm_relevance
+
+
+class _Judge:
+    """An LLM that keeps the even indices of each listing it is shown."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+
+    def chat(self, messages, **kwargs):
+        listed = [int(i) for i in re.findall(r"^\[(\d+)\]", messages[-1]["content"], re.M)]
+        with self.lock:
+            self.calls.append((listed, kwargs))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        if self.fail_on is not None and self.fail_on in listed:
+            raise RuntimeError("engine went away")
+        return json.dumps({"keep": [i for i in listed if i % 2 == 0]}, separators=(",", ":"))
+
+
+class LLMRelevanceTests(unittest.TestCase):
+    def run_filter(self, judge, units, **cfg):
+        with mock.patch("lib.llm.relevance.get_llm_service", return_value=judge), \
+                mock.patch("lib.llm.relevance.llm_params_for", return_value={}):
+            return llm_relevance(units, {"model": "m.gguf", **cfg})
+
+    def test_batches_run_concurrently_with_a_compact_grammar(self):
+        units = [f"Section {i}\nBody of section {i}." for i in range(12)]
+        judge = _Judge()
+
+        kept = self.run_filter(judge, units, relevance_batch_size=3, relevance_concurrency=4)
+
+        self.assertEqual(kept, [units[i] for i in range(0, 12, 2)])
+        self.assertEqual(len(judge.calls), 4)
+        self.assertEqual(judge.peak, 4)
+        for _listed, kwargs in judge.calls:
+            self.assertEqual(kwargs["grammar"], RELEVANCE_KEEP_GBNF)
+            self.assertEqual(kwargs["temperature"], 0.0)
+
+    def test_auxiliary_headings_are_dropped_without_asking(self):
+        units = ["Intro\ntext", "## References\n[1] A.", "Method\ntext", "Appendix B: Tables\nrows"]
+        judge = _Judge()
+
+        kept = self.run_filter(judge, units)
+
+        self.assertEqual([listed for listed, _ in judge.calls], [[0, 2]])
+        self.assertEqual(kept, ["Intro\ntext", "Method\ntext"])
+
+    def test_a_failed_batch_is_kept_whole(self):
+        units = [f"Section {i}\nBody." for i in range(6)]
+        kept = self.run_filter(_Judge(fail_on=4), units, relevance_batch_size=3)
+
+        self.assertEqual(kept, [units[i] for i in (0, 2, 3, 4, 5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
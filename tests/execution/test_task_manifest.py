@@ -0,0 +1,37 @@
+import unittest
+
+from common.execution_registry import TASK_HANDLERS
+from utils.process_execution import _call_handler, _ensure_task_for_type, _handler_kwargs
+from utils.task_manifest import build_manifest, load_manifest
+
+
+class TaskManifestTests(unittest.TestCase):
+    def test_committed_manifest_matches_the_task_sources(self):
+        self.assertEqual(
+            load_manifest(),
+            build_manifest(),
+            "common/task_manifest.json is stale; run `python -m utils.task_manifest`",
+        )
+
+    def test_dispatch_imports_only_the_module_of_the_requested_type(self):
+        entry = load_manifest()["detect-language"]
+        TASK_HANDLERS.pop("detect-language", None)
+
+        self.assertTrue(_ensure_task_for_type("detect-language"))
+        self.assertEqual(TASK_HANDLERS["detect-language"].__module__, entry["module"])
+        self.assertFalse(_ensure_task_for_type("no-such-task"))
+
+    def test_handler_kwargs_follow_the_signature(self):
+        def one_shot(payload):
+            return {"payload": payload}
+
+        def reentrant(payload, state=None, ctx=None):
+            return {"state": state, "ctx": ctx}
+
+        self.assertEqual(_call_handler(one_shot, 1, state="s", ctx="c"), {"payload": 1})
+        self.assertEqual(_call_handler(reentrant, 1, state="s", ctx="c"), {"state": "s", "ctx": "c"})
+        self.assertEqual(_handler_kwargs(reentrant), ("state", "ctx"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from unittest import mock
+
+from lib.llm import text
+from lib.llm.text import count_tokens, pack_units, truncate_for_llm
+from services.text import semantic_chunk_text
+
+
+def _chars_as_tokens(_url, value):
+    """A tokenizer where every non-space character is a token, far denser
+    than the ~4 chars/token heuristic (like CJK text or code)."""
+    return sum(1 for c in value if not c.isspace())
+
+
+class TokenBudgetTests(unittest.TestCase):
+    def setUp(self):
+        text._token_counts.clear()
+        text._tokenize_down_until = 0.0
+        self.addCleanup(text._token_counts.clear)
+        patcher = mock.patch("services.llama_server.tokenize_count", side_effect=_chars_as_tokens)
+        self.tokenize = patcher.start()
+        self.addCleanup(patcher.stop)
+        defaults = mock.patch("lib.llm.config.get_llm_defaults", return_value={"n_ctx": 2048})
+        defaults.start()
+        self.addCleanup(defaults.stop)
+
+    def test_counts_come_from_the_engine_and_are_remembered(self):
+        self.assertEqual(count_tokens("ab cd"), 4)
+        self.assertEqual(count_tokens("ab cd"), 4)
+        self.assertEqual(self.tokenize.call_count, 1)
+
+    def test_falls_back_to_the_heuristic_while_the_engine_is_down(self):
+        self.tokenize.side_effect = None
+        self.tokenize.return_value = None
+
+        self.assertEqual(count_tokens("x" * 40), 10)
+        self.assertEqual(count_tokens("y" * 40), 10)
+        self.assertEqual(self.tokenize.call_count, 1)
+
+    def test_truncation_fits_the_token_budget(self):
+        cfg = {"chunk_max_tokens": 512}  # budget: 2048 - 512 - 512 = 1024 tokens
+        dense = "字" * 3000
+
+        cut = truncate_for_llm(dense, cfg)
+        self.assertLessEqual(count_tokens(cut), 1024)
+        self.assertGreater(len(cut), 900)
+        self.assertEqual(truncate_for_llm("short", cfg), "short")
+        self.assertEqual(len(truncate_for_llm(dense, {"input_char_budget": 10})), 10)
+
+    def test_a_long_document_is_cut_before_it_is_counted(self):
+        cfg = {"chunk_max_tokens": 512}
+
+        cut = truncate_for_llm("word " * 200_000, cfg)
+
+        self.assertLessEqual(count_tokens(cut), 1024)
+        self.assertTrue(all(len(call.args[1]) <= 1024 * 8 for call in self.tokenize.call_args_list))
+
+    def test_units_pack_to_tokens_when_a_token_budget_is_set(self):
+        units = ["aaaa bbbb", "cccc dddd", "eeee ffff"]
+
+        self.assertEqual(len(pack_units(units, 100)), 1)
+        self.assertEqual(pack_units(units, 100, 16), ["aaaa bbbb\n\ncccc dddd", "eeee ffff"])
+
+    def test_semantic_chunks_are_capped_in_tokens(self):
+        paragraph = " ".join(["token"] * 60)
+        chunks = semantic_chunk_text([paragraph], 100, 120, 0, max_tokens=100)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(count_tokens(c) <= 100 for c in chunks))
+        self.assertEqual(" ".join(chunks).split(), paragraph.split())
+
+
+if __name__ == "__main__":
+    unittest.main()
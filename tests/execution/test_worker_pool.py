@@ -0,0 +1,130 @@
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import Mock, patch
+
+from database import connection
+from services.embedding_service import _MicroBatcher
+from tests.execution.test_embedding_cache import _Model
+from worker.capabilities import CPU_SLOTS, EMBED_SLOTS, LLM_SLOTS, get_task_slot_pool
+from worker.pool import ExecutionPool
+
+
+class ExecutionPoolTests(unittest.TestCase):
+    def setUp(self):
+        pools = {"summarize": LLM_SLOTS, "keywords": LLM_SLOTS, "distribution": CPU_SLOTS,
+                 "search": EMBED_SLOTS}
+        caps = {"keywords": 1}
+        self.patches = [
+            patch("worker.pool.get_task_slot_pool", side_effect=pools.__getitem__),
+            patch("worker.pool.get_task_max_concurrent", side_effect=lambda t: caps.get(t, 0)),
+        ]
+        for p in self.patches:
+            p.start()
+        self.release = threading.Event()
+        self.pool = ExecutionPool({LLM_SLOTS: 2, CPU_SLOTS: 1, EMBED_SLOTS: 4})
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.shutdown()
+        for p in self.patches:
+            p.stop()
+
+    def _blocking_run(self, _execution):
+        self.release.wait(5)
+
+    def test_llm_slots_fill_up_and_free_again(self):
+        types = ["summarize", "keywords", "distribution"]
+        with patch("worker.pool.process_execution", side_effect=self._blocking_run):
+            self.pool.submit({"execution_id": "a", "task_type": "keywords"})
+            # keywords is capped at one; summarize still has a slot.
+            self.assertEqual(
+                self.pool.claimable_task_types(types), ["summarize", "distribution"],
+            )
+            self.pool.submit({"execution_id": "b", "task_type": "summarize"})
+            self.assertEqual(self.pool.claimable_task_types(types), ["distribution"])
+
+            self.release.set()
+            self.assertTrue(self.pool.slot_freed.wait(5))
+            for _ in range(50):
+                if len(self.pool.claimable_task_types(types)) == 3:
+                    break
+                self.pool.slot_freed.wait(0.1)
+            self.assertEqual(self.pool.claimable_task_types(types), types)
+
+    def test_executions_lost_with_a_dead_worker_process_are_failed(self):
+        failed = []
+        broken = Future()
+        broken.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+
+        with patch.object(self.pool, "_executor", return_value=Mock(submit=lambda *_args: broken)), \
+                patch("worker.pool.fail_execution", side_effect=lambda e, _message: failed.append(e)):
+            self.pool.submit({"execution_id": "c", "task_type": "distribution", "attempt_id": "a-1"})
+
+        self.assertEqual(failed, [{"execution_id": "c", "task_type": "distribution", "attempt_id": "a-1"}])
+        self.assertEqual(self.pool.claimable_task_types(["distribution"]), ["distribution"])
+
+    def test_shutdown_waits_for_running_executions(self):
+        finished = []
+
+        def run(execution):
+            self.release.wait(5)
+            finished.append(execution["execution_id"])
+
+        with patch("worker.pool.process_execution", side_effect=run):
+            self.pool.submit({"execution_id": "a", "task_type": "summarize"})
+            threading.Timer(0.2, self.release.set).start()
+            self.pool.shutdown()
+
+        self.assertEqual(finished, ["a"])
+
+
+
+    def test_concurrent_searches_share_forward_passes(self):
+        model = _Model()
+        encode = model.encode
+
+        def slow_encode(texts, normalize_embeddings=True):
+            time.sleep(0.05)
+            return encode(texts, normalize_embeddings)
+
+        model.encode = slow_encode
+        batcher = _MicroBatcher(model, window_s=0.01, max_texts=64)
+        threads = []
+
+        def run(execution):
+            threads.append(threading.current_thread().name)
+            batcher.encode([execution["execution_id"]], True)
+
+        with patch("worker.pool.process_execution", side_effect=run):
+            for execution_id in ("a", "bb", "ccc", "dddd"):
+                self.pool.submit({"execution_id": execution_id, "task_type": "search"})
+            self.assertEqual(self.pool.claimable_task_types(["search"]), [])
+            self.pool.shutdown()
+
+        self.assertEqual(len(threads), 4)
+        self.assertTrue(all(name.startswith("embedding") for name in threads))
+        self.assertLess(batcher.passes, 4)
+
+
+class SlotPoolConfigTests(unittest.TestCase):
+    def test_embedding_only_tasks_run_in_the_embedding_slots(self):
+        for task_type in ("embedding", "search", "memory-search"):
+            self.assertEqual(get_task_slot_pool(task_type), EMBED_SLOTS, task_type)
+        self.assertEqual(get_task_slot_pool("memory-ingest"), CPU_SLOTS)
+
+
+class ExecutionConnectionPoolTests(unittest.TestCase):
+    def test_the_execution_pool_grows_with_the_slots(self):
+        with patch("worker.capabilities.get_slot_limits", return_value={LLM_SLOTS: 6, CPU_SLOTS: 2, EMBED_SLOTS: 4}), \
+                patch.object(connection, "POSTGRES_POOLS", {}):
+            self.assertEqual(connection.pool_size("execution"), 14)
+            self.assertEqual(connection.pool_size("rag"), connection.DEFAULT_POOL_SIZES["rag"])
+        with patch.object(connection, "POSTGRES_POOLS", {"execution": 3}):
+            self.assertEqual(connection.pool_size("execution"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
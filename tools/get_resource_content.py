@@ -62,4 +62,5 @@ register(Tool(
     },
     execute=_execute,
     summarize=_summarize,
+    read_only=True,
 ))
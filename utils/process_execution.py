@@ -3,14 +3,14 @@ import logging
 import importlib
 import importlib.util
 import json
-import pkgutil
-import os
 import sys
 import types
+from functools import lru_cache
 from pathlib import Path
-from typing import Callable, Dict, Any
+from typing import Any, Dict, Tuple
 
 from common.execution_registry import TASK_HANDLERS
+from utils.task_manifest import load_manifest
 
 
 class HandlerCtx:
@@ -28,107 +28,35 @@ class HandlerCtx:
         self.task_type = task_type
 
 
-def _call_handler(handler, payload, *, state=None, ctx=None):
-    """Invoke a handler, passing only the kwargs its signature accepts."""
+@lru_cache(maxsize=None)
+def _handler_kwargs(handler) -> Tuple[str, ...]:
+    """The optional kwargs (`state`, `ctx`) a handler's signature accepts.
+    Cached: a handler's signature doesn't change, and inspecting it costs more
+    than many of the handlers it fronts."""
     try:
-        sig = inspect.signature(handler)
+        params = inspect.signature(handler).parameters
     except (TypeError, ValueError):
-        return handler(payload)
-
-    kwargs = {}
-    params = sig.parameters
-    if "state" in params:
-        kwargs["state"] = state
-    if "ctx" in params:
-        kwargs["ctx"] = ctx
-    return handler(payload, **kwargs)
-
-
-logger = logging.getLogger(__name__)
-
-# Ensure task modules under the `tasks` package are imported so their
-# `@execution_handler` decorators can register handlers in `TASK_HANDLERS`.
-_TASKS_LOADED = False
-
-
-def _load_task_modules() -> None:
-    global _TASKS_LOADED
-    if _TASKS_LOADED:
-        return
-    models_root = Path(__file__).resolve().parents[1]
-
-    # If there's a tasks config file, load only enabled tasks from it.
-    tasks_cfg_path = models_root / "config" / "tasks.json"
-    if tasks_cfg_path.exists():
-        try:
-            cfg = json.loads(tasks_cfg_path.read_text(encoding="utf-8"))
-            for jt, jt_cfg in cfg.items():
-                try:
-                    if not jt_cfg.get("enabled", True):
-                        continue
-                    # Ensure module for this execution type is imported (prefers config/task)
-                    _ensure_task_for_type(jt)
-                except Exception:
-                    logger.exception("Failed to ensure task for type %s", jt)
-            _TASKS_LOADED = True
-            return
-        except Exception:
-            logger.exception("Failed to read tasks config %s", tasks_cfg_path)
-
-    def _import_from_package(pkg_name: str) -> bool:
-        try:
-            pkg = importlib.import_module(pkg_name)
-        except ModuleNotFoundError:
-            return False
-        except Exception:
-            logger.exception("Failed to import package %s", pkg_name)
-            return False
-
-        if not hasattr(pkg, "__path__"):
-            return False
+        return ()
+    return tuple(kw for kw in ("state", "ctx") if kw in params)
 
-        found = False
-        for pkg_path in pkg.__path__:
-            for root, dirs, files in os.walk(pkg_path):
-                # skip bytecode/cache dirs
-                dirs[:] = [d for d in dirs if not d.startswith("__")]
-                for filename in files:
-                    if not filename.endswith(".py"):
-                        continue
-                    if filename == "__init__.py":
-                        continue
-                    if filename.startswith("_"):
-                        continue
-                    file_path = os.path.join(root, filename)
-                    rel_path = os.path.relpath(file_path, pkg_path)
-                    module_name = rel_path[:-3].replace(os.path.sep, ".")
-                    full_mod_name = pkg.__name__ + "." + module_name
-                    try:
-                        importlib.import_module(full_mod_name)
-                        found = True
-                    except Exception:
-                        logger.exception(
-                            "Failed to import task module %s", full_mod_name)
 
-        return found
+def _call_handler(handler, payload, *, state=None, ctx=None):
+    """Invoke a handler, passing only the kwargs its signature accepts."""
+    available = {"state": state, "ctx": ctx}
+    return handler(payload, **{kw: available[kw] for kw in _handler_kwargs(handler)})
 
-    # Prefer tasks defined under `config.task` (if present), otherwise fall back to `tasks`.
-    if _import_from_package("config.task"):
-        _TASKS_LOADED = True
-        return
 
-    if _import_from_package("tasks"):
-        _TASKS_LOADED = True
-        return
-
-    logger.debug("No task modules found in config.task or tasks packages")
+logger = logging.getLogger(__name__)
 
 
 def _ensure_task_for_type(task_type: str) -> bool:
     """Ensure the module that registers a handler for `task_type` is imported.
 
-    Tries candidates under `config.task` first (including loading from
-    filesystem if `config` is not a package), then `tasks`.
+    Task modules are imported on first dispatch of their type, not at startup
+    (see `utils.task_manifest`): the manifest names the module directly. Types
+    it doesn't know (user tasks under `config/task`, a stale manifest) fall
+    back to searching the sources, `tasks` first, then `config.task`
+    (including loading from filesystem if `config` is not a package).
     Returns True if a handler for `task_type` is present after imports.
     """
     if not task_type:
@@ -137,6 +65,20 @@ def _ensure_task_for_type(task_type: str) -> bool:
     if task_type in TASK_HANDLERS:
         return True
 
+    entry = load_manifest().get(task_type)
+    if entry:
+        try:
+            importlib.import_module(entry["module"])
+        except Exception:
+            logger.exception("Failed to import %s for execution type %s", entry["module"], task_type)
+        if task_type in TASK_HANDLERS:
+            return True
+        logger.warning(
+            "Task manifest points %s at %s, which registers no such handler; "
+            "regenerate it with `python -m utils.task_manifest`",
+            task_type, entry["module"],
+        )
+
     # candidate base names derived from execution type
     bases = [task_type, task_type.replace("-", "_")]
     if "-" in task_type:
@@ -303,6 +245,7 @@ def process_execution(execution: Dict[str, Any]) -> None:
         return
 
     # One-shot path (existing behaviour).
+    _ensure_task_for_type(task_type)
     handler = TASK_HANDLERS.get(task_type)
     if not handler:
         logger.warning("No handler for execution type: %s", task_type)
@@ -353,6 +296,7 @@ def process_execution(execution: Dict[str, Any]) -> None:
             new_state = result.get("_state") or {}
             pending = result.get("pending_children") or {}
             new_state["waiting_for_children"] = {str(k): v for k, v in pending.items()}
+            new_state["children_outstanding"] = len(new_state["waiting_for_children"])
             if db.update_agent_state(execution["execution_id"], new_state, attempt_id=attempt_id):
                 db.update_execution_status(execution["execution_id"], "waiting", attempt_id=attempt_id)
             return
@@ -382,19 +326,63 @@ def process_execution(execution: Dict[str, Any]) -> None:
             _maybe_resume_parent(execution, db, error=str(e))
 
 
+def fail_execution(execution: Dict[str, Any], message: str) -> None:
+    """Fail a claimed execution from outside its run, e.g. when the worker
+    process running it died. Fenced by its attempt id, so an execution that
+    got as far as recording its own outcome is left as it is."""
+    from database.execution import get_execution_database
+
+    db = get_execution_database()
+    if db.update_execution_status(
+        execution["execution_id"],
+        "failed",
+        attempt_id=execution.get("attempt_id"),
+        failure_message=message,
+    ):
+        _maybe_resume_parent(execution, db, error=message)
+
+
+def requeue_execution(execution: Dict[str, Any]) -> None:
+    """Put a claimed execution that never started back in the queue."""
+    from database.execution import get_execution_database
+
+    get_execution_database().update_execution_status(
+        execution["execution_id"], "queued", attempt_id=execution.get("attempt_id"),
+    )
+
+
 def _maybe_resume_parent(execution: Dict[str, Any], db, error: str | None = None) -> None:
     """If this execution has a parent, write the result/error into the parent's
     state and wake the parent back to 'queued' when appropriate.
 
     Two parent shapes are supported:
-      - LLM-driven agent (single child): parent checkpoint transcript[-1]
-        has `pending_child == this execution id`.
       - Reentrant task fan-out (N children): parent checkpoint waiting_for_children
         contains this execution id and is integrated by db.resume_parent_with_child.
+        A successful child goes straight to it: the update is a single atomic
+        statement that tells us whether the parent was waiting on us at all,
+        so sibling leaves finishing together don't each re-read the parent.
+      - LLM-driven agent (single child): parent checkpoint transcript[-1]
+        has `pending_child == this execution id`.
     """
     parent_id = execution.get("parent_execution_id")
     if not parent_id:
         return
+    child_result: Any = None
+    if error is None:
+        fresh = db.get_execution(execution["execution_id"]) or {}
+        child_result = fresh.get("result")
+        if isinstance(child_result, str):
+            try:
+                child_result = json.loads(child_result)
+            except Exception:
+                child_result = {}
+        outcome = db.resume_parent_with_child(
+            parent_id, execution["execution_id"],
+            success_result=child_result if isinstance(child_result, dict) else {},
+        )
+        if outcome.get("action") != "ignored" or outcome.get("reason") == "parent_not_found":
+            return
+
     parent = db.get_execution(parent_id)
     if not parent:
         return
@@ -405,29 +393,16 @@ def _maybe_resume_parent(execution: Dict[str, Any], db, error: str | None = None
         except Exception:
             state = {}
 
-    # Many-children fan-out uses the shared checkpoint integration helper.
+    # A failed fan-out child may be retried, which depends on the parent's
+    # task config.
     waiting = state.get("waiting_for_children") or {}
-    if str(execution["execution_id"]) in waiting:
+    if error is not None and str(execution["execution_id"]) in waiting:
         from lib.llm.config import get_task_config
         cfg = get_task_config(parent.get("task_type") or "")
-        max_retries = int(cfg.get("chunk_max_retries", 0))
-        if error is not None:
-            db.resume_parent_with_child(
-                parent_id, execution["execution_id"], error=error, max_retries=max_retries,
-            )
-        else:
-            fresh = db.get_execution(execution["execution_id"]) or {}
-            result = fresh.get("result") or {}
-            if isinstance(result, str):
-                try:
-                    result = json.loads(result)
-                except Exception:
-                    result = {}
-            db.resume_parent_with_child(
-                parent_id, execution["execution_id"],
-                success_result=result if isinstance(result, dict) else {},
-                max_retries=max_retries,
-            )
+        db.resume_parent_with_child(
+            parent_id, execution["execution_id"], error=error,
+            max_retries=int(cfg.get("chunk_max_retries", 0)),
+        )
         return
 
     # Single-child LLM-agent path.
@@ -438,14 +413,10 @@ def _maybe_resume_parent(execution: Dict[str, Any], db, error: str | None = None
             if error is not None:
                 last["observation"] = {"error": error, "child_execution_id": execution["execution_id"]}
             else:
-                fresh = db.get_execution(execution["execution_id"]) or {}
-                last["observation"] = fresh.get("result") or {}
+                last["observation"] = child_result or {}
             last.pop("pending_child", None)
             state["transcript"] = transcript
     state.pop("waiting_for_child", None)
     db.update_agent_state(parent_id, state)
     db.wake_waiting_execution(parent_id)
 
-
-# Load all enabled tasks at import time so handlers are registered immediately.
-_load_task_modules()
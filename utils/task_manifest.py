@@ -0,0 +1,78 @@
+"""Index of which module registers the handler for each task type.
+
+The worker used to import every module under `tasks/` at startup so their
+`@execution_handler` decorators would run. That pulled in torch, transformers,
+docling and whisper even on a worker that only ever runs dataset tasks, and
+again in every spawned CPU-slot process. Instead, `common/task_manifest.json`
+maps each task type to its module, and `utils.process_execution` imports a
+module the first time its task type is dispatched.
+
+The manifest is generated from the source without importing anything. The
+decorators are found in the AST, so building it costs no more than parsing.
+After adding or renaming a handler, regenerate it:
+
+    python -m utils.task_manifest
+
+`tests/execution/test_task_manifest.py` fails while the committed manifest is
+stale.
+"""
+
+import ast
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+MODELS_ROOT = Path(__file__).resolve().parents[1]
+MANIFEST_PATH = MODELS_ROOT / "common" / "task_manifest.json"
+
+
+def _handler_task_type(decorator: ast.expr):
+    if not (isinstance(decorator, ast.Call) and decorator.args):
+        return None
+    func = decorator.func
+    name = func.id if isinstance(func, ast.Name) else getattr(func, "attr", None)
+    first = decorator.args[0]
+    if name == "execution_handler" and isinstance(first, ast.Constant) and isinstance(first.value, str):
+        return first.value
+    return None
+
+
+def build_manifest(tasks_dir: Path = MODELS_ROOT / "tasks") -> Dict[str, Dict[str, Any]]:
+    """Scan `tasks_dir` for `@execution_handler("<type>")` definitions."""
+    manifest: Dict[str, Dict[str, Any]] = {}
+    for path in sorted(tasks_dir.rglob("*.py")):
+        if path.name == "__init__.py" or path.name.startswith("_"):
+            continue
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        module = ".".join(path.relative_to(MODELS_ROOT).with_suffix("").parts)
+        for node in ast.walk(tree):
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            for decorator in node.decorator_list:
+                task_type = _handler_task_type(decorator)
+                if task_type is not None:
+                    manifest[task_type] = {"module": module}
+    return dict(sorted(manifest.items()))
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> Dict[str, Dict[str, Any]]:
+    """The committed manifest, or an empty one if it is missing or unreadable
+    (dispatch then falls back to searching the task sources)."""
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest() -> Dict[str, Dict[str, Any]]:
+    manifest = build_manifest()
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    load_manifest.cache_clear()
+    return manifest
+
+
+if __name__ == "__main__":
+    written = write_manifest()
+    print(f"Wrote {len(written)} task types to {MANIFEST_PATH}")
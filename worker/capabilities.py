@@ -4,6 +4,18 @@ GPU = "gpu"
 LLM = "llm"
 EMBEDDINGS = "embeddings"
 
+# Slot pools a worker runs executions in (see `worker.pool`). LLM tasks spend
+# their time waiting on the shared llama-server, so they run on threads; the
+# rest is CPU-bound in this process (pandas, docling, whisper, torch) and gets
+# worker processes so it doesn't serialize on the GIL. Tasks that only encode a
+# query or two (search, memory lookups) run on threads too: the model releases
+# the GIL, and concurrent ones then share the process's micro-batched forward
+# passes (`services.embedding_service`), which a process apiece never would.
+LLM_SLOTS = "llm"
+CPU_SLOTS = "cpu"
+EMBED_SLOTS = "embed"
+SLOT_POOLS = (LLM_SLOTS, CPU_SLOTS, EMBED_SLOTS)
+
 # Map task types to feature flag keys in config.features
 TASK_FEATURE_MAP = {
     "entity-extraction": "relationships",
@@ -58,3 +70,45 @@ def get_supported_task_types(capabilities: list) -> list:
             supported.append(task_type)
 
     return supported
+
+
+def get_task_slot_pool(task_type: str) -> str:
+    """The slot pool a task type runs in.
+
+    `slot_pool` in the task config wins; otherwise a task that needs the LLM
+    capability is I/O-bound on the engine and goes to the LLM pool, and
+    everything else to the CPU pool.
+    """
+    pool = get_task_config(task_type).get("slot_pool")
+    if pool in SLOT_POOLS:
+        return pool
+    required = get_all_task_requirements().get(task_type, [])
+    return LLM_SLOTS if LLM in required else CPU_SLOTS
+
+
+def get_task_max_concurrent(task_type: str) -> int:
+    """Per-type cap on concurrent executions in this worker; 0 means only the
+    pool's own size limits it."""
+    try:
+        return max(0, int(get_task_config(task_type).get("max_concurrent", 0) or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def get_slot_limits() -> dict:
+    """Size of each slot pool, from `worker.slots`.
+
+    The LLM pool defaults to the engine's `--parallel` slots: fewer leaves
+    server slots idle, more only queues inside the server.
+    """
+    from services.llama_server import server_slots
+
+    slots = get_worker_config().get("slots") or {}
+    defaults = {LLM_SLOTS: server_slots(), CPU_SLOTS: 1, EMBED_SLOTS: 4}
+    limits = {}
+    for pool, fallback in defaults.items():
+        try:
+            limits[pool] = max(1, int(slots.get(pool, fallback)))
+        except (TypeError, ValueError):
+            limits[pool] = fallback
+    return limits
@@ -52,22 +52,18 @@ def register_worker(capabilities: list, metadata: dict):
     from database.execution import get_execution_database
 
     db = get_execution_database()
-    conn = db.get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO workers (id, name, capabilities, status, last_heartbeat, started_at, metadata)
-                VALUES (%s, %s, %s::jsonb, 'online', NOW(), NOW(), %s::jsonb)
-                ON CONFLICT (id) DO UPDATE SET
-                    name = EXCLUDED.name,
-                    capabilities = EXCLUDED.capabilities,
-                    status = 'online',
-                    last_heartbeat = NOW(),
-                    started_at = NOW(),
-                    metadata = EXCLUDED.metadata
-            """, (WORKER_ID, WORKER_NAME, json.dumps(capabilities), json.dumps(metadata)))
-    finally:
-        conn.close()
+    with db.connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO workers (id, name, capabilities, status, last_heartbeat, started_at, metadata)
+            VALUES (%s, %s, %s::jsonb, 'online', NOW(), NOW(), %s::jsonb)
+            ON CONFLICT (id) DO UPDATE SET
+                name = EXCLUDED.name,
+                capabilities = EXCLUDED.capabilities,
+                status = 'online',
+                last_heartbeat = NOW(),
+                started_at = NOW(),
+                metadata = EXCLUDED.metadata
+        """, (WORKER_ID, WORKER_NAME, json.dumps(capabilities), json.dumps(metadata)))
 
 
 def start_heartbeat_thread():
@@ -75,22 +71,18 @@ def start_heartbeat_thread():
     def _heartbeat_loop():
         from database.execution import get_execution_database
         db = get_execution_database()
-        conn = db.get_connection()
         while True:
             time.sleep(HEARTBEAT_INTERVAL)
+            # Borrowed per beat: the pool checks the connection on checkout, so
+            # a dropped one is replaced instead of failing every later beat.
             try:
-                with conn.cursor() as cur:
+                with db.connection() as conn, conn.cursor() as cur:
                     cur.execute(
                         "UPDATE workers SET last_heartbeat = NOW() WHERE id = %s",
                         (WORKER_ID,)
                     )
             except Exception as e:
                 logger.error("Heartbeat error: %s", e)
-                try:
-                    conn.close()
-                except Exception:
-                    pass
-                conn = db.get_connection()
 
     t = threading.Thread(target=_heartbeat_loop, daemon=True)
     t.start()
@@ -102,7 +94,7 @@ def deregister_worker():
     try:
         from database.execution import get_execution_database
         db = get_execution_database()
-        with db.conn.cursor() as cur:
+        with db.connection() as conn, conn.cursor() as cur:
             cur.execute(
                 "UPDATE workers SET status = 'offline' WHERE id = %s",
                 (WORKER_ID,)
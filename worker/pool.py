@@ -0,0 +1,158 @@
+"""Bounded slots for running several executions at once in one worker.
+
+One synchronous execution at a time leaves the engine's `--parallel` slots idle
+and puts every short task behind whichever long summarize got there first. The
+worker instead keeps three pools (see `worker.capabilities`):
+
+  - LLM slots, on threads: the execution spends its time waiting on the shared
+    llama-server over HTTP, so a thread per slot is all it takes.
+  - CPU slots, on worker processes: dataset statistics, extraction, whisper and
+    embeddings burn CPU in Python and would serialize on the GIL in threads.
+  - Embedding slots, on threads: searches encode a text or two each, and on
+    threads of one process they are batched into shared forward passes.
+
+The main loop asks which task types still have room (`claimable_task_types`),
+claims one of those, hands it over (`submit`) and repeats until nothing fits.
+A type can be capped below its pool with `max_concurrent` in its task config.
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from utils.process_execution import fail_execution, process_execution, requeue_execution
+from worker.capabilities import (
+    CPU_SLOTS,
+    EMBED_SLOTS,
+    LLM_SLOTS,
+    SLOT_POOLS,
+    get_slot_limits,
+    get_task_max_concurrent,
+    get_task_slot_pool,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutionPool:
+    """Runs claimed executions in per-pool slots and tracks what is in flight."""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = dict(limits or get_slot_limits())
+        self._lock = threading.Lock()
+        self._running: Dict[str, int] = {pool: 0 for pool in SLOT_POOLS}
+        self._running_by_type: Dict[str, int] = {}
+        # Resolved once per type: the task config doesn't change under a
+        # running worker any more than its capabilities do.
+        self._pool_of: Dict[str, str] = {}
+        self._cap_of: Dict[str, int] = {}
+        self._threads = ThreadPoolExecutor(
+            max_workers=self.limits[LLM_SLOTS], thread_name_prefix="execution",
+        )
+        self._embed_threads = ThreadPoolExecutor(
+            max_workers=self.limits[EMBED_SLOTS], thread_name_prefix="embedding",
+        )
+        self._processes: Optional[ProcessPoolExecutor] = None
+        # Set whenever an execution finishes, so the main loop can stop waiting
+        # for the queue and claim into the slot that just opened. The loop
+        # clears it before each claim round.
+        self.slot_freed = threading.Event()
+
+    def _slot_pool(self, task_type: str) -> str:
+        if task_type not in self._pool_of:
+            self._pool_of[task_type] = get_task_slot_pool(task_type)
+            self._cap_of[task_type] = get_task_max_concurrent(task_type)
+        return self._pool_of[task_type]
+
+    def _has_room(self, task_type: str) -> bool:
+        pool = self._slot_pool(task_type)
+        if self._running[pool] >= self.limits[pool]:
+            return False
+        cap = self._cap_of[task_type]
+        return not cap or self._running_by_type.get(task_type, 0) < cap
+
+    def claimable_task_types(self, task_types: List[str]) -> List[str]:
+        """The subset of `task_types` with a free slot right now."""
+        with self._lock:
+            return [t for t in task_types if self._has_room(t)]
+
+    def submit(self, execution: Dict[str, Any]) -> None:
+        """Start a claimed execution in its pool. Never blocks on the run."""
+        task_type = execution.get("task_type") or ""
+        with self._lock:
+            pool = self._slot_pool(task_type)
+            self._running[pool] += 1
+            self._running_by_type[task_type] = self._running_by_type.get(task_type, 0) + 1
+        try:
+            future = self._executor(pool).submit(process_execution, execution)
+        except Exception:
+            logger.exception("Could not start execution %s", execution.get("execution_id"))
+            self._release(pool, task_type)
+            return
+        future.add_done_callback(lambda f: self._finished(f, pool, task_type, execution))
+
+    def _executor(self, pool: str):
+        if pool == LLM_SLOTS:
+            return self._threads
+        if pool == EMBED_SLOTS:
+            return self._embed_threads
+        if self._processes is None:
+            # spawn, not fork: the parent holds open PostgreSQL connections and
+            # threads, neither of which survives being forked. Each process
+            # builds its own database handle and models on first use.
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.limits[CPU_SLOTS],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._processes
+
+    def _finished(self, future: Future, pool: str, task_type: str, execution: Dict[str, Any]) -> None:
+        execution_id = execution.get("execution_id")
+        try:
+            error = future.exception()
+        except CancelledError:
+            # Cancelled by `shutdown` before it started: let another worker
+            # have it rather than wait for stale-worker recovery.
+            self._settle(requeue_execution, execution)
+            error = None
+        if isinstance(error, BrokenProcessPool):
+            # The process died under the execution (OOM, segfault in a native
+            # model), and with it every execution the pool was running. This
+            # worker keeps heartbeating, so stale-worker recovery never comes
+            # for their rows: each is failed here. The pool itself has to be
+            # rebuilt before the next one.
+            logger.error("Worker process died running execution %s", execution_id)
+            with self._lock:
+                self._processes = None
+            self._settle(fail_execution, execution, "The worker process running it died")
+        elif error is not None:
+            # process_execution records handler failures itself; anything
+            # reaching here escaped it.
+            logger.error("Execution %s crashed its slot: %s", execution_id, error)
+            self._settle(fail_execution, execution, str(error))
+        self._release(pool, task_type)
+
+    @staticmethod
+    def _settle(record, execution: Dict[str, Any], *args: Any) -> None:
+        try:
+            record(execution, *args)
+        except Exception:
+            logger.exception("Could not record the outcome of execution %s", execution.get("execution_id"))
+
+    def _release(self, pool: str, task_type: str) -> None:
+        with self._lock:
+            self._running[pool] -= 1
+            self._running_by_type[task_type] -= 1
+        self.slot_freed.set()
+
+    def shutdown(self) -> None:
+        """Stop taking work and wait for the executions already running to
+        finish. Executions not started yet are put back in the queue."""
+        self._threads.shutdown(wait=True, cancel_futures=True)
+        self._embed_threads.shutdown(wait=True, cancel_futures=True)
+        processes = self._processes
+        if processes is not None:
+            processes.shutdown(wait=True, cancel_futures=True)